@@ -14,6 +14,9 @@
 
 import re
 
+from ..codegen import load_generated
+from ..data import speccache
+from ..data import subset
 from ..models import ModelRegistry
 from ..nestedns import NS
 
@@ -55,25 +58,48 @@ class APIRegistry(ModelRegistry):
     <class 'models.v1.Container'>
     >>> registry.apis['v1'].list_namespaced_pod
     <class 'apis.listNamespacedPod'>
+
+    If `tags` is given, only operations with those api tags or groups are
+    registered, along with the definitions they use.
+
+    >>> registry = APIRegistry(release='1.9', tags=['core_v1', 'apps'])
     '''
 
-    def __init__(self, *, release=None):
-        super().__init__()
+    def __init__(self, *, release=None, tags=None, store=None, slim=False):
+        super().__init__(tags=tags, store=store, slim=slim)
         self.apis = NS(missing=self._get_api)
         self._api_desc = {}
         self._api_bases = []
+        self._generated_apis = {}
 
         if release is not None:
             self.load_release_spec(release)
 
+    def load_release_spec(self, release):
+        super().load_release_spec(release)
+        # Use ahead of time generated apis (python -m ak8s.apis --emit) if
+        # they are present, as for models.
+        if self._tags is not None or self._slim:
+            return
+        generated = load_generated(__name__, release)
+        if generated is not None:
+            self._generated_apis = generated.apis
+
     def add_spec(self, spec):
         super().add_spec(spec)
-        for pth, pthdesc in spec['paths'].items():
-            pathparams = pthdesc.get('parameters')
-            for method, opdesc in pthdesc.items():
-                if method == 'parameters':
+        self._add_operations(subset.spec_operations(spec))
+
+    def add_spec_cache(self, cache):
+        super().add_spec_cache(cache)
+        self._add_operations(cache.operations())
+
+    def _add_operations(self, operations):
+        for pth, pathparams, method, opdesc in operations:
+            if self._tags is not None:
+                tag, = opdesc['tags']
+                if not subset.tag_allowed(tag, self._tags):
                     continue
-                self.add_api_desc(pth, pathparams, method, opdesc)
+            self.add_api_desc(pth, pathparams, method, opdesc)
 
     def add_api_desc(self, pth, pathparams, method, opdesc):
         tag, = opdesc['tags']
@@ -84,11 +110,23 @@ class APIRegistry(ModelRegistry):
             name = re.sub(f'(\\w+)_{re.escape(tag)}_?(?!$)', f'{tag}.\\1_', name)
         if name in self._api_desc:
             raise KeyError(f'Spec for {name} is already registered')
+        if self._slim and not isinstance(opdesc, speccache.LazyDesc):
+            pathparams = subset.strip_descriptions(pathparams)
+            opdesc = subset.strip_descriptions(opdesc)
+        if self._store is not None:
+            pathparams = self._store.intern(pathparams)
+            opdesc = self._store.intern(opdesc)
         self._api_desc[name] = pth, pathparams, method, opdesc
         self.apis._declare_lazy(name)
 
     def _get_api_desc(self, name):
-        return self._api_desc[name]
+        pth, pathparams, method, opdesc = self._api_desc[name]
+        if isinstance(opdesc, speccache.LazyDesc):
+            if pathparams is not None:
+                pathparams = self._decode(pathparams)
+            opdesc = self._decode(opdesc)
+            self._api_desc[name] = pth, pathparams, method, opdesc
+        return pth, pathparams, method, opdesc
 
     def _register_api(self, api):
         if not issubclass(api, K8sAPIOperation):
@@ -105,6 +143,17 @@ class APIRegistry(ModelRegistry):
         else:
             base_class = K8sAPIOperation
 
+        if name in self._generated_apis:
+            # The generated class comes first so its spec derived attributes
+            # take precedence over the K8sAPIOperation defaults, it doesn't
+            # define any methods to get in the way of base_class.
+            class API(self._generated_apis[name], base_class):
+                pass
+
+            API.__qualname__ = API.__name__ = name
+            API.__doc__ = self._generated_apis[name].__doc__
+            return self._register_api(API)
+
         class API(
                 base_class,
                 registry=self,
@@ -14,7 +14,10 @@
 
 import argparse
 
+from ..codegen import module_path
+from ..codegen import write_package
 from . import APIRegistry
+from .emit import emit_apis
 from .operation import K8sAPIOperation
 from .operation import StreamingMixin
 
@@ -22,8 +25,21 @@ from .operation import StreamingMixin
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument(
+            '--emit', action='store_true',
+            help='Generate the apis package for the release.')
+    parser.add_argument(
+            '-o', '--output', metavar='PATH',
+            help='Where to write the generated package (defaults to '
+                 'beside this package, where the registry will find it).')
     args = parser.parse_args()
 
+    if args.emit:
+        output = args.output or module_path(__package__, args.release)
+        write_package(output, emit_apis(args.release))
+        print(output)
+        exit()
+
     registry = APIRegistry(release=args.release)
 
     @registry.add_api_base(r'(?:\w+\.)?watch\w+')
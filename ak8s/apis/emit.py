@@ -0,0 +1,166 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Ahead of time generation of api modules.
+
+    python -m ak8s.apis --emit 1.9
+
+writes the ak8s/apis/release_1_9 package, which APIRegistry(release='1.9')
+uses instead of building api classes from the spec.  There is a submodule
+per api tag, so core_v1.list_namespaced_pod is declared as
+list_namespaced_pod in ak8s/apis/release_1_9/core_v1.py.
+
+The base class of an api is chosen when the registry creates it (see
+APIRegistry.add_api_base), so the generated classes only carry what is
+derived from the spec, and the registry mixes them into the chosen base.
+'''
+
+import collections
+from inspect import Parameter
+
+from ..codegen import pydoc
+from ..codegen import pyident
+from ..codegen import spec_stamp
+from ..data import speccache
+
+from . import APIRegistry
+from . import camel2snake
+
+
+# Class attributes derived from the spec by K8sAPIOperation.__init_subclass__
+_attrs = '''
+    name
+    method
+    path
+    consumes
+    produces
+    k8s_tag
+    k8s_group
+    k8s_version
+    k8s_kind
+    k8s_action
+    _path_params
+    _body_param
+    _query_params
+'''.split()
+
+_kinds = {
+    Parameter.POSITIONAL_OR_KEYWORD: '_POSITIONAL_OR_KEYWORD',
+    Parameter.KEYWORD_ONLY: '_KEYWORD_ONLY',
+}
+
+
+def emit_apis(release):
+    '''Generate the sources of an apis package for `release`.
+
+    Returns {module name: source}.
+    '''
+
+    registry = APIRegistry()
+    registry.add_spec_cache(speccache.load_release(release))
+
+    groups = collections.defaultdict(list)
+    for name in sorted(registry._api_desc):
+        api = registry.apis[name]
+        groups[pyident(camel2snake(api.k8s_tag))].append(api)
+
+    modules = {}
+    index = {}
+    for modname, apis in groups.items():
+        modules[modname] = _emit_module(release, apis)
+        for api in apis:
+            index[api.name] = modname
+
+    out = []
+    w = out.append
+    w(pydoc(
+        f'Kubernetes release {release} apis.\n\n'
+        f'Generated by `python -m ak8s.apis --emit {release}`, do not '
+        f'edit.\n'))
+    w('')
+    w('from ...codegen import GeneratedIndex')
+    w('')
+    w('')
+    w(f'spec_stamp = {spec_stamp(release)!r}')
+    w('')
+    w('apis = GeneratedIndex(__name__, {')
+    for name, modname in sorted(index.items()):
+        w(f'    {name!r}: {modname!r},')
+    w('})')
+    modules['__init__'] = '\n'.join(out) + '\n'
+
+    return modules
+
+
+def _emit_module(release, apis):
+    out = []
+    w = out.append
+    w(pydoc(
+        f'Kubernetes release {release} apis.\n\n'
+        f'Generated by `python -m ak8s.apis --emit {release}`, do not '
+        f'edit.\n'))
+    w('')
+    w('from inspect import Parameter')
+    w('from inspect import Signature')
+    w('')
+    w('from ..operation import K8sAPIOperation')
+    w('')
+    w('')
+    w('_POSITIONAL_OR_KEYWORD = Parameter.POSITIONAL_OR_KEYWORD')
+    w('_KEYWORD_ONLY = Parameter.KEYWORD_ONLY')
+    w('')
+
+    classes = {}
+
+    for api in apis:
+        ident = classes[api.name] = pyident(api.name.rpartition('.')[2])
+
+        w('')
+        w(f'class {ident}(K8sAPIOperation):')
+        w(f'    {pydoc(api.__doc__)}')
+        w('')
+        for attr in _attrs:
+            w(f'    {attr} = {_source(getattr(api, attr))}')
+        w('    __signature__ = Signature([')
+        for param in api.__signature__.parameters.values():
+            w(f'            Parameter({param.name!r}, {_kinds[param.kind]}),')
+        w('    ])')
+        w('')
+
+    w('')
+    w('declared = {')
+    for name, ident in classes.items():
+        w(f'    {name!r}: {ident},')
+    w('}')
+
+    return '\n'.join(out) + '\n'
+
+
+def _source(value):
+    if isinstance(value, set):
+        # Sorted, so the output is reproducible.
+        if not value:
+            return 'set()'
+        return '{' + ', '.join( repr(v) for v in sorted(value) ) + '}'
+    return repr(_strip(value))
+
+
+def _strip(value):
+    # Parameter descriptions are only used for docs, which are already
+    # rendered.
+    if isinstance(value, dict):
+        if 'in' in value and 'name' in value:
+            return { k: v for k,v in value.items() if k != 'description' }
+        return { k: _strip(v) for k,v in value.items() }
+    return value
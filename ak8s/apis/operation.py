@@ -19,8 +19,9 @@ import json
 import re
 import textwrap
 from types import MappingProxyType as mappingproxy
-from urllib.parse import urlencode
-from urllib.parse import urlunsplit
+from urllib.parse import quote_plus
+
+from ..lazydoc import LazyDoc
 
 
 __all__ = '''
@@ -106,19 +107,27 @@ class K8sAPIOperation:
         except KeyError:
             response_model = 'unknown'
 
-        cls.__doc__ = f'{cls.k8s_group} {cls.k8s_action} {cls.k8s_version} {cls.k8s_kind}\n\n'
-        cls.__doc__ += f'    {method} {path} -> {response_model}\n\n'
+        def render_doc():
+            doc = f'{cls.k8s_group} {cls.k8s_action} {cls.k8s_version} {cls.k8s_kind}\n\n'
+            doc += f'    {method} {path} -> {response_model}\n\n'
+
+            if args:
+                doc += 'ARGUMENTS\n\n'
+                doc += ''.join( format_param_doc(p) for p in args )
+
+            if opts:
+                doc += 'OPTIONS\n\n'
+                doc += ''.join( format_param_doc(p) for p in opts )
 
-        if args:
-            cls.__doc__ += 'ARGUMENTS\n\n'
-            cls.__doc__ += ''.join( format_param_doc(p) for p in args )
+            return doc
 
-        if opts:
-            cls.__doc__ += 'OPTIONS\n\n'
-            cls.__doc__ += ''.join( format_param_doc(p) for p in opts )
+        cls.__doc__ = LazyDoc(render_doc)
 
         registry._register_api(cls)
 
+    # Compiled from the signature and path on first use, see _Layout.
+    _layout = None
+
     # instance attrs
     stream = False
     uri = None
@@ -126,27 +135,16 @@ class K8sAPIOperation:
     args = None
 
     def __init__(self, *a, **kw):
-        # Not using Signature.bind() here because we want to treat the query
-        # params as optional, without using a default.
-        bound = self.__signature__.bind_partial(*a, **kw)
-
-        self.args = mappingproxy(bound.arguments.copy())
+        # Not inherited, a subclass may have another signature or path.
+        cls = self.__class__
+        layout = cls.__dict__.get('_layout')
+        if layout is None:
+            layout = cls._layout = _Layout(cls)
 
-        if self._body_param:
-            body = bound.arguments.pop(self._body_param['name'])
-        else:
-            body = None
-
-        try:
-            path_ = re.sub(
-                    r'{(\w+)(?::\*)?}',
-                    lambda m: bound.arguments.pop(m.group(1)),
-                    self.path)
-        except KeyError as e:
-            raise TypeError(f'missing required argument {e!s}')
-        query = urlencode(bound.kwargs)
-        self.uri = urlunsplit(('', '', path_, query, ''))
-        self.body = body
+        args = layout.bind(a, kw)
+        self.args = mappingproxy(args)
+        self.body = args.get(layout.body)
+        self.uri = layout.uri(args)
 
     def __repr__(self):
         return f'<{self.__class__.__name__}: {self.uri}>'
@@ -163,18 +161,18 @@ class K8sAPIOperation:
         '''Derive a copy of this operation with some arguments replaced.
 
         >>> registry.apis.list_namespaced_pod(namespace='default', watch=True)
-        <listNamespacedPod: /api/v1/namespaces/default/pods?watch=True>
+        <listNamespacedPod: /api/v1/namespaces/default/pods?watch=true>
         >>> _.replace(resourceVersion='10')
-        <listNamespacedPod: /api/v1/namespaces/default/pods?watch=True&resourceVersion=10>
+        <listNamespacedPod: /api/v1/namespaces/default/pods?resourceVersion=10&watch=true>
         '''
 
-        bound = self.__signature__.bind_partial(*a, **kw)
+        layout = self.__class__.__dict__['_layout']
+        args = {**self.args, **layout.bind(a, kw)}
         # Remove kwargs set to None.  Unsetting positional args doesn't really
         # make sense, as it would cause later positional args to slide over,
         # and we don't have optional positional args anyway.
-        args = {**self.args, **bound.arguments}
-        for k,v in bound.kwargs.items():
-            if v is None:
+        for k,v in kw.items():
+            if v is None and k in layout.query:
                 del args[k]
         return self.__class__(**args)
 
@@ -209,6 +207,91 @@ class K8sAPIOperation:
         return headers, body
 
 
+class _Layout:
+    '''The parameter layout and path template of an operation class.
+
+    Binding arguments with Signature.bind_partial and filling in the path
+    with re.sub is most of the cost of creating an operation, so the work
+    that only depends on the class is done once.
+    '''
+
+    __slots__ = 'positional', 'names', 'query', 'body', 'path'
+
+    def __init__(self, op):
+        params = op.__signature__.parameters
+        self.positional = tuple(
+                name for name, p in params.items()
+                if p.kind is Parameter.POSITIONAL_OR_KEYWORD)
+        self.names = tuple(params)
+        # Query param names are encoded up front.
+        self.query = {
+                name: quote_plus(name) + '='
+                for name, p in params.items()
+                if p.kind is Parameter.KEYWORD_ONLY }
+        self.body = op._body_param['name'] if op._body_param else None
+        # A format string; {path:*} means the same as {path} to us.
+        self.path = re.sub(r'{(\w+):\*}', r'{\1}', op.path)
+
+    def bind(self, a, kw):
+        '''Map arguments to parameter names, in signature order.
+
+        Like Signature.bind_partial, query params are optional without
+        having a default.
+        '''
+
+        if len(a) > len(self.positional):
+            raise TypeError('too many positional arguments')
+        args = dict(zip(self.positional, a))
+        for k in kw:
+            if k in args:
+                raise TypeError(f'multiple values for argument {k!r}')
+        args.update(kw)
+
+        # Signature order, so that equal operations hash (and encode) the
+        # same way regardless of how they were called.
+        ordered = { k: args[k] for k in self.names if k in args }
+        if len(ordered) != len(args):
+            k = next( k for k in args if k not in ordered )
+            raise TypeError(f'got an unexpected keyword argument {k!r}')
+        return ordered
+
+    def uri(self, args):
+        try:
+            path = self.path.format_map(args)
+        except KeyError as e:
+            raise TypeError(f'missing required argument {e!s}')
+
+        query = []
+        for k, v in args.items():
+            prefix = self.query.get(k)
+            if prefix is None or v is None:
+                continue
+            if isinstance(v, (list, tuple)):
+                query.extend( prefix + _query_value(item) for item in v )
+            else:
+                query.append(prefix + _query_value(v))
+
+        if query:
+            return path + '?' + '&'.join(query)
+        return path
+
+
+def _query_value(v):
+    # Kubernetes parses booleans with strconv.ParseBool, lowercase is what
+    # kubectl sends.
+    if v is True:
+        return 'true'
+    if v is False:
+        return 'false'
+    v = str(v)
+    if _unreserved(v):
+        return v
+    return quote_plus(v)
+
+
+_unreserved = re.compile(r'[A-Za-z0-9_.~-]*').fullmatch
+
+
 class StreamingMixin:
     stream = True
 
@@ -0,0 +1,353 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Apply manifests in bulk.
+
+    >>> applier = Applier(ak8s, registry, concurrency=20)
+    >>> with open('manifests.yaml') as fh:
+    ...     objs = applier.load(fh)
+    >>> async for result in applier.apply(objs):
+    ...     print(result)
+    created   Namespace team-a
+    unchanged ConfigMap team-a/settings
+    replaced  Deployment team-a/web
+
+Documents are parsed one at a time, and each is projected to its model
+through registry.models_by_gvk.  Objects are applied a tier at a time, so
+that what others depend on exists first: namespaces and custom resource
+definitions, then configuration, roles, bindings, services, and then
+everything else.  Within a tier, up to `concurrency` objects are applied at
+once.
+
+Each object is read first.  If it doesn't exist it is created.  If it does,
+the manifest is merged into it, and it is replaced only if that changes
+anything, so applying the same manifests again costs only reads.  The
+merge is like a strategic merge patch: mappings are merged, items of lists
+are matched by their patch merge key (like containers by name) and merged,
+other values are replaced, and fields the manifest leaves out are kept,
+like those the server fills in (a container's imagePullPolicy, a service
+port's protocol).  Replacing sends the resource version that was read, and
+a conflict is retried with a fresh read.
+
+    python -m ak8s.apply 1.9 manifests.yaml [...]
+'''
+
+import argparse
+import asyncio
+import re
+import time
+
+import aiohttp
+import yaml
+
+from .client import AK8sClient
+from .client import AK8sNotFound
+from .models.lens import ListLens
+from .models.lens import ModelLens
+
+
+__all__ = '''
+    ApplyResult
+    Applier
+'''.split()
+
+
+# The C loader, if pyyaml was built with libyaml.
+_Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Like helm's install order.  Kinds that aren't listed are applied last.
+TIERS = [
+    ('Namespace', 'CustomResourceDefinition'),
+    ('PriorityClass', 'StorageClass', 'PersistentVolume', 'PodSecurityPolicy',
+     'ResourceQuota', 'LimitRange', 'NetworkPolicy', 'ServiceAccount',
+     'Secret', 'ConfigMap', 'PersistentVolumeClaim'),
+    ('ClusterRole', 'Role'),
+    ('ClusterRoleBinding', 'RoleBinding'),
+    ('Service',),
+]
+_tier_of = { kind: tier for tier, kinds in enumerate(TIERS) for kind in kinds }
+
+
+class ApplyResult:
+    '''What was done to apply `obj`.
+
+    `action` is 'created', 'replaced', 'unchanged' or 'failed', in which
+    case `error` is the exception.  `live` is the object as the server
+    returned it, if it was read or written.
+    '''
+
+    __slots__ = 'obj', 'action', 'live', 'error', 'seconds'
+
+    def __init__(self, obj, action, live=None, error=None, seconds=0):
+        self.obj = obj
+        self.action = action
+        self.live = live
+        self.error = error
+        self.seconds = seconds
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self}>'
+
+    def __str__(self):
+        meta = self.obj._data.get('metadata') or {}
+        name = meta.get('name')
+        if meta.get('namespace'):
+            name = f'{meta["namespace"]}/{name}'
+        s = f'{self.action:9} {self.obj._data.get("kind")} {name}'
+        if self.error is not None:
+            s += f': {self.error}'
+        return s
+
+
+class _ResourceAPIs:
+    __slots__ = 'read', 'create', 'replace', 'namespaced'
+
+    def __init__(self):
+        self.read = self.create = self.replace = None
+        self.namespaced = False
+
+
+class Applier:
+    '''Apply objects with the client `ak8s`, with apis from `registry`.
+
+    Namespaced objects without a namespace are applied in `namespace`.
+    Conflicting replaces are retried up to `retries` times.
+    '''
+
+    def __init__(
+            self, ak8s, registry, *,
+            concurrency=10, namespace='default', retries=3):
+        self._ak8s = ak8s
+        self._registry = registry
+        self._concurrency = concurrency
+        self._namespace = namespace
+        self._retries = retries
+        self._apis = None
+
+    def load(self, stream):
+        '''Project the yaml documents in `stream` to models.
+
+        Items of List documents are loaded as objects of their own.  A
+        document of a kind the registry doesn't have raises KeyError.
+        '''
+
+        models = self._registry.models_by_gvk
+        objs = []
+        for doc in yaml.load_all(stream, Loader=_Loader):
+            if not doc:
+                continue
+            if doc.get('kind') == 'List':
+                docs = doc.get('items') or ()
+            else:
+                docs = doc,
+            for doc in docs:
+                group, _, version = doc['apiVersion'].rpartition('/')
+                try:
+                    model = models[group, version, doc['kind']]
+                except KeyError:
+                    raise KeyError(
+                            f'No model for {doc["apiVersion"]} '
+                            f'{doc["kind"]}') from None
+                objs.append(model._project(doc))
+        return objs
+
+    async def apply(self, objs):
+        '''Apply the models `objs`, generating an ApplyResult for each.
+
+        Results come as objects finish, a tier at a time.
+        '''
+
+        tiers = [ [] for _ in range(len(TIERS) + 1) ]
+        for obj in objs:
+            tiers[_tier_of.get(obj._data['kind'], len(TIERS))].append(obj)
+
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def apply_one(obj):
+            async with semaphore:
+                return await self._apply(obj)
+
+        for tier in tiers:
+            for fut in asyncio.as_completed([ apply_one(obj) for obj in tier ]):
+                yield await fut
+
+    async def _apply(self, obj):
+        t0 = time.monotonic()
+        try:
+            action, live = await self._apply_object(obj)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return ApplyResult(
+                    obj, 'failed', error=e, seconds=time.monotonic() - t0)
+        return ApplyResult(obj, action, live, seconds=time.monotonic() - t0)
+
+    async def _apply_object(self, obj):
+        apis = self._apis_for(obj)
+        meta = obj._data['metadata']
+        args = {'name': meta['name']}
+        if apis.namespaced:
+            args['namespace'] = meta.get('namespace') or self._namespace
+
+        for attempt in range(self._retries + 1):
+            try:
+                live = await self._ak8s.op(apis.read(**args))
+            except AK8sNotFound:
+                return 'created', await self._ak8s.op(
+                        apis.create(body=obj, **{
+                            k: v for k, v in args.items() if k != 'name' }))
+
+            data = live._data
+            merged = _merge(data, obj._data, obj.__class__)
+            if merged is data:
+                return 'unchanged', live
+            try:
+                return 'replaced', await self._ak8s.op(
+                        apis.replace(body=obj.__class__._project(merged), **args))
+            except aiohttp.ClientResponseError as e:
+                if e.status != 409 or attempt == self._retries:
+                    raise
+            # Changed since it was read, try again.
+
+    def _apis_for(self, obj):
+        if self._apis is None:
+            self._apis = self._resource_apis()
+        data = obj._data
+        group, _, version = data['apiVersion'].rpartition('/')
+        try:
+            return self._apis[group, version, data['kind']]
+        except KeyError:
+            raise KeyError(
+                    f'No apis for {data["apiVersion"]} {data["kind"]}') from None
+
+    def _resource_apis(self):
+        # {(group, version, kind): _ResourceAPIs}, of the operations on the
+        # resources themselves, not their subresources.
+        registry = self._registry
+        found = {}
+        for name in list(registry._api_desc):
+            action = re.match(r'(read|create|replace)_', name.rpartition('.')[2])
+            if action is None:
+                continue
+            path, _, _, opdesc = registry._get_api_desc(name)
+            gvk = opdesc.get('x-kubernetes-group-version-kind')
+            if gvk is None:
+                continue
+            if action.group(1) == 'create':
+                if '{name}' in path:
+                    continue
+            elif not path.endswith('/{name}'):
+                continue
+            key = gvk['group'], gvk['version'], gvk['kind']
+            apis = found.get(key)
+            if apis is None:
+                apis = found[key] = _ResourceAPIs()
+            setattr(apis, action.group(1), registry.apis[name])
+            apis.namespaced = '{namespace}' in path
+        return {
+                key: apis for key, apis in found.items()
+                if apis.read and apis.create and apis.replace }
+
+
+def _merge(live, manifest, model=None):
+    # The manifest merged into the live object, sharing what's unchanged.
+    # Returns `live` itself if nothing changes.  `model` is the model of
+    # the data, to find the lenses (and so the merge keys) of lists.
+    merged = None
+    for k, v in manifest.items():
+        old = live.get(k)
+        v = _merge_value(old, v, _lens(model, k))
+        if k in live and (v is old or v == old):
+            continue
+        if merged is None:
+            merged = dict(live)
+        merged[k] = v
+    return live if merged is None else merged
+
+
+def _lens(model, key):
+    if model is None:
+        return None
+    return getattr(getattr(model, key, None), 'lens', None)
+
+
+def _merge_value(old, v, lens):
+    if isinstance(v, dict) and isinstance(old, dict):
+        model = lens.model if isinstance(lens, ModelLens) else None
+        return _merge(old, v, model)
+    if isinstance(v, list) and isinstance(old, list):
+        return _merge_list(old, v, lens)
+    return v
+
+
+def _merge_list(live, manifest, lens):
+    # Items are matched by the list's patch merge key, or else by position
+    # if there are as many, and merged like mappings.  Live items the
+    # manifest leaves out are removed.
+    key = itemlens = None
+    if isinstance(lens, ListLens):
+        key, itemlens = lens._bound._key, lens._itemlens
+    if key is not None and all(
+            isinstance(item, dict) and key in item for item in manifest ):
+        by_key = {
+                item.get(key): item for item in live
+                if isinstance(item, dict) }
+        merged = [
+                _merge_value(by_key.get(item[key]), item, itemlens)
+                for item in manifest ]
+    elif len(live) == len(manifest):
+        merged = [
+                _merge_value(old, item, itemlens)
+                for old, item in zip(live, manifest) ]
+    else:
+        return manifest
+    if len(merged) == len(live) and all(
+            v is old or v == old for v, old in zip(merged, live) ):
+        return live
+    return merged
+
+
+async def main():
+    from .apis import APIRegistry
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument('manifests', metavar='MANIFEST', nargs='+')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('-n', '--namespace', default='default')
+    args = parser.parse_args()
+
+    registry = APIRegistry(release=args.release)
+    counts = {}
+    async with AK8sClient(registry=registry) as ak8s:
+        applier = Applier(
+                ak8s, registry,
+                concurrency=args.concurrency, namespace=args.namespace)
+        objs = []
+        for path in args.manifests:
+            with open(path) as fh:
+                objs.extend(applier.load(fh))
+        async for result in applier.apply(objs):
+            print(result)
+            counts[result.action] = counts.get(result.action, 0) + 1
+    print(', '.join( f'{n} {action}' for action, n in sorted(counts.items()) ))
+    return 1 if 'failed' in counts else 0
+
+
+if __name__ == '__main__':
+    try:
+        exit(asyncio.get_event_loop().run_until_complete(main()) or 0)
+
+    except KeyboardInterrupt as e:
+        exit(1)
@@ -0,0 +1,92 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Bulk field extraction benchmark.
+
+    python -m ak8s.bench.columns 1.9
+
+Reads a few fields of many pods through model attributes, and with
+ak8s.models.columns.
+'''
+
+import argparse
+import time
+
+from ..apis import APIRegistry
+from ..models.columns import columns
+from ..models.columns import parse_quantity
+
+
+FIELDS = {
+    'namespace': 'metadata.namespace',
+    'node': 'spec.nodeName',
+    'restarts': 'status.containerStatuses[*].restartCount',
+    'cpu': ('spec.containers[*].resources.requests.cpu', parse_quantity),
+}
+
+
+def make_pods(registry, n):
+    PodList = registry.models_by_gvk['', 'v1', 'PodList']
+    return PodList._project({'items': [
+            {
+                'metadata': {'name': f'pod-{i}', 'namespace': f'ns-{i%50}'},
+                'spec': {
+                    'nodeName': f'node-{i%500}',
+                    'containers': [
+                        {'name': 'app', 'resources': {
+                            'requests': {'cpu': '250m'}}},
+                        {'name': 'sidecar', 'resources': {
+                            'requests': {'cpu': '50m'}}},
+                    ],
+                },
+                'status': {'containerStatuses': [
+                        {'name': 'app', 'restartCount': i%3},
+                        {'name': 'sidecar', 'restartCount': 0},
+                ]},
+            }
+            for i in range(n) ]}).items
+
+
+def by_attribute(pods):
+    out = {name: [] for name in FIELDS}
+    for pod in pods:
+        out['namespace'].append(pod.metadata.namespace)
+        out['node'].append(pod.spec.nodeName)
+        out['restarts'].append(sum(
+                s.restartCount for s in pod.status.containerStatuses))
+        out['cpu'].append(sum(
+                parse_quantity(c.resources.requests['cpu'])
+                for c in pod.spec.containers ))
+    return out
+
+
+def by_column(pods):
+    return columns(pods, FIELDS, categorical={'namespace', 'node'})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument('--pods', type=int, default=200000)
+    args = parser.parse_args()
+
+    pods = make_pods(APIRegistry(release=args.release), args.pods)
+
+    for label, extract in (
+            ('attribute', by_attribute),
+            ('columns', by_column)):
+        t0 = time.perf_counter()
+        extract(pods)
+        elapsed = time.perf_counter() - t0
+        print(f'{label:10} {elapsed*1e3:8.1f}ms')
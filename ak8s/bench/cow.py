@@ -0,0 +1,121 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Copy-on-write benchmark.
+
+    python -m ak8s.bench.cow 1.9
+
+Hands a cached pod to a consumer that changes one field, by deep copying
+it first and with copy_on_write().  First checks that changes through
+copy-on-write and frozen views, including to maps and raw lists, don't
+reach the cached pod.
+'''
+
+import argparse
+import copy
+import timeit
+
+from ..apis import APIRegistry
+from ..models import FrozenError
+from ..models import copy_on_write
+from ..models import freeze
+
+
+def make_pod(registry):
+    Pod = registry.models_by_gvk['', 'v1', 'Pod']
+    return Pod._project({
+            'metadata': {
+                'name': 'nginx',
+                'namespace': 'default',
+                'labels': { f'label-{i}': 'value' for i in range(10) },
+                'annotations': { f'annotation-{i}': 'x'*200 for i in range(5) },
+            },
+            'spec': {
+                'containers': [
+                    {
+                        'name': f'container-{i}',
+                        'image': 'nginx:1.13',
+                        'command': ['nginx', '-g', 'daemon off;'],
+                        'args': ['--verbose'],
+                        'env': [
+                            {'name': f'VAR_{j}', 'value': 'value'}
+                            for j in range(20) ],
+                        'resources': {'limits': {'cpu': '500m'}},
+                    }
+                    for i in range(3) ],
+            },
+            'status': {'phase': 'Running'},
+    })
+
+
+# Changes a consumer might make, to maps and raw lists as well as models.
+CHANGES = [
+    lambda pod: pod.metadata.labels.__setitem__('label-0', 'changed'),
+    lambda pod: pod.metadata.annotations.pop('annotation-0'),
+    lambda pod: pod.spec.containers[0].resources.limits.__setitem__('cpu', '9'),
+    lambda pod: pod.spec.containers[1].command.__setitem__(0, 'httpd'),
+    lambda pod: pod.spec.containers[2].args.append('--quiet'),
+    lambda pod: setattr(pod.metadata, 'name', 'changed'),
+]
+
+
+def check(pod):
+    original = copy.deepcopy(pod._data)
+    for change in CHANGES:
+        mine = copy_on_write(pod)
+        change(mine)
+        assert mine._data != original
+        assert pod._data == original, 'copy_on_write changed the original'
+
+        frozen = freeze(pod._project(pod._data))
+        try:
+            change(frozen)
+        except FrozenError:
+            pass
+        else:
+            raise AssertionError('a frozen view was changed')
+        assert pod._data == original, 'freeze changed the original'
+
+
+def deepcopy_and_change(pod):
+    mine = copy.deepcopy(pod)
+    mine.metadata.labels = {'changed': 'yes'}
+
+
+def cow_and_change(pod):
+    mine = copy_on_write(pod)
+    mine.metadata.labels = {'changed': 'yes'}
+
+
+def cow_and_change_label(pod):
+    mine = copy_on_write(pod)
+    mine.metadata.labels['label-0'] = 'changed'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument('--number', type=int, default=10000)
+    args = parser.parse_args()
+
+    pod = make_pod(APIRegistry(release=args.release))
+    check(pod)
+
+    for label, fn in (
+            ('deepcopy', deepcopy_and_change),
+            ('cow', cow_and_change),
+            ('cow label', cow_and_change_label)):
+        best = min(timeit.repeat(
+                lambda: fn(pod), number=args.number, repeat=5))
+        print(f'{label:9} {best/args.number*1e6:8.2f}us')
@@ -0,0 +1,128 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Event loop responsiveness while decoding a large list.
+
+    python -m ak8s.bench.decode --items 50000
+
+Decodes a synthetic pod list inline, with json.loads in a thread, and with
+PoolDecoder in a thread and a process pool, while a task that wakes up every
+millisecond records the longest the loop was blocked.  Full garbage
+collections block the loop too, whatever does the decoding, --no-gc leaves
+them out.
+'''
+
+import argparse
+import asyncio
+import concurrent.futures
+import gc
+import json
+import time
+
+from ..decode import PoolDecoder
+
+
+def make_body(n):
+    return json.dumps({
+            'kind': 'PodList',
+            'apiVersion': 'v1',
+            'metadata': {'resourceVersion': '1'},
+            'items': [
+                {
+                    'metadata': {
+                        'name': f'pod-{i}',
+                        'namespace': 'default',
+                        'labels': {'app': f'app-{i%50}'},
+                    },
+                    'spec': {
+                        'containers': [{
+                            'name': 'app',
+                            'image': 'registry.example.com/app:1.2.3',
+                            'env': [
+                                {'name': f'VAR_{j}', 'value': 'value'}
+                                for j in range(10) ],
+                        }],
+                    },
+                    'status': {'phase': 'Running'},
+                }
+                for i in range(n) ],
+    }).encode()
+
+
+async def ticker(stalls):
+    last = time.perf_counter()
+    while True:
+        await asyncio.sleep(0.001)
+        now = time.perf_counter()
+        stalls.append(now - last)
+        last = now
+
+
+async def measure(decode, body):
+    stalls = []
+    task = asyncio.ensure_future(ticker(stalls))
+    await asyncio.sleep(0.01)
+    t0 = time.perf_counter()
+    value = await decode(body)
+    elapsed = time.perf_counter() - t0
+    # Let the ticker see the last stall.
+    await asyncio.sleep(0.002)
+    task.cancel()
+    return value, elapsed, max(stalls)
+
+
+async def main(args):
+    loop = asyncio.get_event_loop()
+    body = make_body(args.items)
+    threads = concurrent.futures.ThreadPoolExecutor(1)
+    processes = concurrent.futures.ProcessPoolExecutor(1)
+    # Start the worker process before timing anything.
+    await loop.run_in_executor(processes, len, b'')
+
+    async def inline(body):
+        return json.loads(body)
+
+    async def thread_json(body):
+        return await loop.run_in_executor(threads, json.loads, body)
+
+    thread_decoder = PoolDecoder(threads, threshold=0)
+    process_decoder = PoolDecoder(processes, threshold=0)
+
+    print(f'{len(body)/2**20:.1f}MB, {args.items} items')
+    print(f'{"":16} {"elapsed":>8} {"max stall":>10} {"avoided":>8}')
+    expected = json.loads(body)
+    for label, decode, decoder in (
+            ('inline', inline, None),
+            ('thread json', thread_json, None),
+            ('thread decoder', thread_decoder.decode, thread_decoder),
+            ('process decoder', process_decoder.decode, process_decoder)):
+        value, elapsed, stall = await measure(decode, body)
+        assert value == expected
+        avoided = ''
+        if decoder is not None:
+            avoided = f'{decoder.avoided_seconds:.3f}s'
+        print(f'{label:16} {elapsed:7.3f}s {stall*1000:8.0f}ms {avoided:>8}')
+
+    threads.shutdown()
+    processes.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=50000)
+    parser.add_argument('--no-gc', action='store_true')
+    args = parser.parse_args()
+    if args.no_gc:
+        gc.disable()
+    asyncio.get_event_loop().run_until_complete(main(args))
@@ -0,0 +1,459 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''End to end client benchmark, against a synthetic apiserver.
+
+    python -m ak8s.bench.e2e 1.9 -o before.json
+    python -m ak8s.bench.e2e 1.9 -o after.json --compare before.json
+
+Starts an aiohttp server in a child process, which serves lists and watch
+streams of synthetic pods and nodes, and runs the real AK8sClient against
+it:
+
+    watch        events per second through stream_op
+    list         time to the last item of a pod list (there is no
+                 streaming list, so the first item comes with the last)
+    nodes        the same, for a node list
+    read         p50 and p99 latency of read_namespaced_pod
+    memory       peak RSS of the client process, and the allocations and
+                 bytes kept per event, when every event is kept
+
+Results are written as json, with the parameters they were measured with.
+With --compare, each result is shown beside the one from an earlier run.
+'''
+
+import argparse
+import asyncio
+import gc
+import json
+import multiprocessing
+import platform
+import resource
+import socket
+import statistics
+import sys
+import time
+import tracemalloc
+
+from aiohttp import web
+
+from ..apis import APIRegistry
+from ..apis.operation import K8sAPIOperation
+from ..apis.operation import StreamingMixin
+from ..client import AK8sClient
+
+
+def make_pod(i):
+    name = f'web-{i//10:05}-{i%10}'
+    node = f'node-{i%500:03}'
+    return {
+        'metadata': {
+            'name': name,
+            'namespace': f'team-{i%40:02}',
+            'uid': f'{i:08x}-0000-4000-8000-{i:012x}',
+            'resourceVersion': str(1000 + i),
+            'creationTimestamp': '2018-03-01T12:00:00Z',
+            'labels': {
+                'app': f'app-{i%200}',
+                'pod-template-hash': f'{i%9973:010}',
+                'tier': ('web', 'worker', 'cache')[i%3],
+            },
+            'annotations': {
+                'kubernetes.io/created-by': '{"kind":"SerializedReference"}',
+            },
+            'ownerReferences': [{
+                'apiVersion': 'extensions/v1beta1',
+                'kind': 'ReplicaSet',
+                'name': f'web-{i//10:05}',
+                'uid': f'{i//10:08x}-1111-4000-8000-000000000000',
+                'controller': True,
+                'blockOwnerDeletion': True,
+            }],
+        },
+        'spec': {
+            'volumes': [{
+                'name': 'default-token-abcde',
+                'secret': {'secretName': 'default-token-abcde', 'defaultMode': 420},
+            }],
+            'containers': [
+                {
+                    'name': cname,
+                    'image': f'registry.example.com/{cname}:1.{i%7}.0',
+                    'ports': [{'containerPort': 8080, 'protocol': 'TCP'}],
+                    'env': [
+                        {'name': f'SETTING_{j}', 'value': f'value-{j}'}
+                        for j in range(8) ],
+                    'resources': {
+                        'limits': {'cpu': '500m', 'memory': '512Mi'},
+                        'requests': {'cpu': '100m', 'memory': '128Mi'},
+                    },
+                    'volumeMounts': [{
+                        'name': 'default-token-abcde',
+                        'readOnly': True,
+                        'mountPath': '/var/run/secrets/kubernetes.io/serviceaccount',
+                    }],
+                    'livenessProbe': {
+                        'httpGet': {'path': '/healthz', 'port': 8080, 'scheme': 'HTTP'},
+                        'timeoutSeconds': 1,
+                        'periodSeconds': 10,
+                        'successThreshold': 1,
+                        'failureThreshold': 3,
+                    },
+                    'terminationMessagePath': '/dev/termination-log',
+                    'terminationMessagePolicy': 'File',
+                    'imagePullPolicy': 'IfNotPresent',
+                }
+                for cname in ('app', 'sidecar') ],
+            'restartPolicy': 'Always',
+            'terminationGracePeriodSeconds': 30,
+            'dnsPolicy': 'ClusterFirst',
+            'serviceAccountName': 'default',
+            'serviceAccount': 'default',
+            'nodeName': node,
+            'securityContext': {},
+            'schedulerName': 'default-scheduler',
+            'tolerations': [
+                {
+                    'key': f'node.kubernetes.io/{t}',
+                    'operator': 'Exists',
+                    'effect': 'NoExecute',
+                    'tolerationSeconds': 300,
+                }
+                for t in ('not-ready', 'unreachable') ],
+        },
+        'status': {
+            'phase': 'Running',
+            'conditions': [
+                {
+                    'type': t,
+                    'status': 'True',
+                    'lastProbeTime': None,
+                    'lastTransitionTime': '2018-03-01T12:00:05Z',
+                }
+                for t in ('Initialized', 'Ready', 'PodScheduled') ],
+            'hostIP': f'10.0.{i%500//250}.{i%250}',
+            'podIP': f'10.{100+i%50}.{i//250%250}.{i%250}',
+            'startTime': '2018-03-01T12:00:00Z',
+            'containerStatuses': [
+                {
+                    'name': cname,
+                    'state': {'running': {'startedAt': '2018-03-01T12:00:04Z'}},
+                    'lastState': {},
+                    'ready': True,
+                    'restartCount': i % 3,
+                    'image': f'registry.example.com/{cname}:1.{i%7}.0',
+                    'imageID': f'docker-pullable://registry.example.com/{cname}@sha256:{i:064x}',
+                    'containerID': f'docker://{i:064x}',
+                }
+                for cname in ('app', 'sidecar') ],
+            'qosClass': 'Burstable',
+        },
+    }
+
+
+def make_node(i):
+    return {
+        'metadata': {
+            'name': f'node-{i:03}',
+            'uid': f'{i:08x}-2222-4000-8000-{i:012x}',
+            'resourceVersion': str(5000 + i),
+            'creationTimestamp': '2018-02-01T00:00:00Z',
+            'labels': {
+                'beta.kubernetes.io/arch': 'amd64',
+                'beta.kubernetes.io/os': 'linux',
+                'kubernetes.io/hostname': f'node-{i:03}',
+                'failure-domain.beta.kubernetes.io/zone': f'zone-{i%3}',
+            },
+            'annotations': {
+                'node.alpha.kubernetes.io/ttl': '0',
+                'volumes.kubernetes.io/controller-managed-attach-detach': 'true',
+            },
+        },
+        'spec': {
+            'podCIDR': f'10.{100+i%50}.{i%250}.0/24',
+            'externalID': f'node-{i:03}',
+        },
+        'status': {
+            'capacity': {'cpu': '16', 'memory': '65863796Ki', 'pods': '110'},
+            'allocatable': {'cpu': '15800m', 'memory': '65249396Ki', 'pods': '110'},
+            'conditions': [
+                {
+                    'type': t,
+                    'status': 'True' if t == 'Ready' else 'False',
+                    'lastHeartbeatTime': '2018-03-01T12:00:00Z',
+                    'lastTransitionTime': '2018-02-01T00:00:10Z',
+                    'reason': f'Kubelet{t}',
+                    'message': f'kubelet reports {t}',
+                }
+                for t in ('OutOfDisk', 'MemoryPressure', 'DiskPressure', 'Ready') ],
+            'addresses': [
+                {'type': 'InternalIP', 'address': f'10.0.{i//250}.{i%250}'},
+                {'type': 'Hostname', 'address': f'node-{i:03}'},
+            ],
+            'daemonEndpoints': {'kubeletEndpoint': {'Port': 10250}},
+            'nodeInfo': {
+                'machineID': f'{i:032x}',
+                'systemUUID': f'{i:032X}',
+                'bootID': f'{i:08x}-3333-4000-8000-000000000000',
+                'kernelVersion': '4.4.0-116-generic',
+                'osImage': 'Ubuntu 16.04.4 LTS',
+                'containerRuntimeVersion': 'docker://17.3.2',
+                'kubeletVersion': 'v1.9.3',
+                'kubeProxyVersion': 'v1.9.3',
+                'operatingSystem': 'linux',
+                'architecture': 'amd64',
+            },
+            'images': [
+                {
+                    'names': [f'registry.example.com/image-{j}@sha256:{j:064x}',
+                              f'registry.example.com/image-{j}:1.0.{j}'],
+                    'sizeBytes': 100000000 + j,
+                }
+                for j in range(30) ],
+        },
+    }
+
+
+def serve(args, conn, path=None):
+    '''Run the synthetic apiserver, sending its port through `conn`.
+
+    If `path` is given, it also listens on that unix socket.
+    '''
+
+    pods = [ make_pod(i) for i in range(args.pods) ]
+    pod_list = json.dumps({
+            'kind': 'PodList',
+            'apiVersion': 'v1',
+            'metadata': {'resourceVersion': '999999'},
+            'items': pods,
+    }).encode()
+    node_list = json.dumps({
+            'kind': 'NodeList',
+            'apiVersion': 'v1',
+            'metadata': {'resourceVersion': '999999'},
+            'items': [ make_node(i) for i in range(args.nodes) ],
+    }).encode()
+    pod = json.dumps({'kind': 'Pod', 'apiVersion': 'v1', **pods[0]}).encode()
+    events = [
+            json.dumps({
+                'type': 'MODIFIED',
+                'object': {'kind': 'Pod', 'apiVersion': 'v1', **p},
+            }).encode() + b'\n'
+            for p in pods ]
+
+    async def list_pods(request):
+        if request.query.get('watch') != 'true':
+            return web.Response(body=pod_list, content_type='application/json')
+        resp = web.StreamResponse()
+        resp.content_type = 'application/json'
+        await resp.prepare(request)
+        for start in range(0, args.events, 100):
+            await resp.write(b''.join(
+                    events[i % len(events)]
+                    for i in range(start, min(start + 100, args.events)) ))
+        return resp
+
+    async def list_nodes(request):
+        return web.Response(body=node_list, content_type='application/json')
+
+    async def read_pod(request):
+        return web.Response(body=pod, content_type='application/json')
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/api/v1/pods', list_pods)
+        app.router.add_get('/api/v1/nodes', list_nodes)
+        app.router.add_get('/api/v1/namespaces/{namespace}/pods/{name}', read_pod)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        await web.SockSite(runner, sock).start()
+        if path is not None:
+            await web.UnixSite(runner, path).start()
+        conn.send(sock.getsockname()[1])
+        await asyncio.Event().wait()
+
+    asyncio.get_event_loop().run_until_complete(main())
+
+
+def make_registry(release):
+    registry = APIRegistry(release=release)
+
+    @registry.add_api_base(r'(?:\w+\.)?(?:read|list)\w+')
+    class K8sAPIReadItemOrCollectionOperation(
+            StreamingMixin.bind_stream_condition(lambda self: self.args.get('watch')),
+            K8sAPIOperation):
+        pass
+
+    return registry
+
+
+def peak_rss():
+    # ru_maxrss is in kilobytes on linux, and bytes on macos.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+async def bench_watch(apis, n):
+    count = 0
+    t0 = time.perf_counter()
+    async for ev, pod in apis.core_v1.list_pod_for_all_namespaces(watch=True):
+        pod.metadata.name
+        count += 1
+    elapsed = time.perf_counter() - t0
+    assert count == n, (count, n)
+    return {'events': count, 'seconds': elapsed, 'events_per_second': count / elapsed}
+
+
+async def bench_list(list_op):
+    # The client has no streaming list, the whole body is read and decoded
+    # before the first item, so only the time to the last one is measured.
+    t0 = time.perf_counter()
+    lst = await list_op()
+    for item in lst.items:
+        item.metadata.name
+    elapsed = time.perf_counter() - t0
+    return {'items': len(lst.items), 'seconds': elapsed}
+
+
+async def bench_read(apis, n):
+    latencies = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await apis.core_v1.read_namespaced_pod(
+                namespace='team-00', name='web-00000-0')
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+    return {
+        'ops': n,
+        'p50_seconds': statistics.median(latencies),
+        'p99_seconds': latencies[min(n - 1, int(n * 0.99))],
+    }
+
+
+async def bench_memory(apis, n):
+    # tracemalloc sees live allocations, so the events are kept until the
+    # end, as a cache would.
+    kept = []
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        events = apis.core_v1.list_pod_for_all_namespaces(watch=True)
+        async for ev, pod in events:
+            pod.metadata.name
+            kept.append(pod)
+            if len(kept) == n:
+                break
+        await events.aclose()
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    blocks = sum( s.count_diff for s in stats )
+    size = sum( s.size_diff for s in stats )
+    return {
+        'events': len(kept),
+        'allocations_per_event': blocks / len(kept),
+        'bytes_per_event': size / len(kept),
+    }
+
+
+async def run(args, port):
+    registry = make_registry(args.release)
+    results = {}
+    async with AK8sClient(
+            f'http://127.0.0.1:{port}', registry=registry,
+            ca_file=None, token='bench') as ak8s:
+        apis = ak8s.bind_api_group(registry.apis)
+        # Warm up: build the classes, and open a connection.
+        await apis.core_v1.read_namespaced_pod(
+                namespace='team-00', name='web-00000-0')
+
+        results['watch'] = await bench_watch(apis, args.events)
+        results['list'] = await bench_list(apis.core_v1.list_pod_for_all_namespaces)
+        results['nodes'] = await bench_list(apis.core_v1.list_node)
+        results['read'] = await bench_read(apis, args.reads)
+        results['memory'] = await bench_memory(apis, args.kept_events)
+    results['memory']['peak_rss_bytes'] = peak_rss()
+    return results
+
+
+def show(results, baseline=None):
+    for section, values in results.items():
+        for key, value in values.items():
+            line = f'{section+"."+key:32} {value:14.6g}'
+            if baseline is not None:
+                old = baseline.get(section, {}).get(key)
+                if old:
+                    line += f' {old:14.6g} {value/old:7.2f}x'
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument('--pods', type=int, default=10000)
+    parser.add_argument('--nodes', type=int, default=500)
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--reads', type=int, default=1000)
+    parser.add_argument(
+            '--kept-events', type=int, default=5000,
+            help='How many events to keep for the memory results.')
+    parser.add_argument(
+            '-o', '--output', metavar='PATH',
+            help='Where to write the results as json.')
+    parser.add_argument(
+            '--compare', metavar='PATH',
+            help='Results of an earlier run to compare with.')
+    args = parser.parse_args()
+
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve, args=(args, child), daemon=True)
+    server.start()
+    try:
+        port = parent.recv()
+        results = asyncio.get_event_loop().run_until_complete(run(args, port))
+    finally:
+        server.terminate()
+
+    doc = {
+        'release': args.release,
+        'parameters': {
+            'pods': args.pods,
+            'nodes': args.nodes,
+            'events': args.events,
+            'reads': args.reads,
+            'kept_events': args.kept_events,
+        },
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)['results']
+    show(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(doc, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Registry memory benchmark.
+
+    python -m ak8s.bench.memory 1.7 1.8 1.9
+
+Builds a registry per release and reports the memory each one adds, first
+with separate registries, then with registries sharing a DefinitionStore.
+Every model and api is built (--touch all, the default), or none of them
+(--touch none).
+'''
+
+import argparse
+import gc
+import tracemalloc
+
+from ..apis import APIRegistry
+from ..data import speccache
+from ..models import DefinitionStore
+
+
+def touch_all(registry):
+    for name in list(registry._model_desc):
+        registry.models[name]
+    for name in list(registry._api_desc):
+        registry.apis[name]
+
+
+def measure(releases, *, store, touch):
+    # Start from scratch, loaded caches are kept for the life of the process.
+    speccache._loaded.clear()
+    gc.collect()
+
+    registries = []
+    usage = []
+    tracemalloc.start()
+    try:
+        for release in releases:
+            before = tracemalloc.get_traced_memory()[0]
+            registry = APIRegistry(release=release, store=store)
+            if touch:
+                touch_all(registry)
+            registries.append(registry)
+            gc.collect()
+            usage.append(tracemalloc.get_traced_memory()[0] - before)
+    finally:
+        tracemalloc.stop()
+
+    return usage
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('releases', metavar='RELEASE', nargs='+')
+    parser.add_argument(
+            '--touch', choices=('all', 'none'), default='all')
+    args = parser.parse_args()
+
+    touch = args.touch == 'all'
+    separate = measure(args.releases, store=None, touch=touch)
+    store = DefinitionStore()
+    shared = measure(args.releases, store=store, touch=touch)
+
+    print(f'{"release":10} {"separate":>12} {"shared":>12}')
+    for release, a, b in zip(args.releases, separate, shared):
+        print(f'{release:10} {a/2**20:10.2f}MB {b/2**20:10.2f}MB')
+    print(f'{"total":10} {sum(separate)/2**20:10.2f}MB '
+            f'{sum(shared)/2**20:10.2f}MB')
+    print(store)
@@ -0,0 +1,55 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Operation construction benchmark.
+
+    python -m ak8s.bench.operations 1.9
+
+Reports the time to create (and replace arguments of) a few typical
+operations, per operation.
+'''
+
+import argparse
+import timeit
+
+from ..apis import APIRegistry
+
+
+CASES = [
+    ('read', 'read_namespaced_pod("nginx", "default")'),
+    ('list', 'list_namespaced_pod(namespace="default", labelSelector="app=nginx")'),
+    ('watch', 'list_namespaced_pod("default", watch=True, resourceVersion="10")'),
+    ('replace', 'watch.replace(resourceVersion="11")'),
+]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument('--number', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    registry = APIRegistry(release=args.release)
+    core_v1 = registry.apis.core_v1
+    namespace = dict(
+            read_namespaced_pod=core_v1.read_namespaced_pod,
+            list_namespaced_pod=core_v1.list_namespaced_pod,
+            watch=core_v1.list_namespaced_pod('default', watch=True))
+
+    for label, stmt in CASES:
+        best = min(timeit.repeat(
+                stmt, globals=namespace,
+                number=args.number, repeat=args.repeat))
+        print(f'{label:8} {best/args.number*1e6:8.2f}us')
@@ -0,0 +1,77 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Selector benchmark.
+
+    python -m ak8s.bench.selectors 1.9 --objects 100000
+
+Selects pods from a LabelIndex, and by testing each pod with the selector.
+'''
+
+import argparse
+import time
+import timeit
+
+from ..apis import APIRegistry
+from ..selectors import LabelIndex
+from ..selectors import Selector
+
+
+QUERIES = [
+    'app=app-7',
+    'app in (app-7,app-8),tier=db',
+    'app=app-7,tier!=db',
+    'tier=db,release>2',
+]
+
+
+def make_index(registry, n):
+    Pod = registry.models_by_gvk['', 'v1', 'Pod']
+    index = LabelIndex()
+    for i in range(n):
+        index.update('ADDED', Pod._project({
+                'metadata': {
+                    'name': f'pod-{i}',
+                    'namespace': f'ns-{i%20}',
+                    'labels': {
+                        'app': f'app-{i%1000}',
+                        'tier': ('web', 'db', 'cache')[i%3],
+                        'release': str(i%5),
+                    },
+                },
+                'status': {'phase': 'Running'},
+        }))
+    return index
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument('--objects', type=int, default=100000)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    index = make_index(APIRegistry(release=args.release), args.objects)
+    print(f'indexed {len(index)} pods in {time.perf_counter()-t0:.2f}s')
+
+    print(f'{"":30} {"found":>6} {"index":>10} {"scan":>10}')
+    for query in QUERIES:
+        selector = Selector(query)
+        found = len(index.select(selector))
+        best = min(timeit.repeat(
+                lambda: index.select(selector), number=100, repeat=3)) / 100
+        scan = min(timeit.repeat(
+                lambda: [ obj for obj in index if selector(obj) ],
+                number=1, repeat=3))
+        print(f'{query:30} {found:6} {best*1e6:8.1f}us {scan*1e3:8.1f}ms')
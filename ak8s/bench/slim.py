@@ -0,0 +1,69 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Slim registry benchmark.
+
+    python -m ak8s.bench.slim 1.9
+
+Reports the time to build every model and api class, and the memory the
+registry holds afterwards, with slim off and on.
+'''
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from ..apis import APIRegistry
+from ..data import speccache
+
+from .memory import touch_all
+
+
+def build(release, slim):
+    registry = APIRegistry(release=release, slim=slim)
+    touch_all(registry)
+    return registry
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # Compile the cache up front, it isn't what is being measured.
+    speccache.load_release(args.release)
+
+    print(f'{"slim":6} {"classes":>10} {"memory":>10}')
+    for slim in (False, True):
+        best = None
+        for _ in range(args.repeat):
+            speccache._loaded.clear()
+            gc.collect()
+            t0 = time.perf_counter()
+            build(args.release, slim)
+            elapsed = time.perf_counter() - t0
+            if best is None or elapsed < best:
+                best = elapsed
+
+        speccache._loaded.clear()
+        gc.collect()
+        tracemalloc.start()
+        registry = build(args.release, slim)
+        gc.collect()
+        usage = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        print(f'{slim!s:6} {best*1e3:8.1f}ms {usage/2**20:8.2f}MB')
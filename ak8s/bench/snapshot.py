@@ -0,0 +1,122 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Snapshot benchmark.
+
+    python -m ak8s.bench.snapshot 1.9
+
+Saves and restores a collection of pods, as json, as pickled data, and as
+snapshots.  Model instances themselves can't be pickled, their classes are
+built at runtime.
+'''
+
+import argparse
+import gc
+import io
+import json
+import pickle
+import time
+
+from ..apis import APIRegistry
+from ..models.snapshot import read_snapshot
+from ..models.snapshot import write_snapshot
+
+
+def make_pods(registry, n):
+    Pod = registry.models_by_gvk['', 'v1', 'Pod']
+    pods = []
+    for i in range(n):
+        # Decoded one at a time, the way watch events are.
+        pods.append(Pod._project(json.loads(json.dumps({
+                'metadata': {
+                    'name': f'pod-{i}',
+                    'namespace': f'ns-{i%20}',
+                    'uid': f'{i:032x}',
+                    'resourceVersion': str(i),
+                    'labels': {'app': f'app-{i%50}', 'tier': 'web'},
+                },
+                'spec': {
+                    'nodeName': f'node-{i%100}',
+                    'containers': [{
+                        'name': 'app',
+                        'image': 'registry.example.com/app:1.2.3',
+                        'ports': [{'containerPort': 8080, 'protocol': 'TCP'}],
+                        'resources': {
+                            'requests': {'cpu': '100m', 'memory': '128Mi'},
+                        },
+                        'imagePullPolicy': 'IfNotPresent',
+                        'terminationMessagePath': '/dev/termination-log',
+                    }],
+                    'restartPolicy': 'Always',
+                    'dnsPolicy': 'ClusterFirst',
+                    'schedulerName': 'default-scheduler',
+                },
+                'status': {
+                    'phase': 'Running',
+                    'hostIP': f'10.0.{i%100}.1',
+                    'conditions': [
+                        {'type': t, 'status': 'True',
+                         'lastTransitionTime': '2018-01-01T00:00:00Z'}
+                        for t in ('Initialized', 'Ready', 'PodScheduled') ],
+                },
+        }))))
+    return pods
+
+
+def timed(fn):
+    gc.collect()
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument('--number', type=int, default=50000)
+    args = parser.parse_args()
+
+    registry = APIRegistry(release=args.release)
+    Pod = registry.models_by_gvk['', 'v1', 'Pod']
+    pods = make_pods(registry, args.number)
+
+    def snapshot(compress):
+        def save():
+            fh = io.BytesIO()
+            write_snapshot(fh, pods, compress=compress)
+            return fh.getvalue()
+        def restore(blob):
+            return list(read_snapshot(io.BytesIO(blob), registry))
+        return save, restore
+
+    formats = {
+        'json': (
+            lambda: json.dumps([ p._data for p in pods ]).encode(),
+            lambda blob: [ Pod._project(d) for d in json.loads(blob) ]),
+        'pickle': (
+            lambda: pickle.dumps([ p._data for p in pods ], protocol=4),
+            lambda blob: [ Pod._project(d) for d in pickle.loads(blob) ]),
+        'snapshot': snapshot(None),
+        'snap+zlib': snapshot('zlib'),
+        'snap+lzma': snapshot('lzma'),
+    }
+
+    print(f'{"":10} {"save":>8} {"restore":>8} {"size":>9}')
+    for label, (save, restore) in formats.items():
+        save_time, blob = timed(save)
+        restore_time, restored = timed(lambda: restore(blob))
+        assert restored == pods
+        print(
+                f'{label:10} {save_time:7.3f}s {restore_time:7.3f}s '
+                f'{len(blob)/2**20:7.2f}MB')
@@ -0,0 +1,94 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Registry startup benchmark.
+
+    python -m ak8s.bench.startup 1.9
+
+json: parse the json spec and add it (no cache)
+cold: compile the cache from the json spec, then add it (first load)
+warm: load an existing cache and add it
+
+With --tags, the registries are limited to those api tags or groups.
+'''
+
+import argparse
+import json
+import time
+
+from ..apis import APIRegistry
+from ..data import load as load_data
+from ..data import speccache
+
+
+def bench(fn, *, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def registry_json(release, tags):
+    registry = APIRegistry(tags=tags)
+    registry.add_spec(json.loads(load_data(f'release-{release}.json')))
+    return registry
+
+
+def registry_cold(release, tags):
+    registry = APIRegistry(tags=tags)
+    registry.add_spec_cache(
+            speccache.load_release(release, write=False, rebuild=True))
+    return registry
+
+
+def registry_warm(release, tags):
+    # Loaded caches are kept for the life of the process, forget them so
+    # that the cache file is actually read.
+    speccache._loaded.clear()
+    return APIRegistry(release=release, tags=tags)
+
+
+def use(registry):
+    # Touch a typical handful of models and apis, so lazy decoding is
+    # accounted for.
+    registry.models_by_gvk['', 'v1', 'Pod']
+    registry.apis.core_v1.list_namespaced_pod
+    registry.apis.core_v1.read_namespaced_pod
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--tags', metavar='TAG', nargs='+')
+    args = parser.parse_args()
+
+    # Make sure there is a cache on disk for the warm runs.
+    speccache.load_release(args.release)
+
+    for label, construct in (
+            ('json', registry_json),
+            ('cold', registry_cold),
+            ('warm', registry_warm)):
+        construct_time = bench(
+                lambda: construct(args.release, args.tags), repeat=args.repeat)
+        use_time = bench(
+                lambda: use(construct(args.release, args.tags)),
+                repeat=args.repeat)
+        print(f'{label:5} construct {construct_time*1e3:8.2f}ms'
+                f'  construct+use {use_time*1e3:8.2f}ms')
@@ -0,0 +1,118 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Unix socket and loopback TCP benchmark.
+
+    python -m ak8s.bench.transport 1.9 --reads 5000
+
+Runs the synthetic apiserver of ak8s.bench.e2e, listening on both, and
+compares them with sequential and concurrent reads, and a watch.  Neither
+uses TLS, so this is only the difference of the sockets; TLS on loopback
+costs more again.
+'''
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from ..client import AK8sClient
+from .e2e import bench_read
+from .e2e import bench_watch
+from .e2e import make_registry
+from .e2e import serve
+
+
+async def bench_concurrent(apis, n, concurrency):
+    async def reader(count):
+        for _ in range(count):
+            await apis.core_v1.read_namespaced_pod(
+                    namespace='team-00', name='web-00000-0')
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+            reader(n // concurrency) for _ in range(concurrency) ))
+    elapsed = time.perf_counter() - t0
+    return {'ops_per_second': n // concurrency * concurrency / elapsed}
+
+
+async def run(args, url):
+    registry = make_registry(args.release)
+    async with AK8sClient(
+            url, registry=registry, ca_file=None, token='bench') as ak8s:
+        apis = ak8s.bind_api_group(registry.apis)
+        # Warm up: build the classes, and open a connection.
+        await apis.core_v1.read_namespaced_pod(
+                namespace='team-00', name='web-00000-0')
+
+        results = {}
+        results['read'] = await bench_read(apis, args.reads)
+        results['concurrent'] = await bench_concurrent(
+                apis, args.reads, args.concurrency)
+        results['watch'] = await bench_watch(apis, args.events)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument('--pods', type=int, default=1000)
+    parser.add_argument('--nodes', type=int, default=0)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--reads', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'apiserver.sock')
+        parent, child = multiprocessing.Pipe()
+        server = multiprocessing.Process(
+                target=serve, args=(args, child, path), daemon=True)
+        server.start()
+        try:
+            port = parent.recv()
+            urls = {
+                'tcp': f'http://127.0.0.1:{port}',
+                'unix': f'unix://{path}',
+            }
+            runs = { name: [] for name in urls }
+            loop = asyncio.get_event_loop()
+            # Alternate, so that neither gets a warmer machine.
+            for _ in range(args.repeat):
+                for name, url in urls.items():
+                    runs[name].append(loop.run_until_complete(run(args, url)))
+        finally:
+            server.terminate()
+
+    def best(name, section, key, pick):
+        return pick( r[section][key] for r in runs[name] )
+
+    rows = [
+        ('read p50 (us)', 'read', 'p50_seconds', min, 1e6),
+        ('read p99 (us)', 'read', 'p99_seconds', min, 1e6),
+        (f'reads/s x{args.concurrency}', 'concurrent', 'ops_per_second', max, 1),
+        ('watch events/s', 'watch', 'events_per_second', max, 1),
+    ]
+    print(f'{"":24} {"tcp":>12} {"unix":>12} {"unix/tcp":>9}')
+    for label, section, key, pick, scale in rows:
+        tcp = best('tcp', section, key, pick)
+        unix = best('unix', section, key, pick)
+        print(f'{label:24} {tcp*scale:12.1f} {unix*scale:12.1f} {unix/tcp:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
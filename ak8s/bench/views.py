@@ -0,0 +1,81 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Projection cache benchmark.
+
+    python -m ak8s.bench.views 1.9
+
+Reads attribute chains from many pods, like a watch cache would, with and
+without cache_views().  The first pass over the pods builds the cached
+views, later passes reuse them.
+'''
+
+import argparse
+import time
+
+from ..apis import APIRegistry
+from ..models import cache_views
+
+
+def make_pods(registry, n):
+    Pod = registry.models_by_gvk['', 'v1', 'Pod']
+    return [
+            Pod._project({
+                'apiVersion': 'v1',
+                'kind': 'Pod',
+                'metadata': {
+                    'name': f'pod-{i}',
+                    'namespace': 'default',
+                    'labels': {'app': 'nginx'},
+                },
+                'spec': {
+                    'containers': [
+                        {'name': 'nginx', 'image': 'nginx:1.13'},
+                        {'name': 'sidecar', 'image': 'busybox'},
+                    ],
+                },
+                'status': {'phase': 'Running'},
+            })
+            for i in range(n) ]
+
+
+def read(pods):
+    for pod in pods:
+        pod.metadata.name
+        pod.metadata.namespace
+        pod.status.phase
+        for c in pod.spec.containers:
+            c.image
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument('--pods', type=int, default=100000)
+    parser.add_argument('--passes', type=int, default=5)
+    args = parser.parse_args()
+
+    registry = APIRegistry(release=args.release)
+
+    for label, prepare in (
+            ('plain', lambda pod: pod),
+            ('cached', cache_views)):
+        pods = [ prepare(pod) for pod in make_pods(registry, args.pods) ]
+        times = []
+        for _ in range(args.passes):
+            t0 = time.perf_counter()
+            read(pods)
+            times.append(time.perf_counter() - t0)
+        print(f'{label:8} first {times[0]*1e3:8.1f}ms'
+                f'  later {min(times[1:])*1e3:8.1f}ms')
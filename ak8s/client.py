@@ -20,6 +20,7 @@ import os
 from pathlib import Path
 import ssl
 from urllib.parse import urljoin
+from urllib.parse import urlsplit
 
 import aiohttp
 import yaml
@@ -48,8 +49,14 @@ class AK8sClient:
     def __init__(
             self, url=None, *,
             registry,
+            decoder=None,
+            validate=False,
+            connection_limit=100,
+            transport=None,
             **kw):
-        if not ('ca_file' in kw and (
+        # A unix socket is to a local proxy, which authenticates for us.
+        unix = str(kw.get('url') or url or '').startswith('unix://')
+        if not unix and not ('ca_file' in kw and (
                 ('client_cert_file' in kw and 'client_key_file' in kw) or
                 'token' in kw)):
             sa_conf = self._read_serviceaccount()
@@ -60,7 +67,7 @@ class AK8sClient:
                 kw = {**kc_conf, **kw}
 
         url = kw.pop('url', url)
-        ca_file = kw.pop('ca_file')
+        ca_file = kw.pop('ca_file', None) if unix else kw.pop('ca_file')
         token = kw.pop('token', None)
         client_cert_file = kw.pop('client_cert_file', None)
         client_key_file = kw.pop('client_key_file', None)
@@ -69,23 +76,47 @@ class AK8sClient:
             raise TypeError(
                     f'AK8sClient() got an unexpected keyword argument {k!r}')
 
-        sslcontext = ssl.create_default_context(cafile=ca_file)
-        if client_cert_file is not None and client_key_file is not None:
-            sslcontext.load_cert_chain(client_cert_file, client_key_file)
-
-        elif token is not None:
-            # 1*( ALPHA / DIGIT / "-" / "." / "_" / "~" / "+" / "/" ) *"="
-            assert all( c.isalnum() or c in '-._~+/=' for c in token )
+        socket_path = None
+        if unix:
+            # No TLS, and the token is optional.  Requests are made to
+            # http://localhost, over the socket.
+            socket_path = urlsplit(url).path
+            url = 'http://localhost'
+            sslcontext = None
+            if token is not None:
+                assert all( c.isalnum() or c in '-._~+/=' for c in token )
 
         else:
-            raise TypeError(
-                    'AK8sClient() requires client_cert_file and '
-                    'client_key_file or token to be provided.')
+            sslcontext = ssl.create_default_context(cafile=ca_file)
+            if client_cert_file is not None and client_key_file is not None:
+                sslcontext.load_cert_chain(client_cert_file, client_key_file)
+
+            elif token is not None:
+                # 1*( ALPHA / DIGIT / "-" / "." / "_" / "~" / "+" / "/" ) *"="
+                assert all( c.isalnum() or c in '-._~+/=' for c in token )
+
+            else:
+                raise TypeError(
+                        'AK8sClient() requires client_cert_file and '
+                        'client_key_file or token to be provided.')
         self._url = url
+        self._socket_path = socket_path
         self._token = token
         self._sslcontext = sslcontext
         self._session = None
+        # Each watch holds a connection, so watching many namespaces at once
+        # needs more than aiohttp's default of 100.
+        self._connection_limit = connection_limit
         self._models = registry.models_by_gvk
+        # A PoolDecoder, for decoding large responses off the event loop.
+        self._decoder = decoder
+        # Check request bodies against the spec before sending them.
+        self._validate = registry.validate if validate else None
+        # Wraps the session's request function, like ak8s.replay.Recorder
+        # and Replayer.
+        self._transport = transport
+        self._request = None
+        self._api_group_bindings = {}
         self._logger = logging.getLogger(self.__class__.__qualname__)
 
     #TODO: service account config
@@ -176,25 +207,43 @@ class AK8sClient:
 
     async def __aenter__(self):
         self._session = await aiohttp.ClientSession(
+                connector=self._connector(),
                 conn_timeout=60).__aenter__()
+        self._request = self._session.request
+        if self._transport is not None:
+            self._request = self._transport.wrap(self._request)
         return self
 
+    def _connector(self):
+        if self._socket_path is not None:
+            return aiohttp.UnixConnector(
+                    self._socket_path, limit=self._connection_limit)
+        return aiohttp.TCPConnector(limit=self._connection_limit)
+
     async def __aexit__(self, *exc):
         await self._session.__aexit__(*exc)
         self._session = None
+        self._request = None
 
     def bind_api_group(self, api_group):
-        return AK8sClientAPIGroupBinding(self, api_group)
+        try:
+            return self._api_group_bindings[api_group]
+        except KeyError:
+            binding = self._api_group_bindings[api_group] = (
+                    AK8sClientAPIGroupBinding(self, api_group))
+            return binding
 
     def _set_authorization(self, headers):
         if self._token is not None:
             headers.update(authorization=f'Bearer {self._token}')
 
-    async def op(self, op):
+    async def op(self, op, *, mask=None):
         body, headers = None, {}
         self._set_authorization(headers)
 
         if op.body is not None:
+            if self._validate is not None:
+                self._validate(op.body)
             body = ak8s_payload(op.body)
 
         if 'application/json' in op.produces:
@@ -204,7 +253,7 @@ class AK8sClient:
 
         self._logger.debug('%(method)s %(path)s', dict(method=op.method, path=op.uri))
 
-        async with self._session.request(
+        async with self._request(
                 op.method, url,
                 headers=headers,
                 data=body,
@@ -221,7 +270,10 @@ class AK8sClient:
                 raise
 
             if resp.content_type == 'application/json':
-                return self._load_model(await resp.json())
+                if self._decoder is None:
+                    return self._load_model(await resp.json(), mask)
+                return self._load_model(
+                        await self._decoder.decode(await resp.read()), mask)
 
             if resp.content_type == 'text/plain':
                 return resp.text()
@@ -230,7 +282,7 @@ class AK8sClient:
 
         self._logger.debug('end %(method)s %(path)s', dict(method=op.method, path=op.uri))
 
-    async def stream_op(self, op):
+    async def stream_op(self, op, *, mask=None):
         headers = {}
         self._set_authorization(headers)
 
@@ -241,7 +293,7 @@ class AK8sClient:
 
         self._logger.debug('%(method)s %(path)s', dict(method=op.method, path=op.uri))
 
-        async with self._session.request(
+        async with self._request(
                 op.method, url,
                 headers=headers,
                 timeout=None,
@@ -258,12 +310,13 @@ class AK8sClient:
                 raise
 
             if resp.content_type == 'application/json':
-                async for line in resp.content:
-                    ev = json.loads(line)
+                async for ev in self._watch_events(resp.content):
                     type_ = ev['type']
                     data = ev.get('object')
                     if data is not None:
-                        obj = self._load_model(data)
+                        # Errors are Status objects, not masked.
+                        obj = self._load_model(
+                                data, None if type_ == 'ERROR' else mask)
                         yield type_, obj
                     else:
                         yield type_, None
@@ -281,7 +334,31 @@ class AK8sClient:
 
         raise NotImplementedError(f'What do with resp={resp} to op={op}')
 
-    async def watch(self, op):
+    async def _watch_events(self, content):
+        if self._decoder is None:
+            async for line in content:
+                yield json.loads(line)
+            return
+
+        # Decode whatever lines have arrived together as a batch, so a burst
+        # of events (like the initial state of a watch) can be decoded off
+        # the loop.
+        pending = []
+        async for chunk in content.iter_any():
+            pending.append(chunk)
+            if b'\n' not in chunk:
+                continue
+            lines = b''.join(pending).split(b'\n')
+            pending = [lines.pop()]
+            lines = [ line for line in lines if line.strip() ]
+            if lines:
+                for ev in await self._decoder.decode_lines(lines):
+                    yield ev
+        tail = b''.join(pending)
+        if tail.strip():
+            yield json.loads(tail)
+
+    async def watch(self, op, *, mask=None):
         if not op.stream:
             raise ValueError(f'Cannot watch {op}')
 
@@ -325,7 +402,7 @@ class AK8sClient:
                 op = op.replace(resourceVersion=last_version)
 
             try:
-                async for ev, obj in self.stream_op(op):
+                async for ev, obj in self.stream_op(op, mask=mask):
                     if ev == 'ERROR':
                         if obj.status == 'Failure' and obj.reason == 'Gone':
                             # too old resource version
@@ -368,8 +445,11 @@ class AK8sClient:
         kind = data['kind']
         return self._models[group, version, kind]
 
-    def _load_model(self, data):
+    def _load_model(self, data, mask=None):
         model = self._model_for_kind(data)
+        if mask is not None:
+            # Prune before anything keeps a reference to the whole object.
+            return mask.project(model, data)
         return model._project(data)
 
 
@@ -381,22 +461,29 @@ class AK8sClientAPIGroupBinding:
     def __getattr__(self, k):
         api = getattr(self._api_group, k)
         if callable(api):
-            return AK8sClientAPIBinding(self._ak8s, api)
-        return self.__class__(self._ak8s, api)
+            binding = AK8sClientAPIBinding(self._ak8s, api)
+        else:
+            binding = self._ak8s.bind_api_group(api)
+        # Bindings are cached as attributes, so the next lookup doesn't get
+        # here.
+        if not k.startswith('_'):
+            setattr(self, k, binding)
+        return binding
 
     def __dir__(self):
         yield from dir(self._api_group)
 
 
 class AK8sClientAPIBinding:
-    __slots__ = ('_ak8s', '_api', '_method')
+    __slots__ = ('_ak8s', '_api', '_method', '_methods')
 
     def __init__(self, ak8s, api, method=None):
         self._ak8s = ak8s
         self._api = api
         self._method = method
+        self._methods = None
 
-    def __call__(self, *a, **kw):
+    def __call__(self, *a, mask=None, **kw):
         op = self._api(*a, **kw)
         if self._method is not None:
             method = getattr(self._ak8s, self._method)
@@ -404,6 +491,9 @@ class AK8sClientAPIBinding:
             method = self._ak8s.stream_op
         else:
             method = self._ak8s.op
+        if mask is not None:
+            # See ak8s.models.mask.
+            return method(op, mask=mask)
         return method(op)
 
     @property
@@ -415,9 +505,16 @@ class AK8sClientAPIBinding:
         return self._api.__signature__
 
     def __getattr__(self, k):
-        if hasattr(self._ak8s, k):
-            return self.__class__(self._ak8s, self._api, k)
-        raise AttributeError(k)
+        if self._methods is None:
+            self._methods = {}
+        try:
+            return self._methods[k]
+        except KeyError:
+            pass
+        if not hasattr(self._ak8s, k):
+            raise AttributeError(k)
+        binding = self._methods[k] = self.__class__(self._ak8s, self._api, k)
+        return binding
 
 
 class AK8sNotFound(Exception):
@@ -0,0 +1,137 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Helpers for ahead of time generated model and api modules.
+
+Generated code lives in a package beside the package it is generated for,
+named after the release it was generated from (`release_1_9`).  The package
+has a submodule per api group (or definition namespace), which is imported
+when one of its names is first used; importing everything up front costs
+more than building the few classes a typical process uses.  The package
+carries the stamp of the spec it was generated from, and is ignored if it
+doesn't match the installed spec.
+'''
+
+import collections.abc
+import importlib
+import keyword
+import os
+from pathlib import Path
+import re
+
+from .data import speccache
+
+
+# Bump this when the generated code changes in an incompatible way, so that
+# packages generated by an older version are ignored.
+FORMAT = 1
+
+
+def module_name(release):
+    return 'release_' + re.sub(r'\W', '_', release)
+
+
+def module_path(package, release):
+    pkg = importlib.import_module(package)
+    return Path(pkg.__file__).parent/module_name(release)
+
+
+def pyident(name):
+    '''Mangle `name` into a python identifier.
+
+    >>> pyident('io.k8s.api.core.v1.Pod')
+    'io_k8s_api_core_v1_Pod'
+    '''
+
+    ident = re.sub(r'\W', '_', name)
+    if keyword.iskeyword(ident) or not ident.isidentifier():
+        ident += '_'
+    return ident
+
+
+def is_pyident(name):
+    return name.isidentifier() and not keyword.iskeyword(name)
+
+
+def pydoc(doc):
+    '''Source for a docstring literal with the exact value of `doc`.'''
+
+    if '\\' in doc or "'''" in doc or doc.endswith("'") or '\r' in doc:
+        return repr(doc)
+    return f"'''{doc}'''"
+
+
+def spec_stamp(release):
+    return (FORMAT, *speccache.load_release(release).source_stamp)
+
+
+def load_generated(package, release):
+    '''Import a generated module, if present and matching the spec.'''
+
+    name = f'{package}.{module_name(release)}'
+    try:
+        module = importlib.import_module(name)
+    except ModuleNotFoundError as e:
+        if e.name != name:
+            raise
+        return None
+
+    if module.spec_stamp != spec_stamp(release):
+        return None
+
+    return module
+
+
+def write_package(pth, modules):
+    '''Write generated `modules` ({name: source}) as the package `pth`.
+
+    Modules left over from a previous generation are removed.
+    '''
+
+    pth = Path(pth)
+    pth.mkdir(parents=True, exist_ok=True)
+    for old in pth.glob('*.py'):
+        if old.stem not in modules:
+            old.unlink()
+    for name, source in modules.items():
+        dest = pth/f'{name}.py'
+        tmp = pth/f'{name}.py.{os.getpid()}.tmp'
+        tmp.write_text(source)
+        os.replace(str(tmp), str(dest))
+
+
+class GeneratedIndex(collections.abc.Mapping):
+    '''Mapping of names to generated classes, imported on demand.
+
+    `index` maps each name to the submodule of `package` that declares it,
+    in its `declared` dict.
+    '''
+
+    def __init__(self, package, index):
+        self._package = package
+        self._index = index
+
+    def __getitem__(self, name):
+        module = importlib.import_module(
+                f'{self._package}.{self._index[name]}')
+        return module.declared[name]
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
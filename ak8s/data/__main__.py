@@ -0,0 +1,29 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import argparse
+
+from .speccache import cache_path
+from .speccache import load_release
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+            description='Precompile release spec caches.')
+    parser.add_argument('releases', metavar='RELEASE', nargs='+')
+    args = parser.parse_args()
+
+    for release in args.releases:
+        load_release(release, rebuild=True)
+        print(cache_path(release))
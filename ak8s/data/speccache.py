@@ -0,0 +1,382 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Precompiled release spec cache.
+
+Decoding the bundled release specs with json.loads is a noticeable part of
+process startup, and most of the decoded definitions are never used.  The
+cache format stores each definition, operation and path parameter list as a
+separately marshalled blob, along with an index that has just enough
+information for the registries to declare names (gvks, tags, operationIds)
+and to select subsets (the definitions each entry refers to), as well as a
+content digest of each entry for sharing them (see DefinitionStore).  Blobs
+are decoded only when the registry asks for them.  Entries with description
+text have a second, slim blob without it, for slim registries, and a digest
+of that too.
+
+The cache file is mapped rather than read, so blobs that are never decoded
+(the slim or full variant that isn't used, and whatever isn't touched) stay
+on disk.
+
+Layout:
+
+    MAGIC | u32 index size | marshal(index) | blobs...
+
+The cache is stamped with the size and a checksum of the source spec, not
+its mtime, so caches built with the package (see setup.py) stay valid when
+it is installed.  A stale cache is rebuilt if it can be written, otherwise
+the json spec is used as it is (see PlainSpec), which is much quicker than
+compiling it in every process.
+'''
+
+import collections.abc
+import hashlib
+import json
+import marshal
+import mmap
+import os
+from pathlib import Path
+import struct
+import zlib
+
+from .subset import refs_of
+from .subset import spec_operations
+from .subset import strip_descriptions
+
+
+__all__ = '''
+    LazyDesc
+    LazyList
+    PlainSpec
+    SpecCache
+    compile_spec
+    decode
+    digest_of
+    load_release
+'''.split()
+
+
+MAGIC = b'ak8s-spec\0'
+FORMAT = 5
+
+_header = struct.Struct(f'<{len(MAGIC)}sI')
+
+# Keys that are answered from the index, without decoding the blob.  These
+# are the keys that the registries look at when a spec is added.
+EAGER_KEYS = frozenset({
+        'x-kubernetes-group-version-kind',
+        'tags',
+        'operationId',
+})
+
+
+class _Lazy:
+    __slots__ = (
+            '_buf', '_span', '_slim_span', '_value', 'digest', 'slim_digest')
+
+    def __init__(self, buf, spans, digests):
+        self._buf = buf
+        self._span, self._slim_span = spans
+        self._value = None
+        self.digest, self.slim_digest = digests
+
+    def decode(self, *, cache=True, slim=False):
+        if slim:
+            offset, size = self._slim_span
+            return marshal.loads(self._buf[offset:offset+size])
+        if self._value is not None:
+            return self._value
+        offset, size = self._span
+        value = marshal.loads(self._buf[offset:offset+size])
+        if cache:
+            self._value = value
+        return value
+
+    def _raw(self):
+        offset, size = self._span
+        return self._buf[offset:offset+size]
+
+    def __eq__(self, them):
+        if isinstance(them, _Lazy) and self._raw() == them._raw():
+            return True
+        if isinstance(them, _Lazy):
+            them = them.decode()
+        return self.decode() == them
+
+    __hash__ = None
+
+    def __repr__(self):
+        state = 'decoded' if self._value is not None else 'pending'
+        return f'<{self.__class__.__name__} {state} {self._span[1]} bytes>'
+
+
+class LazyDesc(_Lazy, collections.abc.Mapping):
+    '''A spec descriptor (a json object) decoded on first use.
+
+    `refs` is the set of definitions that the descriptor refers to.
+    '''
+
+    __slots__ = '_eager', 'refs'
+
+    def __init__(self, buf, spans, digests, eager, refs):
+        super().__init__(buf, spans, digests)
+        self._eager = eager
+        self.refs = refs
+
+    def __getitem__(self, k):
+        if self._value is None and k in EAGER_KEYS:
+            return self._eager[k]
+        return self.decode()[k]
+
+    def __contains__(self, k):
+        if self._value is None and k in EAGER_KEYS:
+            return k in self._eager
+        return k in self.decode()
+
+    def __iter__(self):
+        return iter(self.decode())
+
+    def __len__(self):
+        return len(self.decode())
+
+
+class LazyList(_Lazy, collections.abc.Sequence):
+    '''A spec list (path parameters) decoded on first use.'''
+
+    __slots__ = ()
+
+    def __getitem__(self, i):
+        return self.decode()[i]
+
+    def __len__(self):
+        return len(self.decode())
+
+
+def digest_of(desc, *, slim=False):
+    '''Content digest of a spec descriptor.
+
+    Equal descriptors have equal digests, whether they are precompiled or
+    not, and regardless of key order.  The `slim` digest of a precompiled
+    descriptor is that of its slim variant, the same as the digest of it
+    once decoded with slim=True.  Other descriptors are taken as they are.
+    '''
+
+    digest = getattr(desc, 'slim_digest' if slim else 'digest', None)
+    if digest is not None:
+        return digest
+    canonical = json.dumps(desc, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode(), digest_size=16).digest()
+
+
+def decode(obj, *, cache=True, slim=False):
+    '''Return the decoded value of `obj` if it is lazy, otherwise `obj`.
+
+    Unless `cache` is false, the lazy object keeps the decoded value.  A
+    `slim` decode is without description text, and is never kept.
+    '''
+
+    if isinstance(obj, _Lazy):
+        return obj.decode(cache=cache, slim=slim)
+    if slim:
+        return strip_descriptions(obj)
+    return obj
+
+
+class SpecCache:
+    def __init__(self, data):
+        magic, index_size = _header.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('not a spec cache')
+        start = _header.size + index_size
+        self._index = marshal.loads(data[_header.size:start])
+        self._buf = memoryview(data)[start:]
+
+    @property
+    def stamp(self):
+        return self._index['stamp']
+
+    @property
+    def source_stamp(self):
+        '''The part of the stamp that identifies the source spec.'''
+        return self._index['stamp'][-2:]
+
+    def definitions(self):
+        '''Generate (name, desc) pairs.'''
+
+        for name, entry in self._index['definitions'].items():
+            spans, digests, eager, refs = entry
+            yield name, LazyDesc(self._buf, spans, digests, eager, refs)
+
+    def operations(self):
+        '''Generate (path, pathparams, method, opdesc) tuples.'''
+
+        for pth, pathparams, ops in self._index['paths']:
+            if pathparams is not None:
+                pathparams = LazyList(self._buf, *pathparams)
+            for method, spans, digests, eager, refs in ops:
+                yield pth, pathparams, method, LazyDesc(
+                        self._buf, spans, digests, eager, refs)
+
+
+class PlainSpec:
+    '''A json spec, with the interface of SpecCache.
+
+    Used when a cache is stale and can't be written.
+    '''
+
+    def __init__(self, spec, stamp):
+        self._spec = spec
+        self.stamp = stamp
+
+    @property
+    def source_stamp(self):
+        return self.stamp[-2:]
+
+    def definitions(self):
+        return iter(self._spec['definitions'].items())
+
+    def operations(self):
+        return spec_operations(self._spec)
+
+
+def compile_spec(spec, stamp=None):
+    '''Compile a swagger spec into the cache format.'''
+
+    blobs = bytearray()
+
+    def put(obj):
+        blob = marshal.dumps(obj)
+        span = len(blobs), len(blob)
+        blobs.extend(blob)
+        digest = digest_of(obj)
+        slim = strip_descriptions(obj)
+        slim_blob = marshal.dumps(slim)
+        if slim_blob == blob:
+            slim_span, slim_digest = span, digest
+        else:
+            slim_span = len(blobs), len(slim_blob)
+            slim_digest = digest_of(slim)
+            blobs.extend(slim_blob)
+        return (span, slim_span), (digest, slim_digest)
+
+    def eager(desc):
+        return { k: desc[k] for k in EAGER_KEYS if k in desc }
+
+    definitions = {
+            name: (*put(desc), eager(desc), refs_of(desc))
+            for name, desc in spec['definitions'].items() }
+
+    paths = []
+    for pth, pthdesc in spec['paths'].items():
+        pathparams = pthdesc.get('parameters')
+        ppentry = put(pathparams) if pathparams is not None else None
+        # Path parameters are decoded with the operation, so their refs are
+        # included in the operation's.
+        ops = [
+                (method, *put(opdesc), eager(opdesc),
+                    refs_of(opdesc) | refs_of(pathparams))
+                for method, opdesc in pthdesc.items()
+                if method != 'parameters' ]
+        paths.append((pth, ppentry, ops))
+
+    index = marshal.dumps(dict(
+            stamp=stamp,
+            definitions=definitions,
+            paths=paths))
+
+    return _header.pack(MAGIC, len(index)) + index + blobs
+
+
+def _map(pth):
+    try:
+        with open(pth, 'rb') as fh:
+            return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # Not a regular file (or an empty one), perhaps inside a zip.
+        return __loader__.get_data(str(pth))
+
+
+def _datadir():
+    return Path(__loader__.get_filename()).parent
+
+
+def _stamp(data):
+    # marshal isn't portable across its versions.  The source is identified
+    # by content, an mtime doesn't survive installing the package.
+    return FORMAT, marshal.version, len(data), zlib.crc32(data)
+
+
+_loaded = {}
+
+
+def cache_path(release):
+    return _datadir()/f'release-{release}.cache'
+
+
+def load_release(release, *, write=True, rebuild=False):
+    '''Load the spec cache for a bundled release, building it if necessary.
+
+    If the cache is missing or stale it is compiled from the json spec, and
+    written beside it, when `write` is true and the data directory is
+    writable.  Otherwise the json spec is returned as a PlainSpec, unless
+    `rebuild` asks for it to be compiled anyway.  Caches are kept for the
+    life of the process, as they are immutable.
+    '''
+
+    if not rebuild and release in _loaded:
+        return _loaded[release]
+
+    source = __loader__.get_data(str(_datadir()/f'release-{release}.json'))
+    stamp = _stamp(source)
+    pth = cache_path(release)
+
+    if not rebuild:
+        try:
+            cache = SpecCache(_map(pth))
+        except (OSError, ValueError, EOFError, struct.error):
+            pass
+        else:
+            if cache.stamp == stamp:
+                _loaded[release] = cache
+                return cache
+
+    fh = tmp = None
+    if write:
+        tmp = pth.with_name(f'{pth.name}.{os.getpid()}.tmp')
+        try:
+            fh = open(str(tmp), 'wb')
+        except OSError:
+            # Installed somewhere read-only, the cache should have been
+            # built with the package (python -m ak8s.data).
+            pass
+
+    spec = json.loads(source)
+    if fh is None and not rebuild:
+        cache = _loaded[release] = PlainSpec(spec, stamp)
+        return cache
+
+    data = compile_spec(spec, stamp)
+    if fh is not None:
+        try:
+            with fh:
+                fh.write(data)
+            os.replace(str(tmp), str(pth))
+        except OSError:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+
+    cache = _loaded[release] = SpecCache(data)
+    return cache
@@ -0,0 +1,218 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Subsets of a spec, by api tag or group.
+
+A subset keeps the operations whose tag is allowed, and the transitive
+closure of the definitions they reference.  Tags can be given as they appear
+in the spec (rbacAuthorization_v1) or as registry names (rbac_authorization_v1),
+and a group (apps, rbac_authorization) allows all of its versions.
+
+    python -m ak8s.data.subset --release 1.9 core_v1 apps_v1beta2 batch_v1 -o spec.json
+'''
+
+import argparse
+import collections.abc
+import json
+import re
+import sys
+
+from . import load as load_data
+
+
+__all__ = '''
+    definition_closure
+    prune_spec
+    refs_of
+    spec_operations
+    strip_descriptions
+    tag_allowed
+'''.split()
+
+
+# Definitions that are needed regardless of the operations, the client loads
+# these from error responses.
+ALWAYS = frozenset({
+        'io.k8s.apimachinery.pkg.apis.meta.v1.Status',
+})
+
+
+def _normalize(tag):
+    return tag.replace('_', '').lower()
+
+
+def _group(tag):
+    return re.sub(r'_?v\d+(?:(?:alpha|beta)\d+)?$', '', tag)
+
+
+def tag_allowed(tag, tags):
+    '''Is the spec tag `tag` selected by the allowlist `tags`?
+
+    >>> tag_allowed('apps_v1beta2', {'apps'})
+    True
+    >>> tag_allowed('rbacAuthorization_v1', {'rbac_authorization_v1'})
+    True
+    >>> tag_allowed('core_v1', {'batch_v1'})
+    False
+    '''
+
+    allowed = { _normalize(t) for t in tags }
+    return (
+            _normalize(tag) in allowed or
+            _normalize(_group(tag)) in allowed)
+
+
+def spec_operations(spec):
+    '''Generate (path, pathparams, method, opdesc) tuples of a spec.'''
+
+    for pth, pthdesc in spec['paths'].items():
+        pathparams = pthdesc.get('parameters')
+        for method, opdesc in pthdesc.items():
+            if method == 'parameters':
+                continue
+            yield pth, pathparams, method, opdesc
+
+
+def refs_of(desc):
+    '''The set of definition names referenced anywhere in `desc`.
+
+    Precompiled descs (see speccache) know their refs without being decoded.
+    '''
+
+    refs = getattr(desc, 'refs', None)
+    if refs is not None:
+        return refs
+    refs = set()
+    _collect_refs(desc, refs)
+    return frozenset(refs)
+
+
+def _collect_refs(value, refs):
+    if isinstance(value, collections.abc.Mapping):
+        for k, v in value.items():
+            if k == '$ref' and isinstance(v, str):
+                refs.add(re.sub(r'^#/definitions/', '', v))
+            else:
+                _collect_refs(v, refs)
+    elif (isinstance(value, collections.abc.Sequence) and
+            not isinstance(value, str)):
+        for v in value:
+            _collect_refs(v, refs)
+
+
+def strip_descriptions(desc):
+    '''Return a copy of `desc` without description text.
+
+    Only string valued descriptions are dropped, a property that happens to
+    be named description is kept.
+    '''
+
+    if isinstance(desc, collections.abc.Mapping):
+        return {
+                k: strip_descriptions(v) for k,v in desc.items()
+                if not (k == 'description' and isinstance(v, str)) }
+    if isinstance(desc, list):
+        return [ strip_descriptions(v) for v in desc ]
+    return desc
+
+
+def definition_closure(operations, definitions, tags):
+    '''Names of the definitions reachable from operations with allowed tags.
+
+    `operations` is a sequence of (path, pathparams, method, opdesc), and
+    `definitions` maps names to descs.  Only reachable descs are looked at,
+    and precompiled descs aren't decoded at all.
+    '''
+
+    pending = [ name for name in ALWAYS if name in definitions ]
+    for pth, pathparams, method, opdesc in operations:
+        tag, = opdesc['tags']
+        if not tag_allowed(tag, tags):
+            continue
+        pending.extend(refs_of(opdesc))
+        # Precompiled operations include the refs of their path parameters.
+        if getattr(opdesc, 'refs', None) is None:
+            pending.extend(refs_of(pathparams))
+
+    closure = set()
+    while pending:
+        name = pending.pop()
+        if name in closure:
+            continue
+        closure.add(name)
+        pending.extend(refs_of(definitions[name]))
+
+    return closure
+
+
+def prune_spec(spec, tags):
+    '''Return a copy of `spec` with only the allowed tags and what they use.'''
+
+    keep = definition_closure(
+            spec_operations(spec), spec['definitions'], tags)
+
+    paths = {}
+    for pth, pthdesc in spec['paths'].items():
+        ops = {
+                method: opdesc for method, opdesc in pthdesc.items()
+                if method != 'parameters' and
+                tag_allowed(opdesc['tags'][0], tags) }
+        if ops:
+            if 'parameters' in pthdesc:
+                ops['parameters'] = pthdesc['parameters']
+            paths[pth] = ops
+
+    return {
+            **spec,
+            'paths': paths,
+            'definitions': {
+                name: desc for name, desc in spec['definitions'].items()
+                if name in keep },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+            description='Write a spec pruned to some api tags or groups.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--release', metavar='RELEASE')
+    source.add_argument('--spec', metavar='PATH')
+    parser.add_argument('tags', metavar='TAG', nargs='+')
+    parser.add_argument(
+            '-o', '--output', metavar='PATH',
+            help='Where to write the pruned spec (default: stdout).')
+    args = parser.parse_args()
+
+    if args.release:
+        spec = json.loads(load_data(f'release-{args.release}.json'))
+    else:
+        with open(args.spec) as fh:
+            spec = json.load(fh)
+
+    pruned = prune_spec(spec, args.tags)
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(pruned, fh)
+    else:
+        json.dump(pruned, sys.stdout)
+
+    print(
+            f'{len(pruned["definitions"])}/{len(spec["definitions"])} '
+            f'definitions, {len(pruned["paths"])}/{len(spec["paths"])} paths',
+            file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
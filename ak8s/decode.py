@@ -0,0 +1,248 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Decoding large responses off the event loop.
+
+    >>> decoder = PoolDecoder(ThreadPoolExecutor(2), threshold=1 << 20)
+    >>> async with AK8sClient(registry=registry, decoder=decoder) as ak8s:
+    ...     pods = await apis.core_v1.list_pod_for_all_namespaces()
+    >>> decoder
+    <PoolDecoder 3 inline, 1 offloaded, 2.104s off the loop, 0.000s on it>
+
+Handing json.loads to a thread doesn't help by itself.  The C decoder holds
+the GIL until the whole document is decoded, so the loop is blocked just as
+long.  Instead, in a thread the top levels of the document are decoded a
+member at a time (see loads), so the GIL changes hands between list items.
+The catch is that keys aren't shared between items, which costs some memory.
+
+A process pool decodes the whole document, and sends it back pickled in
+batches of list items.  Unpickling one big result would block the loop too,
+so the loop unpickles the batches, yielding to other tasks in between.
+
+Event loop stalls from the garbage collector are still possible either way,
+a full collection has to look at everything that was decoded.
+'''
+
+import asyncio
+import concurrent.futures
+import json
+import json.scanner
+import pickle
+import re
+import time
+
+
+__all__ = '''
+    PoolDecoder
+    loads
+'''.split()
+
+
+_scan = json.scanner.make_scanner(json.JSONDecoder())
+_ws = re.compile(r'[ \t\n\r]*')
+
+
+def loads(body, *, depth=2):
+    '''Decode the json document `body`, like json.loads.
+
+    Objects and arrays in the top `depth` levels are decoded a member at a
+    time, so another thread can run in between.  The default is enough for
+    the items of a list response.
+    '''
+
+    s = body.decode() if isinstance(body, (bytes, bytearray)) else body
+    try:
+        value, end = _value(s, 0, depth)
+        if _ws.match(s, end).end() == len(s):
+            return value
+    except (StopIteration, IndexError, ValueError):
+        pass
+    # Let json raise the error.
+    return json.loads(s)
+
+
+def _value(s, idx, depth):
+    idx = _ws.match(s, idx).end()
+    c = s[idx]
+    if depth and c == '{':
+        return _object(s, idx + 1, depth - 1)
+    if depth and c == '[':
+        return _array(s, idx + 1, depth - 1)
+    return _scan(s, idx)
+
+
+def _object(s, idx, depth):
+    obj = {}
+    idx = _ws.match(s, idx).end()
+    if s[idx] == '}':
+        return obj, idx + 1
+    while True:
+        if s[idx] != '"':
+            raise ValueError
+        k, idx = _scan(s, idx)
+        idx = _ws.match(s, idx).end()
+        if s[idx] != ':':
+            raise ValueError
+        obj[k], idx = _value(s, idx + 1, depth)
+        idx = _ws.match(s, idx).end()
+        if s[idx] == '}':
+            return obj, idx + 1
+        if s[idx] != ',':
+            raise ValueError
+        idx = _ws.match(s, idx + 1).end()
+
+
+def _array(s, idx, depth):
+    arr = []
+    idx = _ws.match(s, idx).end()
+    if s[idx] == ']':
+        return arr, idx + 1
+    while True:
+        v, idx = _value(s, idx, depth)
+        arr.append(v)
+        idx = _ws.match(s, idx).end()
+        if s[idx] == ']':
+            return arr, idx + 1
+        if s[idx] != ',':
+            raise ValueError
+        idx += 1
+
+
+# Jobs run in the executor return how long they took, which is how long the
+# loop would have been blocked decoding inline.
+
+def _thread_job(body):
+    t0 = time.perf_counter()
+    value = loads(body)
+    return time.perf_counter() - t0, value
+
+
+def _thread_lines_job(lines):
+    t0 = time.perf_counter()
+    values = [ json.loads(line) for line in lines ]
+    return time.perf_counter() - t0, values
+
+
+def _process_job(body, batch_size):
+    t0 = time.perf_counter()
+    value = json.loads(body)
+    if isinstance(value, dict) and isinstance(value.get('items'), list):
+        items = value['items']
+        head = pickle.dumps({ **value, 'items': None })
+    elif isinstance(value, list):
+        items = value
+        head = None
+    else:
+        return time.perf_counter() - t0, pickle.dumps(value), None
+    batches = [
+            pickle.dumps(items[i:i+batch_size])
+            for i in range(0, len(items), batch_size) ]
+    return time.perf_counter() - t0, head, batches
+
+
+def _process_lines_job(lines, batch_size):
+    t0 = time.perf_counter()
+    values = [ json.loads(line) for line in lines ]
+    batches = [
+            pickle.dumps(values[i:i+batch_size])
+            for i in range(0, len(values), batch_size) ]
+    return time.perf_counter() - t0, None, batches
+
+
+class PoolDecoder:
+    '''Decode responses of at least `threshold` bytes in `executor`.
+
+    `executor` is a concurrent.futures ThreadPoolExecutor or
+    ProcessPoolExecutor.  Smaller responses are decoded inline, handing them
+    off costs more than decoding them.  For process pools, decoded list
+    items are sent back `batch_size` at a time.
+
+    `offloaded_seconds` is the time spent decoding in the executor, and
+    `loop_seconds` the time the loop spent putting process pool results
+    back together, the difference is the loop block time avoided.
+    '''
+
+    def __init__(self, executor, *, threshold=1 << 20, batch_size=1000):
+        self._executor = executor
+        self._process = isinstance(
+                executor, concurrent.futures.ProcessPoolExecutor)
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.inline = 0
+        self.offloaded = 0
+        self.offloaded_seconds = 0.0
+        self.loop_seconds = 0.0
+
+    def __repr__(self):
+        return (
+                f'<{self.__class__.__name__} {self.inline} inline, '
+                f'{self.offloaded} offloaded, '
+                f'{self.offloaded_seconds:.3f}s off the loop, '
+                f'{self.loop_seconds:.3f}s on it>')
+
+    @property
+    def avoided_seconds(self):
+        '''Event loop block time avoided by decoding in the executor.'''
+        return self.offloaded_seconds - self.loop_seconds
+
+    async def decode(self, body):
+        '''Decode the json document `body` (bytes).'''
+
+        if len(body) < self.threshold:
+            self.inline += 1
+            return json.loads(body)
+        if self._process:
+            return await self._run(_process_job, body, self.batch_size)
+        return await self._run(_thread_job, body)
+
+    async def decode_lines(self, lines):
+        '''Decode a batch of json lines (bytes), as from a watch.'''
+
+        if sum(map(len, lines)) < self.threshold:
+            self.inline += 1
+            return [ json.loads(line) for line in lines ]
+        if self._process:
+            return await self._run(_process_lines_job, lines, self.batch_size)
+        return await self._run(_thread_lines_job, lines)
+
+    async def _run(self, job, *args):
+        loop = asyncio.get_event_loop()
+        seconds, *result = await loop.run_in_executor(
+                self._executor, job, *args)
+        self.offloaded += 1
+        self.offloaded_seconds += seconds
+        if not self._process:
+            return result[0]
+        return await self._unpickle(*result)
+
+    async def _unpickle(self, head, batches):
+        if batches is None:
+            return self._timed(pickle.loads, head)
+        items = []
+        for batch in batches:
+            items.extend(self._timed(pickle.loads, batch))
+            # Let other tasks run between batches.
+            await asyncio.sleep(0)
+        if head is None:
+            return items
+        value = self._timed(pickle.loads, head)
+        value['items'] = items
+        return value
+
+    def _timed(self, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.loop_seconds += time.perf_counter() - t0
@@ -0,0 +1,357 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Export every object in a cluster, streaming them to files.
+
+    python -m ak8s.export 1.9 backup/ --compress gzip
+    python -m ak8s.export 1.9 backup/ --format yaml --kind Deployment
+
+Lists every kind that can be listed across all namespaces, a page of
+`limit` objects at a time, and writes them to one file per kind and
+namespace:
+
+    backup/apps/v1/Deployment/team-a.ndjson.gz
+    backup/core/v1/Namespace/_cluster.ndjson.gz
+
+Objects are written as json, one per line, or as yaml documents.  They
+have their apiVersion and kind, which list items don't, so the files can be
+loaded by ak8s.apply.  Fields the server maintains (see STRIP) are removed.
+
+Only a page per kind is held at a time, and the next page is requested
+before the current one is written, so memory doesn't grow with the cluster
+and the client is mostly waiting on the apiserver.  Pages are serialized,
+compressed and written in the loop's default executor, so that a slow
+format (yaml, lzma) doesn't hold up the lists of other kinds.  Lists across all
+namespaces come ordered by namespace, so each kind has one file open at a
+time, and a file is closed when the next namespace starts.
+
+    >>> exporter = Exporter(ak8s, registry, 'backup', compress='gzip')
+    >>> stats = await exporter.export()
+'''
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import lzma
+import os
+import re
+import time
+
+import yaml
+
+from .client import AK8sClient
+from .models.paths import parse_path
+
+
+__all__ = '''
+    Exporter
+    STRIP
+'''.split()
+
+
+# Fields removed by default.  They are set by the server, and get in the way
+# of creating the objects again.
+STRIP = [
+    'status',
+    'metadata.uid',
+    'metadata.selfLink',
+    'metadata.resourceVersion',
+    'metadata.generation',
+    'metadata.creationTimestamp',
+    'metadata.managedFields',
+    "metadata.annotations['kubectl.kubernetes.io/last-applied-configuration']",
+]
+
+_Dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+_openers = {
+    None: (open, ''),
+    'gzip': (gzip.open, '.gz'),
+    'lzma': (lzma.open, '.xz'),
+}
+
+# Lowest first.
+_stability = {'alpha': 0, 'beta': 1, '': 2}
+
+
+def _group_key(group):
+    return group != 'extensions'
+
+
+def _version_key(version):
+    m = re.fullmatch(r'v(\d+)(alpha|beta|)(\d*)', version)
+    if m is None:
+        return (-1, 0, 0)
+    major, stability, minor = m.groups()
+    return (_stability[stability], int(major), int(minor or 0))
+
+
+class Exporter:
+    '''Export objects from the client `ak8s` to files under `directory`.
+
+    `format` is 'ndjson' or 'yaml', `compress` is None, 'gzip' or 'lzma'.
+    `strip` is a list of paths (as in ak8s.models.paths) to remove from
+    each object.  Up to `concurrency` kinds are listed at once.
+
+    Only one version of a kind is exported, the others are the same
+    objects.  Kinds served by more than one group (Deployment by apps and
+    extensions, Event by core and events.k8s.io) are the same objects too.
+    The stablest, newest version is exported, preferring any group to
+    extensions, which only keeps the old versions of kinds that moved.
+    '''
+
+    def __init__(
+            self, ak8s, registry, directory, *,
+            format='ndjson', compress=None, strip=STRIP,
+            limit=500, concurrency=4, kinds=None):
+        if format not in ('ndjson', 'yaml'):
+            raise ValueError(f'Unknown export format {format!r}')
+        try:
+            self._open, self._suffix = _openers[compress]
+        except KeyError:
+            raise ValueError(
+                    f'Unknown export compression {compress!r}') from None
+        self._ak8s = ak8s
+        self._registry = registry
+        self._directory = directory
+        self._format = format
+        self._strip = _strip_tree( parse_path(path) for path in strip )
+        self._limit = limit
+        self._concurrency = concurrency
+        self._kinds = None if kinds is None else set(kinds)
+        self._logger = logging.getLogger(self.__class__.__qualname__)
+
+    def list_apis(self):
+        '''The list operations to export, {(group, version, kind): api}.'''
+
+        registry = self._registry
+        found = {}
+        for name in list(registry._api_desc):
+            if not name.rpartition('.')[2].startswith('list_'):
+                continue
+            path, _, _, opdesc = registry._get_api_desc(name)
+            # Every namespace, or not namespaced.
+            if '{' in path or opdesc.get('x-kubernetes-action') != 'list':
+                continue
+            gvk = opdesc.get('x-kubernetes-group-version-kind')
+            if gvk is None:
+                continue
+            if self._kinds is not None and gvk['kind'] not in self._kinds:
+                continue
+            kind = gvk['kind']
+            rank = _group_key(gvk['group']), _version_key(gvk['version'])
+            best = found.get(kind)
+            if best is None or rank > best[0]:
+                found[kind] = rank, gvk['group'], gvk['version'], name
+        return {
+                (group, version, kind): registry.apis[name]
+                for kind, (_, group, version, name) in sorted(
+                    found.items(), key=lambda item: (item[1][1], item[0])) }
+
+    async def export(self):
+        '''Export everything, returns {(group, version, kind): stats}.
+
+        Stats are a dict of objects, pages and seconds, and error if the
+        kind couldn't be exported.
+        '''
+
+        semaphore = asyncio.Semaphore(self._concurrency)
+        apis = self.list_apis()
+
+        async def export_one(gvk, api):
+            async with semaphore:
+                return gvk, await self._export_kind(gvk, api)
+
+        return dict(await asyncio.gather(*(
+                export_one(gvk, api) for gvk, api in apis.items() )))
+
+    async def _export_kind(self, gvk, api):
+        group, version, kind = gvk
+        api_version = f'{group}/{version}' if group else version
+        directory = os.path.join(
+                self._directory, group or 'core', version, kind)
+        stats = {'objects': 0, 'pages': 0, 'seconds': 0}
+        # The open file, as [namespace, fh], and the namespaces written.
+        out = [None, None]
+        written = set()
+        writing = None
+        loop = asyncio.get_event_loop()
+        t0 = time.monotonic()
+        pending = asyncio.ensure_future(
+                self._ak8s.op(api(limit=self._limit)))
+        try:
+            while pending is not None:
+                lst = await pending
+                pending = None
+                data = lst._data
+                cont = (data.get('metadata') or {}).get('continue')
+                if cont:
+                    # Fetch the next page while this one is written.
+                    pending = asyncio.ensure_future(self._ak8s.op(
+                            api(limit=self._limit, **{'continue': cont})))
+                items = data.get('items') or ()
+                writing = loop.run_in_executor(
+                        None, self._write,
+                        out, written, directory, api_version, kind, items)
+                await writing
+                writing = None
+                stats['pages'] += 1
+                stats['objects'] += len(items)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._logger.exception('Export of %s %s', api_version, kind)
+            stats['error'] = e
+
+        finally:
+            if pending is not None:
+                pending.cancel()
+            if writing is not None:
+                # Cancelled, the write can't be stopped, but the file can't
+                # be closed under it either.
+                await asyncio.wait([writing])
+            if out[1] is not None:
+                await loop.run_in_executor(None, out[1].close)
+            stats['seconds'] = time.monotonic() - t0
+        return stats
+
+    def _write(self, out, written, directory, api_version, kind, items):
+        # A page at a time, grouped by namespace.
+        pages = {}
+        for item in items:
+            obj = {'apiVersion': api_version, 'kind': kind, **item}
+            _strip(obj, self._strip)
+            namespace = (obj.get('metadata') or {}).get('namespace')
+            page = pages.get(namespace)
+            if page is None:
+                page = pages[namespace] = []
+            if self._format == 'ndjson':
+                page.append(json.dumps(obj, separators=(',', ':')))
+                page.append('\n')
+            else:
+                page.append('---\n')
+                page.append(yaml.dump(
+                        obj, Dumper=_Dumper, default_flow_style=False))
+
+        for namespace, page in pages.items():
+            if out[1] is None or out[0] != namespace:
+                if out[1] is not None:
+                    out[1].close()
+                    out[1] = None
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(
+                        directory,
+                        f'{namespace or "_cluster"}.{self._format}{self._suffix}')
+                # A namespace seen again (if the server didn't order them)
+                # is appended to, compressed files as another member.
+                mode = 'at' if namespace in written else 'wt'
+                written.add(namespace)
+                out[:] = namespace, self._open(path, mode)
+            out[1].write(''.join(page))
+
+
+def _strip_tree(paths):
+    # Parsed paths as a tree of {step: subtree}, a subtree of None is
+    # removed.  Stripping walks each object once, however many paths.
+    tree = {}
+    for steps in paths:
+        node = tree
+        for step in steps[:-1]:
+            node = node.setdefault(step, {})
+            if node is None:
+                break
+        else:
+            node[steps[-1]] = None
+    return tree
+
+
+def _strip(data, tree):
+    # Remove the fields in `tree` from raw data, in place.
+    for (op, key), sub in tree.items():
+        if op == 'key':
+            if not isinstance(data, dict):
+                continue
+            if sub is None:
+                data.pop(key, None)
+                continue
+            values = data.get(key),
+        elif op == 'each':
+            if sub is None:
+                data.clear()
+                continue
+            values = data.values() if isinstance(data, dict) else data
+        elif isinstance(data, list) and -len(data) <= key < len(data):
+            if sub is None:
+                del data[key]
+                continue
+            values = data[key],
+        else:
+            continue
+        for value in values:
+            if isinstance(value, (dict, list)):
+                _strip(value, sub)
+
+
+async def main():
+    from .apis import APIRegistry
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument('directory', metavar='DIRECTORY')
+    parser.add_argument('--format', choices=('ndjson', 'yaml'), default='ndjson')
+    parser.add_argument('--compress', choices=('gzip', 'lzma'))
+    parser.add_argument('--limit', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument(
+            '--kind', action='append', dest='kinds',
+            help='Only export this kind, may be given more than once.')
+    parser.add_argument(
+            '--strip', action='append', metavar='PATH',
+            help='Remove this field, instead of the defaults.')
+    parser.add_argument(
+            '--no-strip', action='store_const', const=[], dest='strip',
+            help='Keep every field.')
+    args = parser.parse_args()
+
+    registry = APIRegistry(release=args.release)
+    async with AK8sClient(registry=registry) as ak8s:
+        exporter = Exporter(
+                ak8s, registry, args.directory,
+                format=args.format, compress=args.compress,
+                strip=STRIP if args.strip is None else args.strip,
+                limit=args.limit, concurrency=args.concurrency,
+                kinds=args.kinds)
+        results = await exporter.export()
+
+    failed = False
+    for (group, version, kind), stats in results.items():
+        error = stats.get('error')
+        failed |= error is not None
+        print(
+                f'{group or "core"}/{version} {kind:32} '
+                f'{stats["objects"]:8} objects {stats["pages"]:5} pages '
+                f'{stats["seconds"]:8.2f}s'
+                + ('' if error is None else f'  {error}'))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    try:
+        exit(asyncio.get_event_loop().run_until_complete(main()) or 0)
+
+    except KeyboardInterrupt as e:
+        exit(1)
@@ -0,0 +1,58 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Docstrings that are rendered when they are read.
+
+Docs for models and apis are assembled from spec descriptions, which is a
+lot of textwrap for something that is only read interactively.
+'''
+
+
+class LazyDoc:
+    '''A class __doc__ that is rendered by `render()` when first read.
+
+    type.__doc__ defers to __get__ of whatever is in the class __dict__, so
+    cls.__doc__ and help(cls) both work.
+    '''
+
+    __slots__ = '_render', '_doc'
+
+    def __init__(self, render):
+        self._render = render
+        self._doc = None
+
+    def __get__(self, them, owner):
+        if self._render is not None:
+            self._doc = self._render()
+            self._render = None
+        return self._doc
+
+
+class InstanceDoc:
+    '''An instance __doc__ that is rendered by `render(instance)` when read.
+
+    Declared in the class body, in place of a docstring:
+
+        class Lens:
+            __doc__ = InstanceDoc(lambda self: ..., 'Docstring for Lens.')
+    '''
+
+    def __init__(self, render, classdoc=None):
+        self._render = render
+        self._classdoc = classdoc
+
+    def __get__(self, them, owner):
+        if them is None:
+            return self._classdoc
+        return self._render(them)
@@ -15,10 +15,24 @@
 import json
 import re
 
+from ..codegen import load_generated
 from ..nestedns import NS
-from ..data import load as load_data
+from ..data import speccache
+from ..data import subset
 
 from .base import ModelBase
+from .base import cache_views
+from .cow import FrozenError
+from .cow import copy_on_write
+from .cow import freeze
+from .mask import FieldMask
+from .mask import PrunedField
+from .paths import FieldPath
+from .paths import check_steps
+from .paths import parse_path
+from .store import DefinitionStore
+from .validate import ValidationError
+from .validate import validator
 
 
 class ModelRegistry:
@@ -30,13 +44,33 @@ class ModelRegistry:
     >>> registry.add_spec(spec)
     >>> registry.models.v1.Container
     <class 'models.v1.Container'>
+
+    If `tags` is given, only the definitions used by operations with those
+    api tags or groups (see ak8s.data.subset) are registered.
+
+    Registries given the same `store` (a DefinitionStore) share identical
+    descriptors and model classes.
+
+    A `slim` registry drops description text from the spec as it is loaded.
+    Docs are still rendered (lazily, as always), but without descriptions.
+
+    Ahead of time generated models (python -m ak8s.models --emit) are only
+    used by registries of a whole release, without `tags` or `slim`.  They
+    are module level classes, shared by every registry that uses them.
     '''
 
-    def __init__(self, *, release=None):
+    def __init__(self, *, release=None, tags=None, store=None, slim=False):
+        self._tags = tags
+        self._store = store
+        self._slim = slim
         self.models = NS(missing=self._get_model)
         self._model_desc = {}
+        # With a store, {name: (digest, refs)} of each definition as it was
+        # added, see DefinitionStore.schema_digest.
+        self._model_digests = {}
         self.models_by_gvk = NS(missing=self._get_model_by_gvk)
         self._gvk_names = {}
+        self._generated_models = {}
 
         if release is not None:
             self.load_release_spec(release)
@@ -47,14 +81,41 @@ class ModelRegistry:
             self.add_spec(spec)
 
     def load_release_spec(self, release):
-        spec = json.loads(load_data(f'release-{release}.json'))
-        self.add_spec(spec)
+        self.add_spec_cache(speccache.load_release(release))
+        # Use ahead of time generated models (python -m ak8s.models --emit)
+        # if they are present.  They carry every definition and their docs,
+        # so subset and slim registries build their own.
+        if self._tags is not None or self._slim:
+            return
+        generated = load_generated(__name__, release)
+        if generated is not None:
+            self._generated_models = generated.models
 
     def add_spec(self, spec):
-        for name,desc in spec['definitions'].items():
-            self.add_model_desc(name, desc)
+        self._add_definitions(
+                subset.spec_operations(spec), spec['definitions'])
+
+    def add_spec_cache(self, cache):
+        '''Add a precompiled spec, definitions are decoded on demand.'''
+        self._add_definitions(cache.operations(), dict(cache.definitions()))
+
+    def _add_definitions(self, operations, definitions):
+        if self._tags is not None:
+            keep = subset.definition_closure(
+                    operations, definitions, self._tags)
+        else:
+            keep = definitions
+        for name,desc in definitions.items():
+            if name in keep:
+                self.add_model_desc(name, desc)
 
     def add_model_desc(self, name, desc):
+        if self._slim and not isinstance(desc, speccache.LazyDesc):
+            desc = subset.strip_descriptions(desc)
+        digest = None
+        if self._store is not None:
+            digest = speccache.digest_of(desc, slim=self._slim)
+            desc = self._store.intern(desc, digest=digest)
         if name in self._model_desc:
             # Some models appear in multiple APIs, if the specs don't differ,
             # then ignore it.
@@ -62,6 +123,8 @@ class ModelRegistry:
                 return
             raise KeyError(f'Spec for {name} is already registered')
         self._model_desc[name] = desc
+        if digest is not None:
+            self._model_digests[name] = digest, subset.refs_of(desc)
         self.models._declare_lazy(name)
         if 'x-kubernetes-group-version-kind' in desc:
             for d in desc['x-kubernetes-group-version-kind']:
@@ -76,11 +139,24 @@ class ModelRegistry:
     def _get_model_desc(self, name, *, resolve=True):
         name = re.sub(r'^#/definitions/', '', name)
         desc = self._model_desc[name]
+        if isinstance(desc, speccache.LazyDesc):
+            desc = self._model_desc[name] = self._decode(desc)
         if resolve:
             while '$ref' in desc:
                 desc = self._get_model_desc(desc['$ref'], resolve=False)
         return desc
 
+    def _decode(self, desc):
+        '''Decode a precompiled descriptor.'''
+
+        if not self._slim:
+            return speccache.decode(desc)
+        slim = speccache.decode(desc, slim=True)
+        if self._store is not None:
+            slim = self._store.intern(
+                    slim, digest=speccache.digest_of(desc, slim=True))
+        return slim
+
     def _register_model(self, model):
         if not issubclass(model, ModelBase):
             raise TypeError('Only ModelBase derived models can be registered.')
@@ -90,6 +166,9 @@ class ModelRegistry:
     def _get_model(self, name):
         desc = self._get_model_desc(name, resolve=False)
 
+        if name in self._generated_models:
+            return self._generated_models[name]
+
         if '$ref' in desc:
             ref = re.sub(r'^#/definitions/', '', desc['$ref'])
             return self.models[ref]
@@ -98,14 +177,43 @@ class ModelRegistry:
             if desc['type'] == 'string':
                 return str
 
-        class Model(ModelBase, registry=self, name=name):
-            __slots__ = ()
+        def build():
+            class Model(ModelBase, registry=self, name=name):
+                __slots__ = ()
+            return Model
 
-        return Model
+        if self._store is not None:
+            return self._store.get_model(self, name, build)
+        return build()
 
     def _get_model_by_gvk(self, gvk):
         return self.models[self._gvk_names[gvk]]
 
+    def compile_path(self, model, path, *, default=None):
+        '''Compile a field path of `model` (a model class, or its name).
+
+        The path is checked against the spec, see ak8s.models.paths.
+        '''
+
+        name = model if isinstance(model, str) else model.__qualname__
+        check_steps(self, name, parse_path(path))
+        return FieldPath(path, model=name, default=default)
+
+    def validator(self, model):
+        '''The compiled validator of `model` (a model class).
+
+        See ak8s.models.validate.
+        '''
+
+        return validator(self, model)
+
+    def validate(self, obj):
+        '''Raise ValidationError if the model `obj` doesn't match the spec.'''
+
+        errors = validator(self, obj.__class__)(obj._data)
+        if errors:
+            raise ValidationError(errors)
+
     def _is_model(self, name):
         mdesc = self._get_model_desc(name)
         return 'type' not in mdesc
@@ -14,12 +14,28 @@
 
 import argparse
 
+from ..codegen import module_path
+from ..codegen import write_package
 from . import ModelRegistry
+from .emit import emit_models
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('release', metavar='RELEASE')
+    parser.add_argument(
+            '--emit', action='store_true',
+            help='Generate the models package for the release.')
+    parser.add_argument(
+            '-o', '--output', metavar='PATH',
+            help='Where to write the generated package (defaults to '
+                 'beside this package, where the registry will find it).')
     args = parser.parse_args()
 
+    if args.emit:
+        output = args.output or module_path(__package__, args.release)
+        write_package(output, emit_models(args.release))
+        print(output)
+        exit()
+
     registry = ModelRegistry(release=args.release)
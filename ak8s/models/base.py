@@ -15,24 +15,29 @@
 import textwrap
 
 from ..boilerplate import boilerplate
+from ..lazydoc import InstanceDoc
+from ..lazydoc import LazyDoc
 
+from . import cow
 from .lens import mklens
 
 
 class ModelBase:
-    __slots__ = '_data',
+    # _views is the projection cache, see cache_views().  _cow is where the
+    # model is in a copy-on-write (or frozen) tree, see ak8s.models.cow.
+    __slots__ = '_data', '_views', '_cow'
 
-    def __init_subclass__(cls, *, registry, name, **kw):
+    def __init_subclass__(cls, *, registry=None, name=None, **kw):
         super().__init_subclass__(**kw)
+
+        if not name and not registry:
+            # Ahead of time generated models are declared statically.
+            return
+
         desc = registry._get_model_desc(name)
         cls.__qualname__ = cls.__name__ = name
         cls._desc = desc
-
-        if 'description' in desc:
-            doc = textwrap.fill(desc["description"])
-        else:
-            doc = "Doesn't look like anything to me."
-        cls.__doc__ = f'{doc}\n\n'
+        cls.__doc__ = LazyDoc(cls._render_doc)
 
         props = desc.get('properties') or {}
 
@@ -43,23 +48,38 @@ class ModelBase:
             # Apparently __init_subclass__ is too late for __set_name__ to
             # happen.  Have to do it manually.
             prop.__set_name__(cls, pname)
-            if lens.__doc__:
-                doc = lens.__doc__
-                doc = textwrap.fill(
-                        doc, 66,
+
+        registry._register_model(cls)
+
+    @classmethod
+    def _render_doc(cls):
+        desc = cls._desc
+        if 'description' in desc:
+            doc = textwrap.fill(desc["description"])
+        else:
+            doc = "Doesn't look like anything to me."
+        doc = f'{doc}\n\n'
+
+        for pname in desc.get('properties') or ():
+            lensdoc = cls.__dict__[pname].lens.__doc__
+            if lensdoc:
+                lensdoc = textwrap.fill(
+                        lensdoc, 66,
                         # Avoid breaking up urls.
                         break_long_words=False,
                         break_on_hyphens=False)
-                doc = textwrap.indent(doc, '    ')
-                cls.__doc__ += f'{pname}:\n{doc}\n\n'
+                lensdoc = textwrap.indent(lensdoc, '    ')
+                doc += f'{pname}:\n{lensdoc}\n\n'
             else:
-                cls.__doc__ += f'{pname}\n'
+                doc += f'{pname}\n'
 
-        registry._register_model(cls)
+        return doc
 
     def __init__(self, **kw):
         # values in kw are cooked
         self._data = boilerplate.get(self.__class__.__name__, dict)()
+        self._views = None
+        self._cow = None
         for k,v in kw.items():
             setattr(self, k, v)
 
@@ -68,6 +88,8 @@ class ModelBase:
 
     def __setstate__(self, data):
         self._data = data
+        self._views = None
+        self._cow = None
 
     @classmethod
     def _project(cls, data):
@@ -100,10 +122,17 @@ class ModelBase:
 
 
 class LensProp:
-    def __init__(self, lens, pdesc):
+    def _render_doc(self):
+        if self._doc is None and self._description is not None:
+            self._doc = textwrap.fill(self._description)
+        return self._doc
+
+    __doc__ = InstanceDoc(_render_doc)
+
+    def __init__(self, lens, pdesc=None, *, doc=None):
         self.lens = lens
-        if 'description' in pdesc:
-            self.__doc__ = textwrap.fill(pdesc['description'])
+        self._doc = doc
+        self._description = pdesc.get('description') if pdesc else None
 
     def __set_name__(self, owner, name):
         self.name = name
@@ -113,11 +142,68 @@ class LensProp:
             return self
         if self.name in them._data:
             data = them._data[self.name]
-            return self.lens.project(data)
+            views = them._views
+            if not self.lens.views:
+                if them._cow is not None:
+                    # Maps and raw lists are shared too.
+                    return cow.wrap(them, self.name, self.lens.project(data))
+                return self.lens.project(data)
+            if views is None and them._cow is None:
+                return self.lens.project(data)
+            if views is None:
+                view = self.lens.project(data)
+            else:
+                # A cached view is good for as long as it's looking at the
+                # same data.
+                view = views.get(self.name) if views else None
+                if view is None or view._data is not data:
+                    view = cache_views(self.lens.project(data))
+                    if not views:
+                        views = them._views = {}
+                    views[self.name] = view
+            if them._cow is not None and view._cow is None:
+                view._cow = cow.child(them, self.name)
+            return view
 
     def __delete__(self, them):
-        if self.name in them._data:
-            del them._data[self.name]
+        data = them._data if them._cow is None else cow.own(them)
+        if them._views:
+            them._views.pop(self.name, None)
+        if self.name in data:
+            del data[self.name]
 
     def __set__(self, them, values):
-        them._data[self.name] = self.lens.unwrap(values)
+        data = them._data if them._cow is None else cow.own(them)
+        if them._views:
+            them._views.pop(self.name, None)
+        data[self.name] = self.lens.unwrap(values)
+
+
+def cache_views(obj):
+    '''Have a model (or list) reuse the views it projects, and return it.
+
+    Normally every attribute access projects a new view of the raw data:
+
+    >>> pod.metadata is pod.metadata
+    False
+
+    With the projection cache, views are kept for as long as the data they
+    look at is unchanged, and the views are caching too:
+
+    >>> pod = cache_views(pod)
+    >>> pod.metadata is pod.metadata
+    True
+    >>> pod.spec.containers[0] is pod.spec.containers[0]
+    True
+
+    This is for models that are read many times, like those in a watch
+    cache.  Views are invalidated by assignment through the model, and by
+    replacing the raw data underneath them, but not by mutating the raw data
+    in place, which the views see anyway.
+    '''
+
+    if obj._views is None:
+        # Empty until there's something to cache, most views don't have
+        # views of their own.
+        obj._views = ()
+    return obj
@@ -0,0 +1,247 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Bulk extraction of model fields into numpy columns.
+
+Reading a few fields of every pod in a cluster through model attributes
+projects a model for every step of every path.  columns() walks the raw
+data instead, and returns a column per field:
+
+    >>> cols = columns(pods, {
+    ...     'namespace': 'metadata.namespace',
+    ...     'node': 'spec.nodeName',
+    ...     'restarts': 'status.containerStatuses[*].restartCount',
+    ...     'cpu': ('spec.containers[*].resources.requests.cpu',
+    ...         parse_quantity),
+    ... }, categorical={'namespace', 'node'})
+    >>> cols['restarts'].sum()
+    1024
+    >>> cols['namespace'].counts()
+    array([ 811, 13204,    52])
+
+Numbers become masked arrays, masked where the field is missing.  Strings
+become object arrays (with None where missing, and equal strings shared),
+or Categorical codes.  Paths are as in ak8s.models.paths, the values under
+[*] are summed, so they need to be numbers (after conversion).
+
+This module requires numpy (pip install ak8s[columns]).
+'''
+
+import re
+
+import numpy
+
+from .base import ModelBase
+from .list import ListProxy
+from .paths import compile_steps
+from .paths import parse_path
+
+
+__all__ = '''
+    Categorical
+    columns
+    parse_quantity
+'''.split()
+
+
+def columns(items, fields, *, categorical=()):
+    '''Extract `fields` of `items` into columns.
+
+    `items` is a sequence of models, or of raw item dicts.  `fields` maps
+    column names to paths, or to (path, convert) pairs where `convert` is
+    applied to each value found.  Returns {column name: column}.
+
+    Conversions are assumed to be pure, `convert` is called once for each
+    distinct value.
+    '''
+
+    if isinstance(items, ListProxy):
+        raw = items._data
+    else:
+        raw = [
+                item._data if isinstance(item, ModelBase) else item
+                for item in items ]
+
+    out = {}
+    for name, field in fields.items():
+        if isinstance(field, str):
+            path, convert = field, None
+        else:
+            path, convert = field
+        steps = parse_path(path)
+        if convert is not None:
+            convert = _memoize(convert)
+
+        get = compile_steps(steps)
+        if any( kind == 'each' for kind, arg in steps ):
+            values = []
+            for d in raw:
+                found = get(d)
+                if convert is not None:
+                    found = [ convert(v) for v in found ]
+                values.append(sum(found) if found else None)
+        else:
+            values = [ get(d) for d in raw ]
+            if convert is not None:
+                values = [ None if v is None else convert(v) for v in values ]
+
+        out[name] = _column(values, categorical=name in categorical)
+
+    return out
+
+
+def _memoize(convert):
+    cache = {}
+
+    def memoized(v):
+        try:
+            return cache[v]
+        except KeyError:
+            converted = cache[v] = convert(v)
+            return converted
+        except TypeError:
+            # Unhashable
+            return convert(v)
+
+    return memoized
+
+
+def _column(values, *, categorical):
+    kinds = { type(v) for v in values }
+    kinds.discard(type(None))
+    missing = None in values
+
+    if not kinds:
+        return numpy.ma.masked_all(len(values))
+
+    if kinds <= {bool, int, float}:
+        if float in kinds:
+            dtype = numpy.float64
+        elif int in kinds:
+            dtype = numpy.int64
+        else:
+            dtype = numpy.bool_
+        if missing:
+            mask = numpy.fromiter(
+                    ( v is None for v in values ), numpy.bool_, len(values))
+            values = [ 0 if v is None else v for v in values ]
+        else:
+            mask = numpy.ma.nomask
+        return numpy.ma.MaskedArray(
+                numpy.array(values, dtype=dtype), mask=mask)
+
+    if kinds == {str}:
+        if categorical:
+            return Categorical.from_values(values)
+        # Share equal strings, there are usually few distinct values.
+        seen = {}
+        return _objects(
+                ( v if v is None else seen.setdefault(v, v) for v in values ),
+                len(values))
+
+    return _objects(values, len(values))
+
+
+if numpy.lib.NumpyVersion(numpy.__version__) >= '1.23.0':
+    def _objects(values, n):
+        return numpy.fromiter(values, object, n)
+
+else:
+    def _objects(values, n):
+        # fromiter only makes object arrays from numpy 1.23.  Assigning a
+        # slice would make nested arrays of values that are lists.
+        out = numpy.empty(n, object)
+        for i, v in enumerate(values):
+            out[i] = v
+        return out
+
+
+class Categorical:
+    '''A column of strings as codes into an array of distinct values.
+
+    `codes` is an int32 array with -1 where the value is missing, and
+    `categories` is an object array, in order of first appearance.
+    '''
+
+    __slots__ = 'codes', 'categories'
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def from_values(cls, values):
+        index = {}
+        codes = numpy.fromiter(
+                ( -1 if v is None else index.setdefault(v, len(index))
+                    for v in values ),
+                numpy.int32, len(values))
+        categories = _objects(index, len(index))
+        return cls(codes, categories)
+
+    def __repr__(self):
+        return (
+                f'<{self.__class__.__name__} {len(self.codes)} values, '
+                f'{len(self.categories)} categories>')
+
+    def __len__(self):
+        return len(self.codes)
+
+    def values(self):
+        '''The column as an object array, with None where missing.'''
+
+        # Code -1 picks the None on the end.
+        return numpy.append(self.categories, None)[self.codes]
+
+    def counts(self):
+        '''The number of times each category appears.'''
+
+        return numpy.bincount(
+                self.codes[self.codes >= 0], minlength=len(self.categories))
+
+
+_quantity_re = re.compile(r'''
+    ([+-]?(?:\d+\.?\d*|\.\d+))
+    (?: [eE]([+-]?\d+) | (Ki|Mi|Gi|Ti|Pi|Ei|n|u|m|k|M|G|T|P|E) )?
+''', re.X)
+
+_suffixes = {
+    'Ki': 2**10, 'Mi': 2**20, 'Gi': 2**30,
+    'Ti': 2**40, 'Pi': 2**50, 'Ei': 2**60,
+    'n': 1e-9, 'u': 1e-6, 'm': 1e-3,
+    'k': 1e3, 'M': 1e6, 'G': 1e9,
+    'T': 1e12, 'P': 1e15, 'E': 1e18,
+}
+
+
+def parse_quantity(value):
+    '''Parse a kubernetes resource quantity into a float.
+
+    >>> parse_quantity('250m')
+    0.25
+    >>> parse_quantity('1Gi')
+    1073741824.0
+    '''
+
+    if isinstance(value, (int, float)):
+        return float(value)
+    m = _quantity_re.fullmatch(value)
+    if m is None:
+        raise ValueError(f'invalid quantity {value!r}')
+    number, exponent, suffix = m.groups()
+    if exponent is not None:
+        return float(f'{number}e{exponent}')
+    if suffix is not None:
+        return float(number) * _suffixes[suffix]
+    return float(number)
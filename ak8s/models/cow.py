@@ -0,0 +1,222 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Copy-on-write and frozen model views.
+
+Models are views of raw data, and projecting a model doesn't copy it, so
+models handed out from a shared cache are only safe if nobody changes them.
+A copy-on-write view shares the data until it is changed through the view
+(or a view projected from it), then copies just the dicts and lists on the
+path to the change:
+
+    >>> mine = copy_on_write(cached_pod)
+    >>> mine.spec.containers[0].image = 'nginx:1.14'
+    >>> cached_pod.spec.containers[0].image
+    'nginx:1.13'
+    >>> mine.metadata._data is cached_pod.metadata._data
+    True
+
+A frozen view raises FrozenError on any change through it instead:
+
+    >>> freeze(cached_pod).metadata.name = 'oops'
+    Traceback (most recent call last):
+    ...
+    ak8s.models.cow.FrozenError: io.k8s.apimachinery.pkg.apis.meta.v1.ObjectMeta is frozen
+
+Maps and raw lists (labels, resources.limits, ...) aren't models, they are
+returned as RawDict and RawList views, which copy or raise the same way:
+
+    >>> mine.metadata.labels['app'] = 'mine'
+    >>> cached_pod.metadata.labels['app']
+    'web'
+
+Changes made to the raw data directly (through _data) aren't seen.
+'''
+
+import collections.abc
+
+
+__all__ = '''
+    FrozenError
+    RawDict
+    RawList
+    copy_on_write
+    freeze
+'''.split()
+
+
+class FrozenError(TypeError):
+    pass
+
+
+class _Tree:
+    # State shared by the views projected from one copy_on_write() or
+    # freeze() root.
+    __slots__ = 'owned', 'frozen'
+
+    def __init__(self, *, frozen=False):
+        # {id: data} of the copies made so far, which the tree can change in
+        # place.  Keeping the copies here keeps their ids from being reused.
+        self.owned = {}
+        self.frozen = frozen
+
+
+class _Node:
+    # Where a view is, relative to the view it was projected from.
+    __slots__ = 'parent', 'key', 'tree'
+
+    def __init__(self, parent, key, tree):
+        self.parent = parent
+        self.key = key
+        self.tree = tree
+
+
+def copy_on_write(obj):
+    '''Return a copy-on-write view of a model (or ListProxy).'''
+
+    view = obj._project(obj._data)
+    view._cow = _Node(None, None, _Tree())
+    return view
+
+
+def freeze(obj):
+    '''Make changes through a model (or ListProxy) raise, and return it.
+
+    Views projected from it are frozen too.
+    '''
+
+    obj._cow = _Node(None, None, _Tree(frozen=True))
+    if obj._views:
+        # Cached views were projected before the freeze.
+        obj._views = ()
+    return obj
+
+
+def child(view, key):
+    '''The node of a view projected from `view` at `key`.'''
+
+    return _Node(view, key, view._cow.tree)
+
+
+def own(view):
+    '''Return the data of `view`, copied first if it is shared.'''
+
+    node = view._cow
+    tree = node.tree
+    if tree.frozen:
+        raise FrozenError(f'{view.__class__.__name__} is frozen')
+
+    data = view._data
+    if tree.owned.get(id(data)) is data:
+        return data
+
+    if node.parent is None:
+        new = data.copy()
+    else:
+        pdata = own(node.parent)
+        try:
+            current = pdata[node.key]
+        except (KeyError, IndexError):
+            current = None
+        if current is data:
+            new = pdata[node.key] = data.copy()
+        elif current is not None and tree.owned.get(id(current)) is current:
+            # Another view of the same path got here first.
+            view._data = current
+            return current
+        else:
+            # The parent was changed since this view was projected, so the
+            # view isn't attached anymore and gets a copy of its own.
+            new = data.copy()
+
+    tree.owned[id(new)] = new
+    view._data = new
+    return new
+
+
+def wrap(view, key, value):
+    '''The raw `value` at `key` of `view`, as a view if it is a container.'''
+
+    if isinstance(value, dict):
+        cls = RawDict
+    elif isinstance(value, list):
+        cls = RawList
+    else:
+        return value
+    raw = object.__new__(cls)
+    raw._data = value
+    raw._cow = child(view, key)
+    return raw
+
+
+class _RawView:
+    __slots__ = '_data', '_cow'
+
+    def __repr__(self):
+        return repr(self._data)
+
+    def __eq__(self, them):
+        if isinstance(them, _RawView):
+            them = them._data
+        return self._data == them
+
+    __hash__ = None
+
+    def __len__(self):
+        return len(self._data)
+
+    def __delitem__(self, key):
+        del own(self)[key]
+
+    def copy(self):
+        '''A plain copy of the raw data, which isn't part of the tree.'''
+
+        return self._data.copy()
+
+
+class RawDict(_RawView, collections.abc.MutableMapping):
+    '''A copy-on-write (or frozen) view of a raw dict.'''
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return wrap(self, key, self._data[key])
+
+    def __setitem__(self, key, value):
+        own(self)[key] = value
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+
+class RawList(_RawView, collections.abc.MutableSequence):
+    '''A copy-on-write (or frozen) view of a raw list.'''
+
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._data[index]
+        if index < 0:
+            index += len(self._data)
+        return wrap(self, index, self._data[index])
+
+    def __setitem__(self, index, value):
+        own(self)[index] = value
+
+    def insert(self, index, value):
+        own(self).insert(index, value)
@@ -0,0 +1,141 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Structural diff of models.
+
+    >>> diff(old_pod, new_pod)
+    ['metadata.resourceVersion', 'status.conditions[1].lastProbeTime']
+
+Paths are as in ak8s.models.paths.  Lists with a patch merge key in the
+spec (containers, env, conditions, ...) are compared item by item by key,
+so inserting an item is one change, not a change to every item after it.
+Changed and added items are at their index in the new list, removed ones
+at their index in the old list.
+
+Two versions of an object with the same resourceVersion are the same, and
+the spec isn't compared when the generation is the same.
+'''
+
+from .base import LensProp
+from .lens import ListLens
+from .lens import ModelLens
+from .paths import format_path
+
+
+__all__ = '''
+    diff
+    diff_steps
+'''.split()
+
+
+_missing = object()
+
+
+def diff(a, b):
+    '''Paths that differ between models `a` and `b`, of the same class.'''
+
+    return [ format_path(steps) for steps in diff_steps(a, b) ]
+
+
+def diff_steps(a, b):
+    '''Like diff, but the paths are parsed (see parse_path).'''
+
+    if a.__class__ is not b.__class__:
+        raise TypeError(
+                f'cannot diff {a.__class__.__name__} and '
+                f'{b.__class__.__name__}')
+
+    out = []
+    da, db = a._data, b._data
+    if da is db:
+        return out
+
+    skip = ()
+    ma = da.get('metadata') or {}
+    mb = db.get('metadata') or {}
+    version = ma.get('resourceVersion')
+    if version and version == mb.get('resourceVersion'):
+        return out
+    generation = ma.get('generation')
+    if generation is not None and generation == mb.get('generation'):
+        # The generation changes with the spec (where there is one).
+        skip = ('spec',)
+
+    _diff_model(a.__class__, da, db, (), out, skip)
+    return out
+
+
+def _diff_model(model, da, db, path, out, skip=()):
+    for k in _keys(da, db):
+        if k in skip:
+            continue
+        va = da.get(k, _missing)
+        vb = db.get(k, _missing)
+        if va is vb:
+            continue
+        prop = model.__dict__.get(k)
+        lens = prop.lens if isinstance(prop, LensProp) else None
+        _diff_value(lens, va, vb, path + (('key', k),), out)
+
+
+def _diff_value(lens, va, vb, path, out):
+    if va is vb or va == vb:
+        return
+    if va is _missing or vb is _missing:
+        out.append(path)
+    elif isinstance(va, dict) and isinstance(vb, dict):
+        if isinstance(lens, ModelLens):
+            _diff_model(lens.model, va, vb, path, out)
+        else:
+            # A map, or free form.
+            for k in _keys(va, vb):
+                _diff_value(
+                        None, va.get(k, _missing), vb.get(k, _missing),
+                        path + (('key', k),), out)
+    elif isinstance(va, list) and isinstance(vb, list):
+        if isinstance(lens, ListLens):
+            _diff_list(lens._itemlens, lens._bound._key, va, vb, path, out)
+        else:
+            _diff_list(None, None, va, vb, path, out)
+    else:
+        out.append(path)
+
+
+def _diff_list(itemlens, key, la, lb, path, out):
+    if key is not None and all(
+            isinstance(d, dict) and key in d for d in (*la, *lb)):
+        old = { d[key]: d for d in la }
+        new = { d[key] for d in lb }
+        for i, d in enumerate(lb):
+            _diff_value(
+                    itemlens, old.get(d[key], _missing), d,
+                    path + (('index', i),), out)
+        for i, d in enumerate(la):
+            if d[key] not in new:
+                out.append(path + (('index', i),))
+        return
+
+    for i in range(max(len(la), len(lb))):
+        _diff_value(
+                itemlens,
+                la[i] if i < len(la) else _missing,
+                lb[i] if i < len(lb) else _missing,
+                path + (('index', i),), out)
+
+
+def _keys(da, db):
+    yield from da
+    for k in db:
+        if k not in da:
+            yield k
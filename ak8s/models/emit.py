@@ -0,0 +1,194 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Ahead of time generation of model modules.
+
+    python -m ak8s.models --emit 1.9
+
+writes the ak8s/models/release_1_9 package, which
+ModelRegistry(release='1.9') uses instead of building model classes from
+the spec.  There is a submodule per definition namespace, so
+io.k8s.api.core.v1.Pod is declared as Pod in
+ak8s/models/release_1_9/io_k8s_api_core_v1.py.
+'''
+
+import collections
+import re
+
+from ..codegen import is_pyident
+from ..codegen import pydoc
+from ..codegen import pyident
+from ..codegen import spec_stamp
+from ..data import speccache
+
+from . import ModelRegistry
+
+
+def emit_models(release):
+    '''Generate the sources of a models package for `release`.
+
+    Returns {module name: source}.
+    '''
+
+    registry = ModelRegistry()
+    registry.add_spec_cache(speccache.load_release(release))
+
+    # Group definitions by namespace.  Aliases are declared with the model
+    # they refer to, so that their module doesn't import another.
+    groups = collections.defaultdict(dict)
+    for name in sorted(registry._model_desc):
+        target = _resolve_ref(registry, name)
+        if target is None:
+            groups[_module_of(name)][name] = None
+        else:
+            groups[_module_of(target)][name] = target
+
+    modules = {}
+    index = {}
+    for modname, names in groups.items():
+        modules[modname] = _emit_module(release, registry, names)
+        for name in names:
+            index[name] = modname
+
+    out = []
+    w = out.append
+    w(pydoc(
+        f'Kubernetes release {release} models.\n\n'
+        f'Generated by `python -m ak8s.models --emit {release}`, do not '
+        f'edit.\n'))
+    w('')
+    w('from ...codegen import GeneratedIndex')
+    w('from ...data import speccache')
+    w('')
+    w('')
+    w(f'spec_stamp = {spec_stamp(release)!r}')
+    w('')
+    w('# Model descriptors are decoded from the spec cache when used.')
+    w(f'_spec = dict(speccache.load_release({release!r}).definitions())')
+    w('')
+    w('# References between models are resolved through here.')
+    w('models = GeneratedIndex(__name__, {')
+    for name, modname in sorted(index.items()):
+        w(f'    {name!r}: {modname!r},')
+    w('})')
+    modules['__init__'] = '\n'.join(out) + '\n'
+
+    return modules
+
+
+def _module_of(name):
+    return pyident(name.rpartition('.')[0]) or '_'
+
+
+def _emit_module(release, registry, names):
+    out = []
+    w = out.append
+    w(pydoc(
+        f'Kubernetes release {release} models.\n\n'
+        f'Generated by `python -m ak8s.models --emit {release}`, do not '
+        f'edit.\n'))
+    w('')
+    w('from ..base import LensProp')
+    w('from ..base import ModelBase')
+    w('from ..lens import ListLens')
+    w('from ..lens import ModelLens')
+    w('from ..lens import SimpleLens')
+    w('from . import _spec')
+    w('from . import models')
+    w('')
+
+    classes = {}
+
+    for name, target in names.items():
+        if name != target:
+            continue
+
+        ident = classes[name] = pyident(name.rpartition('.')[2])
+        model = registry.models[name]
+        desc = registry._get_model_desc(name)
+        props = desc.get('properties') or {}
+
+        late = []
+        w('')
+        w(f'class {ident}(ModelBase):')
+        w(f'    {pydoc(model.__doc__)}')
+        w('')
+        w('    __slots__ = ()')
+        w(f'    __qualname__ = {name!r}')
+        w(f'    _desc = _spec[{name!r}]')
+        for pname, pdesc in props.items():
+            prop = model.__dict__[pname]
+            src = (
+                    f'LensProp(\n'
+                    f'            {lens_source(pdesc, registry)},\n'
+                    f'            doc={_doc(prop)})')
+            if is_pyident(pname):
+                w('')
+                w(f'    {pname} = {src}')
+            else:
+                late.append((pname, src))
+        w('')
+        w(f'{ident}.__name__ = {ident}.__qualname__')
+        for pname, src in late:
+            # Not a valid identifier, so it can't be declared in the class
+            # body.
+            w(f'_prop = {src}')
+            w(f'setattr({ident}, {pname!r}, _prop)')
+            w(f'_prop.__set_name__({ident}, {pname!r})')
+        w('')
+
+    w('')
+    w('declared = {')
+    for name, target in names.items():
+        if target is None:
+            w(f'    {name!r}: str,')
+        else:
+            w(f'    {name!r}: {classes[target]},')
+    w('}')
+
+    return '\n'.join(out) + '\n'
+
+
+def _resolve_ref(registry, name):
+    desc = registry._get_model_desc(name, resolve=False)
+    while '$ref' in desc:
+        name = re.sub(r'^#/definitions/', '', desc['$ref'])
+        desc = registry._get_model_desc(name, resolve=False)
+    if desc.get('type') == 'string':
+        return None
+    return name
+
+
+def _doc(prop):
+    doc = prop.__doc__
+    return 'None' if doc is None else pydoc(doc)
+
+
+def _strip(desc):
+    return { k: v for k,v in desc.items() if k != 'description' }
+
+
+def lens_source(pdesc, registry):
+    '''Source for the lens that mklens would build for `pdesc`.'''
+
+    if '$ref' in pdesc:
+        if registry._is_model(pdesc['$ref']):
+            return f'ModelLens({_strip(pdesc)!r}, models=models)'
+        return f'SimpleLens({_strip(registry._get_model_desc(pdesc["$ref"]))!r})'
+
+    if 'type' in pdesc and pdesc['type'] == 'array':
+        itemlens = lens_source(pdesc['items'], registry)
+        return f'ListLens({_strip(pdesc)!r}, itemlens={itemlens})'
+
+    return f'SimpleLens({_strip(pdesc)!r})'
@@ -14,6 +14,10 @@
 
 import re
 
+from ..lazydoc import InstanceDoc
+
+from . import cow
+
 from .list import ListProxy
 
 
@@ -25,23 +29,44 @@ def mklens(pdesc, *, registry):
             return ModelLens(pdesc, registry=registry)
 
         description = pdesc.get('description')
-        return SimpleLens(
+        return _simple_lens(
                 registry._get_model_desc(pdesc['$ref']),
-                description=description)
+                description=description,
+                registry=registry)
 
     if 'type' in pdesc and pdesc['type'] == 'array':
         itemlens = mklens(pdesc['items'], registry=registry)
         return ListLens(pdesc, itemlens=itemlens)
 
-    return SimpleLens(pdesc)
+    return _simple_lens(pdesc, registry=registry)
+
+
+def _simple_lens(desc, *, description=None, registry):
+    store = registry._store
+    if store is None:
+        return SimpleLens(desc, description=description)
+
+    if description is None:
+        description = desc.get('description')
+    key = 'simple', desc['type'], desc.get('format'), description
+    return store.get_lens(
+            key, lambda: SimpleLens(desc, description=description))
+
+
+def _description(lens):
+    return lens._description
 
 
 class SimpleLens:
+    __doc__ = InstanceDoc(_description)
+
+    # Projections are the raw data, there is nothing to cache.
+    views = False
+
     def __init__(self, desc, *, description=None):
         if description is None:
             description = desc.get('description')
-        if description is not None:
-            self.__doc__ = description
+        self._description = description
         self._type = desc['type']
         self._format = desc.get('format')
 
@@ -54,14 +79,30 @@ class SimpleLens:
         return data
 
     def unwrap(self, value):
+        if isinstance(value, cow._RawView):
+            # A map or raw list from a copy-on-write or frozen view.
+            return value._data
+        return value
+
+    def raw(self, value):
+        '''The raw data of `value`, for comparing without projecting.
+
+        Raises TypeError if comparing raw data wouldn't give the same result
+        as comparing `value` with projections.
+        '''
         return value
 
 
 class ModelLens:
-    def __init__(self, desc, *, registry):
-        if 'description' in desc:
-            self.__doc__ = desc['description']
-        self._models = registry.models
+    __doc__ = InstanceDoc(_description)
+
+    views = True
+
+    def __init__(self, desc, *, registry=None, models=None):
+        self._description = desc.get('description')
+        # Generated models resolve references through their own module,
+        # instead of a registry.
+        self._models = registry.models if registry is not None else models
         self._ref = re.sub(r'^#/definitions/', '', desc['$ref'])
         self._model = None
 
@@ -73,19 +114,38 @@ class ModelLens:
             self._model = self._models[self._ref]
         obj = object.__new__(self._model)
         obj._data = data
+        obj._views = None
+        obj._cow = None
         return obj
 
     def unwrap(self, value):
         # value should be an instance of the model
         return value._data
 
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self._models[self._ref]
+        return self._model
+
+    def raw(self, value):
+        # Models only compare equal to instances of the same class.
+        if value.__class__ is not self.model:
+            raise TypeError(value)
+        return value._data
+
 
 class ListLens:
+    __doc__ = InstanceDoc(_description)
+
+    views = True
+
     def __init__(self, desc, *, itemlens):
         self._itemlens = itemlens
-        self._bound = ListProxy(itemlens=itemlens)
-        if 'description' in desc:
-            self.__doc__ = desc['description']
+        self._bound = ListProxy(
+                itemlens=itemlens,
+                key=desc.get('x-kubernetes-patch-merge-key'))
+        self._description = desc.get('description')
 
     def __repr__(self):
         return f'<{self.__class__.__name__} {self._itemlens}>'
@@ -95,3 +155,10 @@ class ListLens:
 
     def unwrap(self, value):
         return self._bound._unwrap(value)
+
+    def raw(self, value):
+        # Lists of the same property (and so the same item lens).
+        if not (isinstance(value, ListProxy) and
+                value._itemlens is self._itemlens):
+            raise TypeError(value)
+        return value._data
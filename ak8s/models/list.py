@@ -13,6 +13,9 @@
 #   limitations under the License.
 
 import collections
+import collections.abc
+
+from . import cow
 
 
 class ListProxy(collections.MutableSequence):
@@ -24,20 +27,62 @@ class ListProxy(collections.MutableSequence):
     # a plain list.  The argument for doing this is that a plain list can't be
     # unwrapped.
 
-    __slots__ = '_data', '_itemlens'
+    # _views is the projection cache (see cache_views), by index.
+    # _key is the patch merge key of the list, and _index maps keys to
+    # indexes, see by_key.  _cow is as for ModelBase.
+    __slots__ = '_data', '_itemlens', '_views', '_key', '_index', '_cow'
 
-    def __init__(self, seq=None, *, itemlens):
+    def __init__(self, seq=None, *, itemlens, key=None):
         self._itemlens = itemlens
         self._data = []
+        self._views = None
+        self._key = key
+        self._index = None
+        self._cow = None
         if seq is not None:
             self[:] = seq
 
     def _project(self, data):
-        self = self.__class__(itemlens=self._itemlens)
+        self = self.__class__(itemlens=self._itemlens, key=self._key)
         if data is not None:
             self._data = data
         return self
 
+    def _iproject(self):
+        '''Return a function that projects (index, data) pairs.'''
+
+        iproject = self._itemlens.project
+        if not self._itemlens.views and self._cow is not None:
+            return lambda i, d: cow.wrap(self, i, iproject(d))
+        if (not self._itemlens.views or
+                self._views is None and self._cow is None):
+            return lambda i, d: iproject(d)
+
+        def view_of(i, d):
+            views = self._views
+            if views is None:
+                view = iproject(d)
+            else:
+                view = views.get(i) if views else None
+                if view is None or view._data is not d:
+                    view = iproject(d)
+                    view._views = ()
+                    if not views:
+                        views = self._views = {}
+                    views[i] = view
+            if self._cow is not None and view._cow is None:
+                view._cow = cow.child(self, i)
+            return view
+        return view_of
+
+    def _mutable(self):
+        '''Return the data, to be changed.'''
+
+        self._index = None
+        if self._cow is not None:
+            return cow.own(self)
+        return self._data
+
     def _unwrap(self, value, *, gen=False):
         if isinstance(value, ListProxy):
             return value._data
@@ -48,55 +93,70 @@ class ListProxy(collections.MutableSequence):
 
     ### Mutators
     def __setitem__(self, key, value):
+        data = self._mutable()
         if isinstance(key, slice):
-            self._data[key] = self._unwrap(value, gen=True)
+            data[key] = self._unwrap(value, gen=True)
         else:
-            self._data[key] = self._itemlens.unwrap(value)
+            data[key] = self._itemlens.unwrap(value)
 
     def insert(self, index, value):
-        self._data.insert(index, self._itemlens.unwrap(value))
+        self._mutable().insert(index, self._itemlens.unwrap(value))
 
     def append(self, value):
-        self._data.append(self._itemlens.unwrap(value))
+        self._mutable().append(self._itemlens.unwrap(value))
 
     def extend(self, value):
-        self._data.extend(self._unwrap(value, gen=True))
+        self._mutable().extend(self._unwrap(value, gen=True))
 
     def __delitem__(self, key):
-        del self._data[key]
+        del self._mutable()[key]
 
     def clear(self):
-        self._data.clear()
+        self._mutable().clear()
 
     def remove(self, value):
-        self._data.remove(self._itemlens.unwrap(value))
+        self._mutable().remove(self._itemlens.unwrap(value))
 
     def pop(self, *a):
-        return self._data.pop(*a)
+        return self._mutable().pop(*a)
 
     def reverse(self):
-        self._data.reverse()
+        self._mutable().reverse()
 
     def sort(self, key=None, reverse=False):
+        data = self._mutable()
         iproject = self._itemlens.project
         if key is None:
             lenskey = iproject
         else:
             lenskey = lambda d: key(iproject(d))
-        self._data.sort(key=lenskey, reverse=reverse)
+        data.sort(key=lenskey, reverse=reverse)
 
     def __iadd__(self, them):
         self.extend(them)
 
     def __imul__(self, n):
-        self._data *= n
+        data = self._mutable()
+        data *= n
 
     ### Accessors
     def __iter__(self):
+        if self._views is not None or self._cow is not None:
+            iproject = self._iproject()
+            return ( iproject(i, d) for i,d in enumerate(self._data) )
         iproject = self._itemlens.project
         return ( iproject(d) for d in self._data )
 
     def __getitem__(self, key):
+        if self._views is not None or self._cow is not None:
+            iproject = self._iproject()
+            if isinstance(key, slice):
+                indices = range(*key.indices(len(self._data)))
+                return [ iproject(i, self._data[i]) for i in indices ]
+            d = self._data[key]
+            if key < 0:
+                key += len(self._data)
+            return iproject(key, d)
         iproject = self._itemlens.project
         if isinstance(key, slice):
             return [ iproject(d) for d in self._data[key] ]
@@ -107,6 +167,10 @@ class ListProxy(collections.MutableSequence):
         return len(self._data)
 
     def __eq__(self, them):
+        # Lists of the same property compare their raw data.
+        if (isinstance(them, ListProxy) and
+                them._itemlens is self._itemlens):
+            return self._data == them._data
         iproject = self._itemlens.project
         return len(self) == len(them) and all(
                 iproject(a)==b for a,b in zip(self._data, them) )
@@ -118,23 +182,74 @@ class ListProxy(collections.MutableSequence):
 
     __hash__ = None
 
+    # Membership tests compare raw data when that gives the same answer as
+    # comparing projections (see the lens raw() methods), which skips
+    # projecting every element.
+
     def __contains__(self, value):
-        iproject = self._itemlens.project
-        return any( iproject(d)==value for d in self._data )
+        try:
+            raw = self._itemlens.raw(value)
+        except TypeError:
+            iproject = self._itemlens.project
+            return any( iproject(d)==value for d in self._data )
+        return raw in self._data
 
     def count(self, value):
-        iproject = self._itemlens.project
-        return sum( iproject(d)==value for d in self._data )
+        try:
+            raw = self._itemlens.raw(value)
+        except TypeError:
+            iproject = self._itemlens.project
+            return sum( iproject(d)==value for d in self._data )
+        return self._data.count(raw)
 
     def index(self, value):
-        iproject = self._itemlens.project
         try:
-            return next(
-                    i for i,d in enumerate(self._data)
-                    if iproject(d)==value )
-        except StopIteration:
+            raw = self._itemlens.raw(value)
+        except TypeError:
+            iproject = self._itemlens.project
+            try:
+                return next(
+                        i for i,d in enumerate(self._data)
+                        if iproject(d)==value )
+            except StopIteration:
+                raise ValueError(f'{value!r} is not in list')
+        try:
+            return self._data.index(raw)
+        except ValueError:
             raise ValueError(f'{value!r} is not in list')
 
+    @property
+    def by_key(self):
+        '''The items of the list by their patch merge key.
+
+        >>> pod.spec.containers.by_key['nginx']
+        io.k8s.api.core.v1.Container(image='nginx', name='nginx')
+        >>> 'FOO' in container.env.by_key
+        True
+
+        The index is built on first use, and rebuilt after the list is
+        changed through the proxy.  When keys repeat, the first item wins.
+
+        The index is kept on the proxy, and each access of a list property
+        projects a new proxy unless the model caches its views (see
+        cache_views).  Without that, hold on to the list for repeated
+        lookups, instead of going through pod.spec.containers each time.
+        '''
+
+        if self._key is None:
+            raise TypeError('list does not have a patch merge key')
+        return KeyedView(self)
+
+    def _key_index(self):
+        if self._index is None:
+            key = self._key
+            index = {}
+            for i, d in enumerate(self._data):
+                if isinstance(d, dict) and key in d:
+                    index.setdefault(d[key], i)
+            self._index = index
+        return self._index
+
     # Derive/generate
     def copy(self):
         return self._project(self._data.copy())
@@ -147,3 +262,37 @@ class ListProxy(collections.MutableSequence):
 
     def __mul__(self, n):
         return self._project(self._data * n)
+
+
+class KeyedView(collections.abc.Mapping):
+    '''Mapping view of a ListProxy by patch merge key (see by_key).'''
+
+    __slots__ = '_list',
+
+    def __init__(self, lst):
+        self._list = lst
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self._list._key}: {list(self)!r}>'
+
+    def __getitem__(self, k):
+        lst = self._list
+        i = lst._key_index()[k]
+        # The raw data could have been changed underneath the proxy.
+        try:
+            stale = lst._data[i][lst._key] != k
+        except (IndexError, KeyError, TypeError):
+            stale = True
+        if stale:
+            lst._index = None
+            i = lst._key_index()[k]
+        return lst[i]
+
+    def __contains__(self, k):
+        return k in self._list._key_index()
+
+    def __iter__(self):
+        return iter(self._list._key_index())
+
+    def __len__(self):
+        return len(self._list._key_index())
@@ -0,0 +1,225 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Field masks, for keeping only part of each object.
+
+A mask is a list of paths (as in ak8s.models.paths) to keep, everything
+else is pruned from the raw data as soon as it is decoded:
+
+    >>> mask = FieldMask([
+    ...         'metadata', 'status.phase',
+    ...         'status.containerStatuses[*].ready'])
+    >>> async for ev, pod in ak8s.watch(op, mask=mask):
+    ...     cache[pod.metadata.uid] = pod
+
+Masked objects are instances of partial subclasses of their models, one per
+model and mask.  Accessing a property that was pruned raises PrunedField,
+instead of returning None as a missing property does:
+
+    >>> pod.status.phase
+    'Running'
+    >>> pod.spec
+    PrunedField: Pod.spec is not in the field mask
+
+Keys of maps (like metadata.labels['app']) can be masked too, but the
+pruned keys are just missing.  apiVersion, kind, metadata.uid and
+metadata.resourceVersion are always kept, watches and caches need them.
+A mask given for a list operation applies to the items.
+'''
+
+import copy
+
+from .lens import ListLens
+from .lens import ModelLens
+from .list import ListProxy
+from .paths import parse_path
+
+
+__all__ = '''
+    FieldMask
+    PrunedField
+'''.split()
+
+
+_each = 'each', None
+
+
+class PrunedField(AttributeError):
+    '''A property of a partial model was pruned by its field mask.'''
+
+
+class FieldMask:
+    '''Keep the fields in `paths`, and nothing else.'''
+
+    def __init__(self, paths):
+        self.paths = tuple(paths)
+        self._tree = {('key', 'apiVersion'): None, ('key', 'kind'): None}
+        for path in self.paths:
+            steps = parse_path(path)
+            if any( op == 'index' for op, _ in steps ):
+                raise ValueError(
+                        f'Field masks select every item of a list, '
+                        f'with [*]: {path!r}')
+            node = self._tree
+            for step in steps[:-1]:
+                if step in node and node[step] is None:
+                    # Already kept whole.
+                    break
+                node = node.setdefault(step, {})
+            else:
+                node[steps[-1]] = None
+        # Watches resume from the resource version, caches are by uid.
+        meta = self._tree.setdefault(('key', 'metadata'), {})
+        if meta is not None:
+            meta[('key', 'uid')] = None
+            meta[('key', 'resourceVersion')] = None
+        # {model: partial model}
+        self._models = {}
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({list(self.paths)!r})'
+
+    def model(self, model):
+        '''The partial subclass of `model`, for data pruned by this mask.'''
+
+        try:
+            return self._models[model]
+        except KeyError:
+            pass
+        tree = self._tree
+        if _is_list(model):
+            tree = {
+                ('key', 'apiVersion'): None,
+                ('key', 'kind'): None,
+                ('key', 'metadata'): None,
+                ('key', 'items'): {_each: tree},
+            }
+        partial = self._models[model] = _partial(model, tree)
+        return partial
+
+    def prune(self, data, model=None):
+        '''A copy of the raw `data` with only the masked fields.
+
+        If `model` is a list model, the mask applies to its items.
+        '''
+
+        if model is not None and _is_list(model):
+            return {
+                **{ k: data[k] for k in ('apiVersion', 'kind', 'metadata')
+                    if k in data },
+                'items': [ _prune(item, self._tree)
+                           for item in data.get('items') or () ],
+            }
+        return _prune(data, self._tree)
+
+    def project(self, model, data):
+        '''Prune the raw `data` of `model`, and project it as partial.'''
+
+        return self.model(model)._project(self.prune(data, model))
+
+
+def _is_list(model):
+    return (
+            model.__name__.endswith('List') and
+            'items' in (model._desc.get('properties') or ()))
+
+
+def _prune(data, tree):
+    if isinstance(data, dict):
+        sub = tree.get(_each, tree)
+        if sub is not tree:
+            # Every value of a map.
+            if sub is None:
+                return data
+            return { k: _prune(v, sub) for k, v in data.items() }
+        out = {}
+        for (op, key), sub in tree.items():
+            if key in data:
+                value = data[key]
+                out[key] = value if sub is None else _prune(value, sub)
+        return out
+    if isinstance(data, list):
+        sub = tree.get(_each)
+        if sub is None:
+            return data
+        return [ _prune(item, sub) for item in data ]
+    return data
+
+
+class _PrunedProp:
+    def __init__(self, owner, name):
+        self._message = f'{owner.__name__}.{name} is not in the field mask'
+
+    def __get__(self, them, owner):
+        if them is None:
+            return self
+        raise PrunedField(self._message)
+
+    def __set__(self, them, value):
+        raise PrunedField(self._message)
+
+    def __delete__(self, them):
+        raise PrunedField(self._message)
+
+
+def _partial(model, tree):
+    class Partial(model):
+        __slots__ = ()
+
+    # The same name, boilerplate and docs are looked up by name.
+    Partial.__qualname__ = Partial.__name__ = model.__name__
+    Partial.__doc__ = model.__doc__
+    Partial._mask = tree
+
+    props = model._desc.get('properties') or {}
+    for (op, key) in tree:
+        if op != 'key' or key not in props:
+            raise ValueError(f'{model.__name__} has no property {key!r}')
+
+    for pname in props:
+        try:
+            sub = tree[('key', pname)]
+        except KeyError:
+            setattr(Partial, pname, _PrunedProp(model, pname))
+            continue
+        if sub is None:
+            continue
+        prop = getattr(model, pname)
+        lens = _partial_lens(prop.lens, sub)
+        if lens is not prop.lens:
+            partial_prop = copy.copy(prop)
+            partial_prop.lens = lens
+            setattr(Partial, pname, partial_prop)
+    return Partial
+
+
+def _partial_lens(lens, tree):
+    # A lens that projects partial models, for data pruned by `tree`.
+    if isinstance(lens, ModelLens):
+        partial = copy.copy(lens)
+        partial._model = _partial(lens.model, tree)
+        return partial
+    if isinstance(lens, ListLens):
+        if set(tree) != {_each}:
+            raise ValueError(
+                    f'Lists are masked with [*], not {sorted(tree)!r}')
+        itemlens = _partial_lens(lens._itemlens, tree[_each])
+        if itemlens is lens._itemlens:
+            return lens
+        partial = copy.copy(lens)
+        partial._itemlens = itemlens
+        partial._bound = ListProxy(itemlens=itemlens, key=lens._bound._key)
+        return partial
+    # Maps and raw values, the pruned keys are just missing.
+    return lens
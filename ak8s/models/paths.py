@@ -0,0 +1,267 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Field paths into model data.
+
+A path names a field of a model the way it would be written in python,
+with spec property names:
+
+    metadata.name
+    metadata.labels['app.kubernetes.io/name']
+    spec.containers[0].image
+    status.containerStatuses[*].restartCount
+
+[*] is every element of a list (or every value of a map).
+
+Paths are compiled into functions of raw model data (see
+ModelRegistry.compile_path), which don't project any models:
+
+    >>> restarts = registry.compile_path(
+    ...     'io.k8s.api.core.v1.Pod',
+    ...     'status.containerStatuses[*].restartCount', default=0)
+    >>> restarts(pod)
+    [0, 3]
+    >>> sorted(pods, key=registry.compile_path(Pod, 'metadata.name'))
+'''
+
+import re
+
+
+__all__ = '''
+    FieldPath
+    check_steps
+    compile_steps
+    format_path
+    parse_path
+'''.split()
+
+
+_token_re = re.compile(r'''
+    (?P<dot>\.)?
+    (?:
+        (?P<name>[A-Za-z_$][\w$-]*) |
+        \[ (?:
+            (?P<each>\*) |
+            (?P<index>-?\d+) |
+            '(?P<sq>(?:[^'\\]|\\.)*)' |
+            "(?P<dq>(?:[^"\\]|\\.)*)"
+        ) \]
+    )
+''', re.X)
+
+
+def parse_path(path):
+    '''Parse `path` into a tuple of steps.
+
+    Steps are ('key', name), ('index', int) or ('each', None).
+
+    >>> parse_path("metadata.labels['app']")
+    (('key', 'metadata'), ('key', 'labels'), ('key', 'app'))
+    >>> parse_path('status.containerStatuses[*].restartCount')
+    (('key', 'status'), ('key', 'containerStatuses'), ('each', None), ('key', 'restartCount'))
+    '''
+
+    steps = []
+    pos = 0
+    while pos < len(path):
+        m = _token_re.match(path, pos)
+        if m is None:
+            raise ValueError(f'invalid path {path!r} at {pos}')
+        # Names after the first are preceded by a dot, brackets aren't.
+        if m['name'] is not None:
+            valid = (m['dot'] is not None) == (pos > 0)
+        else:
+            valid = m['dot'] is None
+        if not valid:
+            raise ValueError(f'invalid path {path!r} at {pos}')
+        pos = m.end()
+
+        if m['name'] is not None:
+            steps.append(('key', m['name']))
+        elif m['each'] is not None:
+            steps.append(('each', None))
+        elif m['index'] is not None:
+            steps.append(('index', int(m['index'])))
+        else:
+            quoted = m['sq'] if m['sq'] is not None else m['dq']
+            steps.append(('key', re.sub(r'\\(.)', r'\1', quoted)))
+
+    if not steps:
+        raise ValueError(f'invalid path {path!r}')
+    return tuple(steps)
+
+
+def format_path(steps):
+    '''Format steps as a path, the inverse of parse_path.
+
+    >>> format_path((('key', 'metadata'), ('key', 'labels'), ('key', 'app.kubernetes.io/name')))
+    "metadata.labels['app.kubernetes.io/name']"
+    '''
+
+    out = []
+    for kind, arg in steps:
+        if kind == 'each':
+            out.append('[*]')
+        elif kind == 'index':
+            out.append(f'[{arg}]')
+        elif _name_re.fullmatch(arg):
+            out.append(f'.{arg}' if out else arg)
+        else:
+            quoted = arg.replace('\\', '\\\\').replace("'", "\\'")
+            out.append(f"['{quoted}']")
+    return ''.join(out)
+
+
+_name_re = re.compile(r'[A-Za-z_$][\w$-]*')
+
+
+class FieldPath:
+    '''A compiled path.
+
+    Calling it with a model (or raw data) gets the value at the path, or
+    `default` where it is missing (or null).  Paths with wildcards get a
+    list of values, where missing values are left out unless there is a
+    default.  `raw` is the compiled function, for raw data only.
+    '''
+
+    __slots__ = 'path', 'model', 'many', 'raw'
+
+    def __init__(self, path, *, model=None, default=None):
+        steps = parse_path(path)
+        self.path = path
+        self.model = model
+        self.many = any( kind == 'each' for kind, arg in steps )
+        self.raw = compile_steps(steps, default=default)
+
+    def __repr__(self):
+        if self.model is None:
+            return f'<{self.__class__.__name__} {self.path}>'
+        return f'<{self.__class__.__name__} {self.model}: {self.path}>'
+
+    def __call__(self, obj):
+        return self.raw(getattr(obj, '_data', obj))
+
+
+# Errors that mean a step is missing: a missing key, an index out of range,
+# or stepping into a value of the wrong type (including null).
+_missing = (KeyError, IndexError, TypeError)
+
+
+def _each(value):
+    if isinstance(value, dict):
+        return value.values()
+    if isinstance(value, list):
+        return value
+    return ()
+
+
+def compile_steps(steps, *, default=None):
+    '''Compile parsed steps into a function of raw data.
+
+    Lookups between wildcards are generated as chained subscripts, which is
+    as fast as they get in python.
+    '''
+
+    segments = [[]]
+    for kind, arg in steps:
+        if kind == 'each':
+            segments.append([])
+        else:
+            segments[-1].append(arg)
+
+    def lookup(var, segment):
+        return var + ''.join( f'[{arg!r}]' for arg in segment )
+
+    out = []
+    w = lambda indent, line: out.append('    '*indent + line)
+
+    w(0, 'def get(x0):')
+    if len(segments) == 1:
+        w(1, 'try:')
+        w(2, f'v = {lookup("x0", segments[0])}')
+        w(1, 'except _missing:')
+        w(2, 'return _default')
+        if default is None:
+            w(1, 'return v')
+        else:
+            w(1, 'return _default if v is None else v')
+
+    else:
+        *inner, last = segments
+        w(1, 'found = []')
+        indent = 1
+        for i, segment in enumerate(inner):
+            if segment:
+                w(indent, 'try:')
+                w(indent+1, f'x{i} = {lookup(f"x{i}", segment)}')
+                w(indent, 'except _missing:')
+                w(indent+1, 'return found' if i == 0 else 'continue')
+            w(indent, f'for x{i+1} in _each(x{i}):')
+            indent += 1
+        i = len(inner)
+        if last:
+            w(indent, 'try:')
+            w(indent+1, f'v = {lookup(f"x{i}", last)}')
+            w(indent, 'except _missing:')
+            w(indent+1, 'v = None')
+        else:
+            w(indent, f'v = x{i}')
+        w(indent, 'if v is not None:')
+        w(indent+1, 'found.append(v)')
+        if default is not None:
+            w(indent, 'else:')
+            w(indent+1, 'found.append(_default)')
+        w(1, 'return found')
+
+    namespace = dict(_missing=_missing, _each=_each, _default=default)
+    exec('\n'.join(out), namespace)
+    return namespace['get']
+
+
+def check_steps(registry, name, steps):
+    '''Check that parsed steps make sense for the definition `name`.
+
+    Raises ValueError if a property doesn't exist, or a step doesn't fit
+    the type of the value it's applied to.  Free form objects (no
+    properties, no additionalProperties) aren't checked past.
+    '''
+
+    desc = registry._get_model_desc(name)
+    where = name
+    for kind, arg in steps:
+        if desc is None:
+            # Free form, anything goes.
+            return
+
+        if kind == 'key' and 'properties' in desc:
+            if arg not in desc['properties']:
+                raise ValueError(f'{where} has no property {arg!r}')
+            desc = desc['properties'][arg]
+        elif kind in ('key', 'each') and desc.get('type') == 'object':
+            desc = desc.get('additionalProperties')
+        elif kind in ('index', 'each') and desc.get('type') == 'array':
+            desc = desc['items']
+        else:
+            step = f'[{arg!r}]' if kind != 'each' else '[*]'
+            raise ValueError(
+                    f'{where} is {desc.get("type", "an object")}, '
+                    f'not indexable by {step}')
+
+        if desc is not None and '$ref' in desc:
+            where = re.sub(r'^#/definitions/', '', desc['$ref'])
+            desc = registry._get_model_desc(desc['$ref'])
+        elif kind == 'key':
+            where = f'{where}.{arg}'
+        else:
+            where = f'{where}[]'
@@ -0,0 +1,212 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Compact binary snapshots of model collections.
+
+    >>> with open('pods.snap', 'wb') as fh:
+    ...     write_snapshot(fh, pods, compress='zlib')
+    >>> with open('pods.snap', 'rb') as fh:
+    ...     pods = list(read_snapshot(fh, registry))
+
+A snapshot is a header followed by length prefixed chunks, each a marshalled
+batch of records.  Records are tagged with an index into the chunk's table of
+(group, version, kind), and are restored through registry.models_by_gvk, so
+list items (which have no apiVersion or kind of their own) round trip too.
+
+Strings in a chunk are deduplicated before it is marshalled, and marshal
+writes a repeated object once and refers back to it.  That is the string
+table: each key and value is stored once per chunk, and restored objects
+share them.  Chunks can be compressed with zlib or lzma.
+
+Both ends stream, a chunk at a time.  Like the spec cache, this is a cache
+format, not an interchange format: it is only read back by ak8s, and a
+snapshot written by a newer python may not be readable by an older one.
+'''
+
+import lzma
+import marshal
+import struct
+import zlib
+
+
+__all__ = '''
+    SnapshotWriter
+    read_snapshot
+    write_snapshot
+'''.split()
+
+
+MAGIC = b'AK8SSNAP'
+
+# Bump this when the layout changes.
+FORMAT = 1
+
+_header = struct.Struct('<8sBBB')
+_length = struct.Struct('<I')
+
+_codecs = {
+    None: (0, None, None),
+    'zlib': (1, zlib.compress, zlib.decompress),
+    'lzma': (2, lzma.compress, lzma.decompress),
+}
+_decompressors = { code: d for code, c, d in _codecs.values() }
+
+
+class SnapshotWriter:
+    '''Write models to the binary file `fh`, a chunk at a time.
+
+    >>> with SnapshotWriter(fh, compress='lzma') as snap:
+    ...     for pod in pods:
+    ...         snap.write(pod)
+
+    `compress` is None, 'zlib' or 'lzma'.  Larger chunks share more strings
+    and compress better, at the cost of buffering `chunk_size` records.
+    '''
+
+    def __init__(self, fh, *, compress=None, chunk_size=1000):
+        try:
+            code, self._compress, _ = _codecs[compress]
+        except KeyError:
+            raise ValueError(
+                    f'Unknown snapshot compression {compress!r}') from None
+        self._fh = fh
+        self._chunk_size = chunk_size
+        self._gvks = {}
+        self._tags = []
+        self._records = []
+        self.count = 0
+        fh.write(_header.pack(MAGIC, FORMAT, marshal.version, code))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+    def write(self, obj):
+        '''Add the model `obj` to the snapshot.'''
+
+        gvk = _gvk_of(obj)
+        try:
+            tag = self._gvks[gvk]
+        except KeyError:
+            tag = self._gvks[gvk] = len(self._gvks)
+        self._tags.append(tag)
+        self._records.append(obj._data)
+        self.count += 1
+        if len(self._records) >= self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        '''Write out the records buffered so far as a chunk.'''
+
+        if not self._records:
+            return
+        dedupe = _deduper()
+        blob = marshal.dumps((
+                tuple(self._gvks),
+                self._tags,
+                [ dedupe(data) for data in self._records ]))
+        if self._compress is not None:
+            blob = self._compress(blob)
+        self._fh.write(_length.pack(len(blob)))
+        self._fh.write(blob)
+        self._gvks = {}
+        self._tags = []
+        self._records = []
+
+
+def write_snapshot(fh, objs, **kw):
+    '''Write the models `objs` to `fh`, returns how many were written.
+
+    Keyword arguments are as for SnapshotWriter.
+    '''
+
+    with SnapshotWriter(fh, **kw) as snap:
+        for obj in objs:
+            snap.write(obj)
+    return snap.count
+
+
+def read_snapshot(fh, registry):
+    '''Generate the models in the snapshot `fh`.
+
+    Model classes are looked up in `registry` (a ModelRegistry) by their
+    group, version and kind.
+    '''
+
+    header = fh.read(_header.size)
+    if len(header) < _header.size or header[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not an ak8s snapshot')
+    _, fmt, version, code = _header.unpack(header)
+    if fmt != FORMAT:
+        raise ValueError(f'Unsupported snapshot format {fmt}')
+    if version > marshal.version:
+        raise ValueError(
+                f'Snapshot was written with marshal version {version}, '
+                f'this python only reads up to {marshal.version}')
+    try:
+        decompress = _decompressors[code]
+    except KeyError:
+        raise ValueError(f'Unknown snapshot compression {code}') from None
+
+    models_by_gvk = registry.models_by_gvk
+    while True:
+        prefix = fh.read(_length.size)
+        if not prefix:
+            return
+        if len(prefix) < _length.size:
+            raise ValueError('Truncated snapshot')
+        size, = _length.unpack(prefix)
+        blob = fh.read(size)
+        if len(blob) < size:
+            raise ValueError('Truncated snapshot')
+        if decompress is not None:
+            blob = decompress(blob)
+
+        gvks, tags, records = marshal.loads(blob)
+        models = [ models_by_gvk[gvk] for gvk in gvks ]
+        for tag, data in zip(tags, records):
+            yield models[tag]._project(data)
+
+
+def _gvk_of(obj):
+    data = obj._data
+    if 'apiVersion' in data and 'kind' in data:
+        group, _, version = data['apiVersion'].rpartition('/')
+        return group, version, data['kind']
+    for d in obj._desc.get('x-kubernetes-group-version-kind') or ():
+        return d['group'], d['version'], d['kind']
+    raise TypeError(
+            f'{obj.__class__.__name__} has no group, version and kind')
+
+
+def _deduper():
+    # Returns a function that copies json data, with equal strings replaced
+    # by the first one seen.
+    table = {}
+    intern = table.setdefault
+
+    def dedupe(value):
+        cls = value.__class__
+        if cls is dict:
+            return { intern(k, k): dedupe(v) for k,v in value.items() }
+        if cls is list:
+            return [ dedupe(v) for v in value ]
+        if cls is str:
+            return intern(value, value)
+        return value
+
+    return dedupe
@@ -0,0 +1,183 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import hashlib
+import weakref
+
+from ..data.speccache import LazyDesc
+from ..data.speccache import LazyList
+from ..data.speccache import digest_of
+from ..data.subset import refs_of
+
+
+class DefinitionStore:
+    '''Content addressed store of spec descriptors, shared by registries.
+
+    Most definitions and operations are identical between releases.  When
+    registries for several releases are given the same store, identical
+    descriptors are kept once:
+
+    >>> store = DefinitionStore()
+    >>> r18 = APIRegistry(release='1.8', store=store)
+    >>> r19 = APIRegistry(release='1.9', store=store)
+
+    Model classes (and so their lenses) are shared too, when the definition
+    and everything it refers to, transitively, are identical.  Lenses
+    resolve references through the registry that built them, so sharing a
+    class is only safe when the referenced classes would be the same.
+    Slim registries compare the slim definitions, so they share classes
+    with each other, but not with full registries.
+    '''
+
+    def __init__(self):
+        self._descs = {}
+        self._models = {}
+        # registry: {name: digest of its group}
+        self._groups = weakref.WeakKeyDictionary()
+        self._lenses = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return (
+                f'<{self.__class__.__name__} {len(self._descs)} descs, '
+                f'{len(self._models)} models, {len(self._lenses)} lenses, '
+                f'{self.hits} hits, {self.misses} misses>')
+
+    def intern(self, desc, *, digest=None):
+        '''Return the stored descriptor equal to `desc`, storing it if new.
+
+        `digest` is digest_of(desc), if it is already known.
+        '''
+
+        if desc is None:
+            return None
+        if digest is None:
+            digest = digest_of(desc)
+        # Precompiled descriptors aren't interchangeable with decoded ones.
+        key = digest, isinstance(desc, (LazyDesc, LazyList))
+        try:
+            shared = self._descs[key]
+        except KeyError:
+            self.misses += 1
+            self._descs[key] = desc
+            return desc
+        else:
+            self.hits += 1
+            return shared
+
+    def schema_digest(self, registry, name):
+        '''Digest of a definition and everything it refers to.
+
+        Definitions are digested a strongly connected group at a time (they
+        can refer to each other), with the digests of the groups they refer
+        to, so each is visited once per registry.
+        '''
+
+        try:
+            groups = self._groups[registry]
+        except KeyError:
+            groups = self._groups[registry] = {}
+
+        if name not in groups:
+            self._digest_groups(registry, groups, name)
+        h = hashlib.blake2b(groups[name], digest_size=16)
+        h.update(name.encode())
+        return h.digest()
+
+    def _node(self, registry, name):
+        # (digest, refs), kept by the registry when the definition was
+        # added, so slim descriptors have the same digest whether or not
+        # they are decoded yet.
+        try:
+            return registry._model_digests[name]
+        except KeyError:
+            pass
+        desc = registry._model_desc[name]
+        node = registry._model_digests[name] = (
+                digest_of(desc, slim=registry._slim), refs_of(desc))
+        return node
+
+    def _digest_groups(self, registry, groups, name):
+        # Tarjan's algorithm, without recursion.  Groups are finished
+        # after every group they refer to.
+        index = {}
+        low = {}
+        stack = []
+        work = [(name, None)]
+        while work:
+            n, refs = work[-1]
+            if refs is None:
+                index[n] = low[n] = len(index)
+                stack.append(n)
+                refs = iter(self._node(registry, n)[1])
+                work[-1] = n, refs
+            for m in refs:
+                if m in groups:
+                    continue
+                if m not in index:
+                    work.append((m, None))
+                    break
+                if m in low:
+                    low[n] = min(low[n], index[m])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[n])
+                if low[n] != index[n]:
+                    continue
+                group = []
+                while True:
+                    m = stack.pop()
+                    del low[m]
+                    group.append(m)
+                    if m == n:
+                        break
+                members = set(group)
+                h = hashlib.blake2b(digest_size=16)
+                for m in sorted(group):
+                    digest, refs = self._node(registry, m)
+                    h.update(b'\0' + m.encode() + b'\0' + digest)
+                outside = sorted({
+                        groups[r] for m in group
+                        for r in self._node(registry, m)[1]
+                        if r not in members })
+                for digest in outside:
+                    h.update(b'\1' + digest)
+                digest = h.digest()
+                for m in group:
+                    groups[m] = digest
+
+    def get_model(self, registry, name, build):
+        '''Return a shared model class for `name`, or build one.'''
+
+        key = self.schema_digest(registry, name)
+        try:
+            return self._models[key]
+        except KeyError:
+            model = self._models[key] = build()
+            return model
+
+    def get_lens(self, key, build):
+        '''Return a shared lens for `key`, or build one.
+
+        Only lenses that don't refer to a registry can be shared this way.
+        '''
+
+        try:
+            return self._lenses[key]
+        except KeyError:
+            lens = self._lenses[key] = build()
+            return lens
@@ -0,0 +1,262 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Client side validation of model data against the spec.
+
+    >>> registry.validate(pod)
+    Traceback (most recent call last):
+    ...
+    ValidationError: 2 errors:
+      spec.containers[0].name: required
+      spec.containers[0].ports[0].containerPort: expected integer, got str
+
+Validators check types, formats, required fields and enums, following
+$refs, and are compiled once per model class.  Like the apiserver, they
+ignore fields that aren't in the spec, and null where a field is optional.
+'''
+
+import re
+
+from .paths import format_path
+
+
+__all__ = '''
+    ValidationError
+    validator
+'''.split()
+
+
+class ValidationError(ValueError):
+    '''Model data doesn't match the spec.
+
+    `errors` is a list of (path, message), paths are as in ak8s.models.paths.
+    '''
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+    def __str__(self):
+        lines = [ f'  {path or "(root)"}: {message}'
+                  for path, message in self.errors ]
+        n = len(self.errors)
+        return f'{n} error{"s" if n != 1 else ""}:\n' + '\n'.join(lines)
+
+
+def validator(registry, model):
+    '''The validator of `model` (a model class), compiled if it's new.
+
+    A validator is a function of raw model data, that returns a list of
+    (path, message).
+    '''
+
+    validate = model.__dict__.get('_validator')
+    if validate is None:
+        check = _Compiler(registry).ref(model.__qualname__)
+        def validate(data):
+            errors = []
+            check(data, (), errors)
+            return [ (format_path(path), message) for path, message in errors ]
+        # Compiled once per class, like the lenses.
+        model._validator = validate
+    return validate
+
+
+_names = {
+    dict: 'object',
+    list: 'array',
+    str: 'string',
+    int: 'integer',
+    float: 'number',
+    bool: 'boolean',
+    type(None): 'null',
+}
+
+
+def _expected(what, value):
+    got = _names.get(value.__class__, value.__class__.__name__)
+    return f'expected {what}, got {got}'
+
+
+def _any(value, path, errors):
+    pass
+
+
+_date_time_re = re.compile(
+        r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?(?:Z|[+-]\d\d:\d\d)')
+_byte_re = re.compile(r'(?:[A-Za-z0-9+/]{4})*(?:[A-Za-z0-9+/]{2}==|[A-Za-z0-9+/]{3}=)?')
+_quantity_re = re.compile(
+        r'[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+|[KMGTPE]i|[numkMGTPE])?')
+
+_ranges = {
+    'int32': (-2**31, 2**31 - 1),
+    'int64': (-2**63, 2**63 - 1),
+}
+
+
+def _quantity(value, path, errors):
+    cls = value.__class__
+    if cls is str:
+        if not _quantity_re.fullmatch(value):
+            errors.append((path, f'{value!r} is not a valid quantity'))
+    elif cls is not int and cls is not float:
+        errors.append((path, _expected('quantity', value)))
+
+
+# Definitions that the spec doesn't describe usefully.
+_special = {
+    'io.k8s.apimachinery.pkg.api.resource.Quantity': _quantity,
+}
+
+
+class _Compiler:
+    def __init__(self, registry):
+        self._registry = registry
+        self._refs = {}
+
+    def ref(self, name):
+        name = re.sub(r'^#/definitions/', '', name)
+        try:
+            return self._refs[name]
+        except KeyError:
+            pass
+        if name in _special:
+            check = self._refs[name] = _special[name]
+            return check
+
+        # References can be recursive (JSONSchemaProps), so the reference
+        # is declared before its schema is compiled.
+        compiled = []
+        def check(value, path, errors):
+            compiled[0](value, path, errors)
+        self._refs[name] = check
+        compiled.append(self.schema(
+                self._registry._get_model_desc(name, resolve=False)))
+        return check
+
+    def schema(self, desc):
+        if '$ref' in desc:
+            return self.ref(desc['$ref'])
+
+        if desc.get('required') == ['Raw']:
+            # RawExtension and friends are declared as {Raw: bytes}, but are
+            # arbitrary json.
+            return _any
+
+        type_ = desc.get('type')
+        if type_ is None and 'properties' in desc:
+            type_ = 'object'
+        if type_ == 'object':
+            check = self.object(desc)
+        elif type_ == 'array':
+            check = self.array(desc)
+        elif type_ is not None:
+            check = self.scalar(type_, desc.get('format'))
+        else:
+            check = _any
+
+        if 'enum' in desc:
+            check = self.enum(check, desc['enum'])
+        return check
+
+    def object(self, desc):
+        props = {
+                k: self.schema(pdesc)
+                for k, pdesc in (desc.get('properties') or {}).items() }
+        required = tuple(desc.get('required') or ())
+        additional = desc.get('additionalProperties')
+        if isinstance(additional, dict):
+            additional = self.schema(additional)
+        else:
+            additional = None
+
+        def check(value, path, errors):
+            if value.__class__ is not dict:
+                errors.append((path, _expected('object', value)))
+                return
+            for k in required:
+                if value.get(k) is None:
+                    errors.append((path + (('key', k),), 'required'))
+            for k, v in value.items():
+                if v is None:
+                    continue
+                c = props.get(k, additional)
+                if c is not None:
+                    c(v, path + (('key', k),), errors)
+
+        return check
+
+    def array(self, desc):
+        item = self.schema(desc.get('items') or {})
+
+        def check(value, path, errors):
+            if value.__class__ is not list:
+                errors.append((path, _expected('array', value)))
+                return
+            if item is not _any:
+                for i, v in enumerate(value):
+                    item(v, path + (('index', i),), errors)
+
+        return check
+
+    def scalar(self, type_, format_):
+        if type_ == 'string' and format_ == 'int-or-string':
+            def check(value, path, errors):
+                if value.__class__ is not str and value.__class__ is not int:
+                    errors.append((path, _expected('integer or string', value)))
+            return check
+
+        if type_ == 'string':
+            pattern = {
+                'date-time': _date_time_re,
+                'byte': _byte_re,
+            }.get(format_)
+            def check(value, path, errors):
+                if value.__class__ is not str:
+                    errors.append((path, _expected('string', value)))
+                elif pattern is not None and not pattern.fullmatch(value):
+                    errors.append((path, f'{value!r} is not a valid {format_}'))
+            return check
+
+        if type_ == 'integer':
+            lo, hi = _ranges.get(format_, (None, None))
+            def check(value, path, errors):
+                if value.__class__ is not int:
+                    errors.append((path, _expected('integer', value)))
+                elif lo is not None and not lo <= value <= hi:
+                    errors.append((path, f'{value} is out of range for {format_}'))
+            return check
+
+        if type_ == 'number':
+            def check(value, path, errors):
+                if value.__class__ is not float and value.__class__ is not int:
+                    errors.append((path, _expected('number', value)))
+            return check
+
+        if type_ == 'boolean':
+            def check(value, path, errors):
+                if value.__class__ is not bool:
+                    errors.append((path, _expected('boolean', value)))
+            return check
+
+        return _any
+
+    def enum(self, check, values):
+        def check_enum(value, path, errors):
+            n = len(errors)
+            check(value, path, errors)
+            if len(errors) == n and value not in values:
+                errors.append((path, f'{value!r} is not one of {values!r}'))
+
+        return check_enum
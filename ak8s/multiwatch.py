@@ -0,0 +1,174 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Watches of several namespaces, as one stream of events.
+
+Without access to the all namespaces watch, each namespace has to be watched
+on its own:
+
+    >>> pods = MultiNamespaceWatch(
+    ...         ak8s, registry.apis.core_v1.list_namespaced_pod,
+    ...         {'team-a', 'team-b'}, watch=True)
+    >>> async with pods:
+    ...     async for ev, pod in pods:
+    ...         ...
+
+The set of namespaces can be changed while the watch is running, with add,
+discard and update, without restarting the watches of the others.
+'''
+
+import asyncio
+import logging
+
+
+__all__ = '''
+    MultiNamespaceWatch
+'''.split()
+
+
+class MultiNamespaceWatch:
+    '''Watch `api` in each of `namespaces`, merging the events.
+
+    `api` is a namespaced api that can be watched, it is called with each
+    namespace and `kw` to make the operation.  Each namespace is watched
+    with AK8sClient.watch, so it reconnects on its own, and resource
+    versions are only compared within a namespace.  If a watch fails, it is
+    restarted after `retry_delay` seconds, from the newest version seen in
+    its namespace (`versions`).
+
+    Events are merged through a queue of `maxsize` events, when it is full
+    the watches wait for it to be drained.  Events of a namespace that is
+    removed are dropped, even if they were already queued.
+
+    Objects are pruned by the field `mask`, if given (see
+    ak8s.models.mask).
+
+    Every namespace holds a connection open, so the client's
+    connection_limit has to allow for them.
+    '''
+
+    def __init__(
+            self, ak8s, api, namespaces=(), *,
+            maxsize=1000, retry_delay=5, mask=None, **kw):
+        self._ak8s = ak8s
+        self._api = api
+        self._kw = kw
+        self._mask = mask
+        self._retry_delay = retry_delay
+        self._queue = asyncio.Queue(maxsize)
+        self._namespaces = set(namespaces)
+        # namespace: (token, task), the token tells queued events of a
+        # namespace that has been removed (and maybe added again) apart.
+        self._watches = {}
+        self._started = False
+        self.versions = {}
+        self._logger = logging.getLogger(self.__class__.__qualname__)
+
+    def __repr__(self):
+        return (
+                f'<{self.__class__.__name__} {self._api.__name__} '
+                f'{len(self._namespaces)} namespaces, '
+                f'{self._queue.qsize()} queued>')
+
+    @property
+    def namespaces(self):
+        return frozenset(self._namespaces)
+
+    def add(self, namespace):
+        '''Start watching `namespace`, if it isn't watched already.'''
+
+        if namespace in self._namespaces:
+            return
+        self._namespaces.add(namespace)
+        if self._started:
+            self._start(namespace)
+
+    def discard(self, namespace):
+        '''Stop watching `namespace`, if it is watched.'''
+
+        self._namespaces.discard(namespace)
+        self.versions.pop(namespace, None)
+        token, task = self._watches.pop(namespace, (None, None))
+        if task is not None:
+            task.cancel()
+
+    def update(self, namespaces):
+        '''Watch exactly `namespaces`, starting and stopping as needed.'''
+
+        namespaces = set(namespaces)
+        for namespace in self._namespaces - namespaces:
+            self.discard(namespace)
+        for namespace in namespaces - self._namespaces:
+            self.add(namespace)
+
+    def _start(self, namespace):
+        token = object()
+        task = asyncio.ensure_future(self._watch(namespace, token))
+        self._watches[namespace] = token, task
+
+    async def _watch(self, namespace, token):
+        op = self._api(namespace, **self._kw)
+        while True:
+            version = self.versions.get(namespace)
+            if version is not None:
+                op = op.replace(resourceVersion=version)
+            try:
+                async for ev, obj in self._ak8s.watch(op, mask=self._mask):
+                    if ev != 'ERROR':
+                        # The newest version, as AK8sClient.watch keeps.
+                        obj_version = obj.metadata.resourceVersion
+                        last_version = self.versions.get(namespace)
+                        if not last_version or (
+                                int(obj_version) > int(last_version)):
+                            self.versions[namespace] = obj_version
+                    await self._queue.put((namespace, token, ev, obj))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._logger.exception(
+                        'Watch of %r in namespace %r',
+                        self._api.__name__, namespace)
+                await asyncio.sleep(self._retry_delay)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._started:
+            self._started = True
+            for namespace in self._namespaces:
+                self._start(namespace)
+
+        while True:
+            namespace, token, ev, obj = await self._queue.get()
+            current = self._watches.get(namespace)
+            if current is not None and current[0] is token:
+                return ev, obj
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        '''Stop all of the watches.'''
+
+        tasks = [ task for token, task in self._watches.values() ]
+        self._watches.clear()
+        self._started = False
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks)
@@ -27,13 +27,21 @@ class NS:
     >>> ns['foo.quux'] = 2
     >>> ns.foo.quux
     2
+
+    The namespace is a trie: each prefix has a SubNS node that knows the
+    names directly under it, and nodes are created once.  Attribute lookups
+    are cached in the node's __dict__, so repeated lookups of the same path
+    don't go through __getattr__ at all.
     '''
 
     def __init__(self, seq=None, *, missing=None):
         self._data = {}
         self._lazy = set()
         self._missing = missing
-        self._prefixes = set()
+        # {prefix: SubNS}
+        self._prefixes = {}
+        # Names directly under the root.
+        self._names = set()
         if seq is not None:
             if hasattr(seq, 'items'):
                 seq = seq.items()
@@ -43,28 +51,49 @@ class NS:
     def __repr__(self):
         return '<NS>'
 
-    def _declare_lazy(self, k):
-        '''Declare names that can be populated lazily.
+    def _node(self, k):
+        '''The node that `k` is directly under.'''
 
-        This is necessary to find namespace prefixes, and it also informs
-        shell completions.
-        '''
+        if not isinstance(k, str):
+            # Keys like (group, version, kind) aren't nested, and can't be
+            # attributes.
+            return None
+        prefix = k.rpartition('.')[0]
+        if prefix:
+            return self._prefixes[prefix]
+        return self
+
+    def _insert(self, k):
         if k in self._prefixes:
             raise KeyError(f'{k!r} conflicts with an existing prefix')
+        if not isinstance(k, str):
+            return None
+        node = self
         for prefix in _prefixes_of(k):
             if prefix in self._data:
                 raise KeyError(f'{k!r} conflicts with {prefix!r}')
-            self._prefixes.add(prefix)
+            sub = self._prefixes.get(prefix)
+            if sub is None:
+                sub = self._prefixes[prefix] = SubNS(self, prefix)
+                node._names.add(prefix.rpartition('.')[2])
+            node = sub
+        node._names.add(k.rpartition('.')[2])
+        return node
+
+    def _declare_lazy(self, k):
+        '''Declare names that can be populated lazily.
+
+        This is necessary to find namespace prefixes, and it also informs
+        shell completions.
+        '''
+        self._insert(k)
         self._lazy.add(k)
 
     def __setitem__(self, k, v):
-        if k in self._prefixes:
-            raise KeyError(f'{k!r} conflicts with an existing prefix')
-        for prefix in _prefixes_of(k):
-            if prefix in self._data:
-                raise KeyError(f'{k!r} conflicts with {prefix!r}')
-            self._prefixes.add(prefix)
+        node = self._insert(k)
         self._data[k] = v
+        if node is not None:
+            _uncache(node, k.rpartition('.')[2])
 
     def __getitem__(self, k):
         if k in self._data:
@@ -80,6 +109,13 @@ class NS:
 
     def __delitem__(self, k):
         del self._data[k]
+        node = self._node(k)
+        if node is None:
+            return
+        name = k.rpartition('.')[2]
+        _uncache(node, name)
+        if k not in self._lazy:
+            node._names.discard(name)
 
     def __iter__(self):
         yield from self._lazy|set(self._data)
@@ -87,39 +123,47 @@ class NS:
     def __contains__(self, k):
         return k in self._data or k in self._lazy
 
+    def _lookup(self, node, fqk, k):
+        if fqk in self:
+            v = self[fqk]
+        elif fqk in self._prefixes:
+            v = self._prefixes[fqk]
+        else:
+            raise AttributeError(k)
+        if not k.startswith('_'):
+            vars(node)[k] = v
+        return v
+
     def __getattr__(self, k):
-        if k in self:
-            return self[k]
-        if k in self._prefixes:
-            return SubNS(self, k)
-        raise AttributeError(k)
+        return self._lookup(self, k, k)
 
     def __dir__(self):
         #yield from super().__dir__()
-        yield from _of_prefix(self._prefixes, '')
-        yield from _of_prefix(self, '')
+        yield from self._names
 
 
 class SubNS:
     def __init__(self, ns, prefix):
         self._ns = ns
         self._prefix = prefix
+        self._names = set()
 
     def __repr__(self):
         return f'<NS: {self._prefix!r}>'
 
     def __getattr__(self, k):
-        fqk = f'{self._prefix}.{k}'
-        if fqk in self._ns:
-            return self._ns[fqk]
-        if fqk in self._ns._prefixes:
-            return SubNS(self._ns, fqk)
-        raise AttributeError(k)
+        return self._ns._lookup(self, f'{self._prefix}.{k}', k)
 
     def __dir__(self):
         #yield from super().__dir__()
-        yield from _of_prefix(self._ns._prefixes, self._prefix)
-        yield from _of_prefix(self._ns, self._prefix)
+        yield from self._names
+
+
+def _uncache(node, k):
+    # Names starting with _ are never cached, they could shadow the node's
+    # own attributes.
+    if not k.startswith('_'):
+        vars(node).pop(k, None)
 
 
 def _prefixes_of(k):
@@ -136,18 +180,3 @@ def _prefixes_of(k):
         except ValueError:
             return
         yield k[:i]
-
-
-def _of_prefix(seq, prefix):
-    '''Generate suffixes of `seq` elements that are of a prefix (not nested).
-
-    >>> list(_of_prefix(['foo.bar', 'foo.bar.quux', 'few.bar'], 'foo'))
-    ['bar']
-    '''
-
-    if prefix and not prefix.endswith('.'):
-        prefix += '.'
-    start = len(prefix)
-    for k in seq:
-        if  k.startswith(prefix) and k.find('.', start) == -1:
-            yield k[start:]
@@ -0,0 +1,423 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Record traffic of an AK8sClient, and replay it without a cluster.
+
+A Recorder is passed as the client's transport, and writes every request, and
+every piece of every response as the client reads it, with timing:
+
+    >>> with lzma.open('storm.rec', 'wb') as fh:
+    ...     async with AK8sClient(registry=registry,
+    ...                           transport=Recorder(fh)) as ak8s:
+    ...         async for ev, pod in ak8s.watch(op):
+    ...             ...
+
+A Replayer serves a recording back to a client, at the speed it was
+recorded, `speed` times faster, or (with speed=None) as fast as it can:
+
+    >>> with lzma.open('storm.rec', 'rb') as fh:
+    ...     replay = Replayer(fh, speed=10)
+    >>> async with AK8sClient('http://replay', registry=registry,
+    ...                       ca_file=None, token='x',
+    ...                       transport=replay) as ak8s:
+    ...     async for ev, pod in ak8s.watch(op):
+    ...         ...
+
+Requests are matched to the recording by method, path, query and a digest
+of the body, in the order they were recorded.  A request that was not
+recorded (or was recorded fewer times) raises NotRecorded.  Authorization
+headers are not recorded.
+
+A recording is a header followed by marshalled records, so it can be
+written as it goes, and compressed by opening it with gzip or lzma.
+
+    python -m ak8s.replay storm.rec
+
+Lists the requests in a recording.
+'''
+
+import argparse
+import asyncio
+import collections
+import gzip
+import hashlib
+import json
+import lzma
+import marshal
+import struct
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+
+__all__ = '''
+    NotRecorded
+    Recorder
+    Replayer
+    read_recording
+'''.split()
+
+
+MAGIC = b'AK8SREC\0'
+
+# Bump this when the layout changes.
+FORMAT = 2
+
+_header = struct.Struct('<8sBB')
+
+# Record types
+REQUEST = 0   # (REQUEST, id, t, method, path, headers, body digest)
+RESPONSE = 1  # (RESPONSE, id, t, status, reason, headers)
+CHUNK = 2     # (CHUNK, id, t, data)
+END = 3       # (END, id, t)
+
+
+class NotRecorded(LookupError):
+    '''A request was made that isn't in the recording.'''
+
+    def __init__(self, method, path, digest=None):
+        super().__init__(method, path, digest)
+        self.method = method
+        self.path = path
+        self.digest = digest
+
+    def __str__(self):
+        if self.digest is None:
+            return f'{self.method} {self.path} was not recorded'
+        return (
+                f'{self.method} {self.path} (body {self.digest[:12]}) '
+                f'was not recorded')
+
+
+def _path(url):
+    parts = urlsplit(str(url))
+    if parts.query:
+        return f'{parts.path}?{parts.query}'
+    return parts.path
+
+
+def _digest(data):
+    # Bodies are matched by digest, they can be large.
+    if data is None:
+        return None
+    if isinstance(data, aiohttp.BytesPayload):
+        data = data._value
+    elif isinstance(data, str):
+        data = data.encode('utf-8')
+    elif not isinstance(data, (bytes, bytearray)):
+        raise TypeError(f'Body of type {data.__class__} can not be recorded')
+    return hashlib.sha256(data).hexdigest()
+
+
+class Recorder:
+    '''A transport that records the client's traffic to the binary file `fh`.
+
+    Times are seconds since the recorder was created.  Response bodies are
+    recorded as the client reads them, so a watch's events are recorded
+    when they arrived.
+    '''
+
+    def __init__(self, fh):
+        self._fh = fh
+        self._t0 = time.monotonic()
+        self._ids = 0
+        self.count = 0
+        fh.write(_header.pack(MAGIC, FORMAT, marshal.version))
+
+    def wrap(self, request):
+        '''Returns a request function that records calls to `request`.'''
+
+        def recording_request(method, url, *, headers=None, data=None, **kw):
+            return _RecordingRequest(
+                    self, request, method, url, headers, data, kw)
+        return recording_request
+
+    def _write(self, *record):
+        marshal.dump(record, self._fh)
+
+    def _now(self):
+        return time.monotonic() - self._t0
+
+    def _request(self, method, url, headers, data):
+        self._ids += 1
+        self.count += 1
+        headers = {
+                str(k): str(v) for k, v in (headers or {}).items()
+                if k.lower() != 'authorization' }
+        self._write(
+                REQUEST, self._ids, self._now(), method, _path(url), headers,
+                _digest(data))
+        return self._ids
+
+
+class _RecordingRequest:
+    def __init__(self, recorder, request, method, url, headers, data, kw):
+        self._recorder = recorder
+        self._id = recorder._request(method, url, headers, data)
+        self._cm = request(method, url, headers=headers, data=data, **kw)
+
+    async def __aenter__(self):
+        resp = await self._cm.__aenter__()
+        recorder = self._recorder
+        recorder._write(
+                RESPONSE, self._id, recorder._now(),
+                resp.status, resp.reason,
+                # Header names are istr, which marshal doesn't know.
+                [ (str(k), str(v)) for k, v in resp.headers.items() ])
+        return _RecordingResponse(recorder, self._id, resp)
+
+    async def __aexit__(self, *exc):
+        self._recorder._write(END, self._id, self._recorder._now())
+        return await self._cm.__aexit__(*exc)
+
+
+class _RecordingResponse:
+    def __init__(self, recorder, id_, resp):
+        self._recorder = recorder
+        self._id = id_
+        self._resp = resp
+        self.content = _RecordingContent(self, resp.content)
+
+    def __getattr__(self, k):
+        return getattr(self._resp, k)
+
+    def _chunk(self, data):
+        self._recorder._write(CHUNK, self._id, self._recorder._now(), data)
+
+    async def read(self):
+        data = await self._resp.read()
+        self._chunk(data)
+        return data
+
+    async def text(self):
+        return (await self.read()).decode(self._resp.charset or 'utf-8')
+
+    async def json(self):
+        return json.loads(await self.read())
+
+
+class _RecordingContent:
+    def __init__(self, resp, content):
+        self._resp = resp
+        self._content = content
+
+    async def __aiter__(self):
+        async for line in self._content:
+            self._resp._chunk(line)
+            yield line
+
+    async def iter_any(self):
+        async for chunk in self._content.iter_any():
+            self._resp._chunk(chunk)
+            yield chunk
+
+
+def read_recording(fh):
+    '''Generate the records of the recording in the binary file `fh`.'''
+
+    magic, format_, version = _header.unpack(fh.read(_header.size))
+    if magic != MAGIC:
+        raise ValueError('Not an ak8s recording')
+    if format_ != FORMAT or version > marshal.version:
+        raise ValueError(
+                f'Unsupported recording (format {format_}, '
+                f'marshal version {version})')
+    while True:
+        try:
+            yield marshal.load(fh)
+        except EOFError:
+            return
+
+
+class _Exchange:
+    __slots__ = ('method', 'path', 'digest', 't', 'status', 'reason',
+                 'headers', 'chunks', 'end')
+
+    def __init__(self, method, path, digest, t):
+        self.method = method
+        self.path = path
+        self.digest = digest
+        self.t = t
+        self.status = None
+        self.reason = None
+        self.headers = ()
+        # (seconds after the request, data)
+        self.chunks = []
+        self.end = None
+
+
+class Replayer:
+    '''A transport that serves the recording in the binary file `fh`.
+
+    Each response, and each piece of its body, is delayed by as long as it
+    was after its request, divided by `speed`.  With speed=None there are no
+    delays.
+    '''
+
+    def __init__(self, fh, *, speed=1):
+        self._speed = speed
+        self._exchanges = collections.defaultdict(collections.deque)
+        self.count = 0
+
+        exchanges = {}
+        for record in read_recording(fh):
+            type_, id_, t = record[:3]
+            if type_ == REQUEST:
+                method, path, _, digest = record[3:]
+                ex = exchanges[id_] = _Exchange(method, path, digest, t)
+                self._exchanges[method, path, digest].append(ex)
+                self.count += 1
+                continue
+            ex = exchanges[id_]
+            if type_ == RESPONSE:
+                ex.status, ex.reason, ex.headers = record[3:]
+                ex.chunks.append((t - ex.t, None))
+            elif type_ == CHUNK:
+                ex.chunks.append((t - ex.t, record[3]))
+            elif type_ == END:
+                ex.end = t - ex.t
+
+    def wrap(self, request):
+        '''Returns a request function that replays instead of `request`.'''
+
+        return self.request
+
+    def request(self, method, url, *, data=None, **kw):
+        path = _path(url)
+        digest = _digest(data)
+        try:
+            ex = self._exchanges[method, path, digest].popleft()
+        except IndexError:
+            raise NotRecorded(method, path, digest) from None
+        return _ReplayRequest(self, ex, url)
+
+    async def _sleep_until(self, start, offset):
+        if self._speed is None:
+            return
+        delay = start + offset / self._speed - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class _ReplayRequest:
+    def __init__(self, replayer, ex, url):
+        self._replayer = replayer
+        self._ex = ex
+        self._url = url
+
+    async def __aenter__(self):
+        start = time.monotonic()
+        ex = self._ex
+        if ex.status is None:
+            raise aiohttp.ClientConnectionError(
+                    f'{ex.method} {ex.path} had no response when recorded')
+        # The first chunk is the response itself.
+        (offset, _), *chunks = ex.chunks
+        await self._replayer._sleep_until(start, offset)
+        return _ReplayResponse(self._replayer, ex, self._url, start, chunks)
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class _ReplayResponse:
+    def __init__(self, replayer, ex, url, start, chunks):
+        self._ex = ex
+        self._url = url
+        self.status = ex.status
+        self.reason = ex.reason
+        self.headers = dict(ex.headers)
+        content_type = next(
+                ( v for k, v in ex.headers if k.lower() == 'content-type' ),
+                'application/octet-stream')
+        self.content_type = content_type.split(';')[0].strip().lower()
+        self.content = _ReplayContent(replayer, ex, start, chunks)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            request_info = aiohttp.RequestInfo(
+                    self._url, self._ex.method, {}, self._url)
+            raise aiohttp.ClientResponseError(
+                    request_info, (),
+                    status=self.status,
+                    message=self.reason,
+                    headers=self.headers)
+
+    async def read(self):
+        return b''.join([ chunk async for chunk in self.content.iter_any() ])
+
+    async def text(self):
+        return (await self.read()).decode('utf-8')
+
+    async def json(self):
+        return json.loads(await self.read())
+
+
+class _ReplayContent:
+    def __init__(self, replayer, ex, start, chunks):
+        self._replayer = replayer
+        self._ex = ex
+        self._start = start
+        self._chunks = chunks
+
+    async def iter_any(self):
+        sleep_until = self._replayer._sleep_until
+        for offset, data in self._chunks:
+            await sleep_until(self._start, offset)
+            yield data
+        if self._ex.end is not None:
+            await sleep_until(self._start, self._ex.end)
+
+    async def __aiter__(self):
+        # Chunks were recorded as the client read them, which may not have
+        # been a line at a time.
+        pending = b''
+        async for chunk in self.iter_any():
+            pending += chunk
+            *lines, pending = pending.split(b'\n')
+            for line in lines:
+                yield line + b'\n'
+        if pending:
+            yield pending
+
+
+def _open(path):
+    with open(path, 'rb') as fh:
+        magic = fh.read(6)
+    if magic[:2] == b'\x1f\x8b':
+        return gzip.open(path, 'rb')
+    if magic == b'\xfd7zXZ\0':
+        return lzma.open(path, 'rb')
+    return open(path, 'rb')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('recording', metavar='RECORDING')
+    args = parser.parse_args()
+
+    with _open(args.recording) as fh:
+        replay = Replayer(fh, speed=None)
+
+    exchanges = sorted(
+            ( ex for q in replay._exchanges.values() for ex in q ),
+            key=lambda ex: ex.t)
+    for ex in exchanges:
+        size = sum( len(data) for _, data in ex.chunks if data is not None )
+        duration = '' if ex.end is None else f'{ex.end:8.3f}s'
+        print(
+                f'{ex.t:10.3f}s {ex.method:6} {ex.status or "-":>3} '
+                f'{len(ex.chunks)-1:6} chunks {size:10} bytes '
+                f'{duration:9} {ex.path}')
@@ -0,0 +1,193 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Watches that resync by listing again.
+
+A watch can miss events, and when its resource version is too old (Gone),
+AK8sClient.watch starts over, replaying every object as ADDED.  A
+ResyncWatch keeps the last version of every object instead.  Periodically,
+and after Gone, it lists everything again and diffs the list against what
+it has, and only emits the events needed to catch up:
+
+    >>> pods = ResyncWatch(
+    ...         ak8s, registry.apis.core_v1.list_namespaced_pod, 'default',
+    ...         period=600)
+    >>> async for ev, pod in pods:
+    ...     ...
+    >>> pods.drift
+    Counter({'MODIFIED': 2, 'DELETED': 1})
+'''
+
+import asyncio
+import collections
+import logging
+import time
+
+import aiohttp
+
+
+__all__ = '''
+    ResyncWatch
+'''.split()
+
+
+class ResyncWatch:
+    '''Watch `api` with periodic resyncs, generating (event, object).
+
+    `api` is a list api that streams when called with watch=True, it is
+    called with `a` and `kw` for both the list and the watch.  Lists are
+    fetched `limit` objects at a time.
+
+    The first list is emitted as ADDED events, after that the watch is
+    resynced every `period` seconds (by asking the server to end the watch
+    then), and when the watch's resource version is too old.  A resync
+    emits ADDED for new uids, MODIFIED for changed resource versions, and
+    DELETED for uids that are gone, and counts them in `drift`.
+
+    A list whose continue token expires starts over from the first page.
+    Other errors of the list or the watch are logged and retried after a
+    second.
+
+    Objects are pruned by the field `mask`, if given (see
+    ak8s.models.mask), which always keeps the uid and resource version.
+    '''
+
+    def __init__(
+            self, ak8s, api, *a, period=300, limit=500, mask=None, **kw):
+        self._ak8s = ak8s
+        self._api = api
+        self._a = a
+        self._kw = kw
+        self._mask = mask
+        self._period = period
+        self._limit = limit
+        # uid: the last version of the object seen
+        self._objects = {}
+        self._version = None
+        self.resyncs = 0
+        self.drift = collections.Counter()
+        self._logger = logging.getLogger(self.__class__.__qualname__)
+
+    def __repr__(self):
+        return (
+                f'<{self.__class__.__name__} {self._api.__name__} '
+                f'{len(self._objects)} objects, {self.resyncs} resyncs, '
+                f'{sum(self.drift.values())} corrections>')
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __iter__(self):
+        return iter(self._objects.values())
+
+    async def __aiter__(self):
+        # The initial list, nothing to diff against.
+        async for ev, obj in self._relist():
+            yield ev, obj
+
+        while True:
+            deadline = time.monotonic() + self._period
+            gone = False
+            while not gone and time.monotonic() < deadline:
+                op = self._api(
+                        *self._a, **self._kw,
+                        watch=True,
+                        resourceVersion=self._version,
+                        timeoutSeconds=max(1, int(deadline - time.monotonic())))
+                try:
+                    async for ev, obj in self._ak8s.stream_op(op, mask=self._mask):
+                        if ev == 'ERROR':
+                            if obj.status == 'Failure' and obj.reason == 'Gone':
+                                gone = True
+                                break
+                            self._logger.error(
+                                    'Watch %r: %s', op.uri, obj.message)
+                            continue
+                        self._update(ev, obj)
+                        yield ev, obj
+                except asyncio.TimeoutError:
+                    pass # retry
+                except aiohttp.ClientResponseError as e:
+                    if e.status == 410:
+                        gone = True
+                        break
+                    self._logger.error('Watch %r: %s', op.uri, e)
+                    await asyncio.sleep(1) # retry
+                except aiohttp.ClientPayloadError:
+                    self._logger.exception('Watch %r', op.uri)
+                    await asyncio.sleep(1) # retry
+
+            self.resyncs += 1
+            async for ev, obj in self._relist():
+                self.drift[ev] += 1
+                yield ev, obj
+
+    def _update(self, ev, obj):
+        self._version = obj.metadata.resourceVersion
+        uid = obj.metadata.uid
+        if ev == 'DELETED':
+            self._objects.pop(uid, None)
+        else:
+            self._objects[uid] = obj
+
+    async def _relist(self):
+        # List everything, a page at a time, and emit the difference from
+        # what is known.
+        remaining = dict(self._objects)
+        found = {}
+        changes = []
+        kw = dict(self._kw, limit=self._limit)
+        while True:
+            op = self._api(*self._a, **kw)
+            try:
+                lst = await self._ak8s.op(op, mask=self._mask)
+            except aiohttp.ClientResponseError as e:
+                if e.status == 410 and 'continue' in kw:
+                    # The continue token expired, start the list over.
+                    self._logger.warning('List %r: %s, restarting', op.uri, e)
+                    remaining = dict(self._objects)
+                    found = {}
+                    changes = []
+                    del kw['continue']
+                    continue
+                self._logger.error('List %r: %s', op.uri, e)
+                await asyncio.sleep(1) # retry
+                continue
+            except (asyncio.TimeoutError, aiohttp.ClientError):
+                self._logger.exception('List %r', op.uri)
+                await asyncio.sleep(1) # retry
+                continue
+            for obj in lst.items or ():
+                meta = obj._data['metadata']
+                uid = meta['uid']
+                old = remaining.pop(uid, None)
+                if old is None:
+                    changes.append(('ADDED', obj))
+                elif old._data['metadata']['resourceVersion'] != meta['resourceVersion']:
+                    changes.append(('MODIFIED', obj))
+                found[uid] = obj
+            meta = lst._data['metadata']
+            cont = meta.get('continue')
+            if not cont:
+                break
+            kw['continue'] = cont
+
+        for obj in remaining.values():
+            changes.append(('DELETED', obj))
+
+        # The watch continues from the version of the list.
+        self._objects = found
+        self._version = meta.get('resourceVersion')
+        for ev, obj in changes:
+            yield ev, obj
@@ -0,0 +1,425 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Label and field selectors, on the client side.
+
+Selectors are written as for the labelSelector and fieldSelector arguments
+of list operations:
+
+    >>> running_web = Selector('app=web,tier notin (db,cache)',
+    ...                        fields='status.phase=Running')
+    >>> [ pod for pod in pods if running_web(pod) ]
+
+A LabelIndex keeps objects from watch events indexed by label, so that
+selecting from it doesn't have to look at every object:
+
+    >>> index = LabelIndex()
+    >>> async for ev, pod in index.watch(ak8s.watch(pods)):
+    ...     web = index.select('app=web')
+'''
+
+import re
+
+from .models.paths import compile_steps
+from .models.paths import parse_path
+
+
+__all__ = '''
+    LabelIndex
+    Selector
+    parse_field_selector
+    parse_label_selector
+'''.split()
+
+
+_token_re = re.compile(r'''
+    \s*(?:
+        (?P<op>==|!=|=|!|\(|\)|,|<|>) |
+        (?P<word>[^\s,=!()<>]+)
+    )\s*
+''', re.X)
+
+_key_re = re.compile(
+        r'(?:[a-z0-9](?:[-a-z0-9.]{0,251}[a-z0-9])?/)?'
+        r'[A-Za-z0-9](?:[-A-Za-z0-9_.]{0,61}[A-Za-z0-9])?')
+_value_re = re.compile(r'(?:[A-Za-z0-9](?:[-A-Za-z0-9_.]{0,61}[A-Za-z0-9])?)?')
+
+
+def parse_label_selector(selector):
+    '''Parse a label selector into a tuple of requirements.
+
+    Requirements are (key, operator, values), the operators are in, notin,
+    exists, !, gt and lt.  = and != are in and notin with one value.
+
+    >>> parse_label_selector('app=web,tier notin (db,cache),!canary')
+    (('app', 'in', ('web',)), ('tier', 'notin', ('db', 'cache')), ('canary', '!', ()))
+    '''
+
+    tokens = []
+    pos = 0
+    while pos < len(selector):
+        m = _token_re.match(selector, pos)
+        if m is None or m.end() == pos:
+            raise ValueError(f'invalid selector {selector!r} at {pos}')
+        tokens.append(m['op'] or m['word'])
+        pos = m.end()
+    tokens.reverse()
+
+    def take(what=None):
+        if not tokens:
+            raise ValueError(f'invalid selector {selector!r}: unexpected end')
+        tok = tokens.pop()
+        if what is not None and tok != what:
+            raise ValueError(f'invalid selector {selector!r}: expected {what}, got {tok}')
+        return tok
+
+    def key(tok):
+        if not _key_re.fullmatch(tok):
+            raise ValueError(f'invalid selector {selector!r}: bad key {tok!r}')
+        return tok
+
+    def value():
+        # Values can be empty (app=, or app in (a,)).
+        if not tokens or tokens[-1] in (',', ')'):
+            return ''
+        tok = take()
+        if not _value_re.fullmatch(tok):
+            raise ValueError(f'invalid selector {selector!r}: bad value {tok!r}')
+        return tok
+
+    requirements = []
+    while tokens:
+        tok = take()
+        if tok == '!':
+            requirements.append((key(take()), '!', ()))
+        else:
+            k = key(tok)
+            op = tokens[-1] if tokens else ','
+            if op == ',':
+                requirements.append((k, 'exists', ()))
+            elif op in ('=', '=='):
+                take()
+                requirements.append((k, 'in', (value(),)))
+            elif op == '!=':
+                take()
+                requirements.append((k, 'notin', (value(),)))
+            elif op in ('in', 'notin'):
+                take()
+                take('(')
+                values = [value()]
+                tok = take()
+                while tok == ',':
+                    values.append(value())
+                    tok = take()
+                if tok != ')':
+                    raise ValueError(f'invalid selector {selector!r}: expected ), got {tok}')
+                requirements.append((k, op, tuple(values)))
+            elif op in ('<', '>'):
+                take()
+                n = take()
+                if not re.fullmatch(r'-?\d+', n):
+                    raise ValueError(f'invalid selector {selector!r}: {n!r} is not an integer')
+                requirements.append((k, 'gt' if op == '>' else 'lt', (int(n),)))
+            else:
+                raise ValueError(f'invalid selector {selector!r}: unexpected {op}')
+        if tokens:
+            take(',')
+            if not tokens:
+                raise ValueError(f'invalid selector {selector!r}: unexpected end')
+
+    return tuple(requirements)
+
+
+def parse_field_selector(selector):
+    '''Parse a field selector into a tuple of (field, operator, value).
+
+    The operators are = and !=.  Commas, equals signs and backslashes in
+    values are escaped with a backslash.
+
+    >>> parse_field_selector('status.phase=Running,spec.nodeName!=')
+    (('status.phase', '=', 'Running'), ('spec.nodeName', '!=', ''))
+    '''
+
+    requirements = []
+    for term in re.split(r'(?<!\\),', selector) if selector else ():
+        m = re.fullmatch(r'\s*([^=!\s]+)\s*(==|=|!=)(.*)', term, re.S)
+        if m is None:
+            raise ValueError(f'invalid field selector {selector!r}')
+        field, op, value = m.groups()
+        op = '!=' if op == '!=' else '='
+        requirements.append((field, op, re.sub(r'\\(.)', r'\1', value)))
+    return tuple(requirements)
+
+
+def _label_matcher(key, op, values):
+    if op == 'in':
+        if len(values) == 1:
+            value, = values
+            return lambda labels: labels.get(key) == value
+        values = frozenset(values)
+        return lambda labels: key in labels and labels[key] in values
+    if op == 'notin':
+        values = frozenset(values)
+        return lambda labels: key not in labels or labels[key] not in values
+    if op == 'exists':
+        return lambda labels: key in labels
+    if op == '!':
+        return lambda labels: key not in labels
+    n, = values
+    if op == 'gt':
+        return lambda labels: _int(labels.get(key), n.__lt__)
+    return lambda labels: _int(labels.get(key), n.__gt__)
+
+
+def _int(value, compare):
+    try:
+        return compare(int(value))
+    except (TypeError, ValueError):
+        return False
+
+
+def _field_value(value):
+    # Fields are compared as the apiserver formats them.
+    if value is None:
+        return ''
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    return str(value)
+
+
+def _field_matcher(field, op, value):
+    get = compile_steps(parse_path(field))
+    if op == '=':
+        return lambda data: _field_value(get(data)) == value
+    return lambda data: _field_value(get(data)) != value
+
+
+class Selector:
+    '''A compiled label and field selector.
+
+    Call it with a model to find out whether it is selected, or use
+    `match` with raw model data.  An empty selector selects everything.
+    '''
+
+    def __init__(self, labels='', *, fields=''):
+        self.labels = parse_label_selector(labels)
+        self.fields = parse_field_selector(fields)
+        self._label_matchers = [
+                _label_matcher(*req) for req in self.labels ]
+        self._field_matchers = [
+                _field_matcher(*req) for req in self.fields ]
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self}>'
+
+    def __str__(self):
+        return ','.join(
+                [ _format_requirement(*req) for req in self.labels ] +
+                [ f'{f}{op}{v}' for f, op, v in self.fields ])
+
+    def __call__(self, obj):
+        return self.match(obj._data)
+
+    def match(self, data):
+        '''Is the raw model data `data` selected?'''
+
+        if self._label_matchers:
+            labels = (data.get('metadata') or {}).get('labels') or {}
+            for match in self._label_matchers:
+                if not match(labels):
+                    return False
+        for match in self._field_matchers:
+            if not match(data):
+                return False
+        return True
+
+
+def _format_requirement(key, op, values):
+    if op == 'in' and len(values) == 1:
+        return f'{key}={values[0]}'
+    if op == 'notin' and len(values) == 1:
+        return f'{key}!={values[0]}'
+    if op == 'exists':
+        return key
+    if op == '!':
+        return f'!{key}'
+    if op == 'gt':
+        return f'{key}>{values[0]}'
+    if op == 'lt':
+        return f'{key}<{values[0]}'
+    return f'{key} {op} ({",".join(values)})'
+
+
+def _selector(selector):
+    if isinstance(selector, Selector):
+        return selector
+    return Selector(selector)
+
+
+class LabelIndex:
+    '''Objects indexed by label, kept up to date from watch events.
+
+    Objects are kept by namespace and name, the last version seen of each.
+    The labels of an object map label keys to values to object keys, so
+    selecting `app=web` is a dict lookup, and requirements are combined by
+    set intersection.  Objects are only looked at for the requirements the
+    index can't answer (notin, ! and fields), and only when there is a
+    requirement that it can to narrow them down first.
+    '''
+
+    def __init__(self):
+        self._objects = {}
+        self._by_key = {}
+        self._by_value = {}
+
+    def __repr__(self):
+        return (
+                f'<{self.__class__.__name__} {len(self._objects)} objects, '
+                f'{len(self._by_key)} label keys>')
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __iter__(self):
+        return iter(self._objects.values())
+
+    def update(self, ev, obj):
+        '''Update the index with a watch event.'''
+
+        if ev in ('ADDED', 'MODIFIED'):
+            self.add(obj)
+        elif ev == 'DELETED':
+            self.remove(obj)
+
+    async def watch(self, events):
+        '''Generate `events`, updating the index with each first.'''
+
+        async for ev, obj in events:
+            self.update(ev, obj)
+            yield ev, obj
+
+    def add(self, obj):
+        '''Add or replace an object.'''
+
+        key = _key(obj)
+        old = self._objects.get(key)
+        self._objects[key] = obj
+        labels = _labels(obj._data)
+        old_labels = {} if old is None else _labels(old._data)
+        for k, v in old_labels.items():
+            if labels.get(k, _missing) != v:
+                self._unindex(key, k, v)
+        for k, v in labels.items():
+            if old_labels.get(k, _missing) != v:
+                self._index(key, k, v)
+
+    def remove(self, obj):
+        '''Remove an object, if it is there.'''
+
+        key = _key(obj)
+        old = self._objects.pop(key, None)
+        if old is not None:
+            for k, v in _labels(old._data).items():
+                self._unindex(key, k, v)
+
+    def _index(self, key, k, v):
+        self._by_key.setdefault(k, set()).add(key)
+        self._by_value.setdefault(k, {}).setdefault(v, set()).add(key)
+
+    def _unindex(self, key, k, v):
+        keys = self._by_key[k]
+        keys.discard(key)
+        if not keys:
+            del self._by_key[k]
+        values = self._by_value[k]
+        keys = values[v]
+        keys.discard(key)
+        if not keys:
+            del values[v]
+            if not values:
+                del self._by_value[k]
+
+    def select(self, selector):
+        '''The objects selected by `selector` (a Selector or label selector).'''
+
+        selector = _selector(selector)
+        candidates = None
+        # Requirements the index can't answer are checked object by object.
+        residual = []
+        for req, match in zip(selector.labels, selector._label_matchers):
+            keys = self._keys(*req)
+            if keys is None:
+                residual.append(match)
+                continue
+            if candidates is None or len(keys) < len(candidates):
+                candidates, keys = keys, candidates
+            if keys is not None:
+                candidates = candidates & keys
+            if not candidates:
+                return []
+
+        objects = self._objects
+        if candidates is None:
+            return [ obj for obj in objects.values() if selector(obj) ]
+        fields = selector._field_matchers
+        if not residual and not fields:
+            return [ objects[key] for key in candidates ]
+
+        selected = []
+        for key in candidates:
+            obj = objects[key]
+            labels = _labels(obj._data)
+            if (all( match(labels) for match in residual ) and
+                    all( match(obj._data) for match in fields )):
+                selected.append(obj)
+        return selected
+
+    def _keys(self, k, op, values):
+        # The keys of the objects matching a requirement, or None if the
+        # index can't tell.
+        if op == 'exists':
+            return self._by_key.get(k, _empty)
+        if op == 'notin' or op == '!':
+            return None
+        by_value = self._by_value.get(k)
+        if by_value is None:
+            return _empty
+        if op == 'in' and len(values) == 1:
+            return by_value.get(values[0], _empty)
+        if op == 'in':
+            matching = [ by_value.get(v, _empty) for v in values ]
+        else:
+            # gt and lt, there are usually far fewer values than objects.
+            match = _label_matcher(k, op, values)
+            matching = [
+                    keys for v, keys in by_value.items() if match({k: v}) ]
+        keys = set()
+        for m in matching:
+            keys.update(m)
+        return keys
+
+
+_missing = object()
+_empty = frozenset()
+
+
+def _key(obj):
+    metadata = obj._data.get('metadata') or {}
+    return metadata.get('namespace'), metadata.get('name')
+
+
+def _labels(data):
+    return (data.get('metadata') or {}).get('labels') or {}
@@ -0,0 +1,130 @@
+#   Copyright 2018 Kai Groner
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+'''Filters for watch events, by what changed.
+
+Most MODIFIED events are status updates that a controller doesn't care
+about.  A ChangeFilter remembers the last version of each object, diffs
+(see ak8s.models.diff) the new version against it, and drops the event
+if nothing interesting changed:
+
+    >>> pods = apis.core_v1.list_pod_for_all_namespaces(watch=True)
+    >>> async for ev, pod in filtered(ak8s.watch(pods), spec_changed()):
+    ...     await reconcile(pod)
+
+ADDED and DELETED events (and errors) are always kept.
+'''
+
+from .models.diff import diff_steps
+from .models.paths import parse_path
+
+
+__all__ = '''
+    ChangeFilter
+    filtered
+    ignore_status
+    spec_changed
+'''.split()
+
+
+class ChangeFilter:
+    '''Keep MODIFIED events that change something interesting.
+
+    Changes are interesting if they overlap one of `paths` (a change to
+    spec.containers overlaps spec.containers[*].image, and so does a
+    change to spec.containers[0].image), or if `paths` isn't given, any
+    change.  Changes under one of `ignore`, and to metadata.resourceVersion,
+    aren't interesting.  Paths are as in ak8s.models.paths.
+
+    Call it with (event, object) to find out whether to keep the event.
+    '''
+
+    def __init__(self, paths=None, *, ignore=()):
+        self.paths = None if paths is None else [
+                parse_path(p) for p in paths ]
+        self.ignore = [
+                parse_path(p) for p in ('metadata.resourceVersion', *ignore) ]
+        self.dropped = 0
+        self._last = {}
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} dropped {self.dropped}>'
+
+    def __call__(self, ev, obj):
+        if ev not in ('ADDED', 'MODIFIED', 'DELETED'):
+            return True
+
+        key = _identity(obj)
+        if ev == 'DELETED':
+            self._last.pop(key, None)
+            return True
+        last = self._last.get(key)
+        self._last[key] = obj
+        if ev == 'ADDED' or last is None or last.__class__ is not obj.__class__:
+            return True
+
+        for change in diff_steps(last, obj):
+            if any( _under(change, p) for p in self.ignore ):
+                continue
+            if self.paths is None or any(
+                    _overlaps(change, p) for p in self.paths ):
+                return True
+
+        self.dropped += 1
+        return False
+
+
+def spec_changed():
+    '''A filter that keeps events that change the spec.'''
+
+    return ChangeFilter(['spec'])
+
+
+def ignore_status():
+    '''A filter that keeps events that change anything but the status.'''
+
+    return ChangeFilter(ignore=['status'])
+
+
+async def filtered(events, keep):
+    '''Generate the (event, object) pairs of `events` that `keep` keeps.'''
+
+    async for ev, obj in events:
+        if keep(ev, obj):
+            yield ev, obj
+
+
+def _identity(obj):
+    metadata = obj._data.get('metadata') or {}
+    uid = metadata.get('uid')
+    if uid:
+        return uid
+    return metadata.get('namespace'), metadata.get('name')
+
+
+def _step_matches(step, pattern):
+    return step == pattern or pattern[0] == 'each'
+
+
+def _under(steps, pattern):
+    '''Is `steps` at or under `pattern`?'''
+
+    return len(steps) >= len(pattern) and all(
+            _step_matches(s, p) for s, p in zip(steps, pattern) )
+
+
+def _overlaps(steps, pattern):
+    '''Is `steps` at, under, or above `pattern`?'''
+
+    return all( _step_matches(s, p) for s, p in zip(steps, pattern) )
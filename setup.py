@@ -1,5 +1,27 @@
 from pathlib import Path
+import subprocess
+import sys
+
 from setuptools import setup
+from setuptools.command.build_py import build_py
+
+
+class build_py_with_caches(build_py):
+    '''Precompile the release spec caches (python -m ak8s.data) into the
+    build, so they are valid wherever the package is installed.'''
+
+    def run(self):
+        super().run()
+        if self.dry_run:
+            return
+        releases = [
+                pth.stem.partition('-')[2]
+                for pth in Path(self.build_lib, 'ak8s', 'data').glob(
+                    'release-*.json') ]
+        if releases:
+            subprocess.check_call(
+                    [sys.executable, '-m', 'ak8s.data', *releases],
+                    cwd=self.build_lib)
 
 
 if __name__ == '__main__':
@@ -18,9 +40,14 @@ if __name__ == '__main__':
                 # when using a pod serviceaccount.
                 'pyyaml>=3.12',
             ],
+            extras_require={
+                # ak8s.models.columns
+                'columns': ['numpy>=1.13'],
+            },
             package_data={
                 'ak8s.data': ['release-*.json'],
             },
+            cmdclass={'build_py': build_py_with_caches},
             python_requires='~=3.6',
             classifiers=[
                 #'License :: OSI Approved :: MIT License',